@@ -0,0 +1,115 @@
+"""精确欧氏距离变换：对一张覆盖掩码求每个像素最近的已覆盖像素。
+
+纯 numpy，不引用 bpy。UV 传输的边缘外扩与法线贴图烘焙的外扩都用它。
+"""
+
+import numpy as np
+
+
+def _column_nearest(coverage):
+    """第一趟：逐列求最近的已覆盖行，返回 (最近行号, 距离²)；整列无覆盖时行号 -1、距离 inf。"""
+    height = coverage.shape[0]
+    rows = np.arange(height, dtype=np.int32)[:, None]
+
+    above = np.where(coverage, rows, -1)
+    np.maximum.accumulate(above, axis=0, out=above)
+    below = np.where(coverage, rows, height)
+    below = np.minimum.accumulate(below[::-1], axis=0)[::-1]
+
+    distance_above = np.where(above >= 0, rows - above, height).astype(np.float64)
+    distance_below = np.where(below < height, below - rows, height).astype(np.float64)
+    use_above = distance_above <= distance_below
+    nearest = np.where(use_above, above, np.where(below < height, below, -1))
+    distance = np.where(use_above, distance_above, distance_below)
+    distance *= distance
+    distance[nearest < 0] = np.inf
+    return nearest.astype(np.int32), distance
+
+
+def _lower_envelope(cost):
+    """第二趟：Felzenszwalb–Huttenlocher 一维下包络，按行向量化。
+
+    cost 为 (R, n) 逐行的列距离²（inf 表示该列不提供抛物线）。返回每个位置取到最小值的
+    列号（整行无抛物线时为 -1）。外层按列推进，所有行同步弹栈；弹栈总数按行摊还为 O(n)。
+    """
+    row_count, n = cost.shape
+    rows = np.arange(row_count)
+    parabola = np.zeros((row_count, n), dtype=np.int64)
+    boundary = np.full((row_count, n + 1), np.inf)
+    top = np.full(row_count, -1, dtype=np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for q in range(n):
+            active = np.isfinite(cost[:, q])
+            if not active.any():
+                continue
+            lifted = cost[:, q] + q * q
+            while True:
+                current = np.maximum(top, 0)
+                vertex = parabola[rows, current]
+                crossing = ((lifted - (cost[rows, vertex] + vertex * vertex))
+                            / (2.0 * (q - vertex)))
+                pop = active & (top >= 0) & (crossing <= boundary[rows, current])
+                if not pop.any():
+                    break
+                top[pop] -= 1
+
+            crossing = np.where(top >= 0, crossing, -np.inf)
+            top[active] += 1
+            pushed_rows = rows[active]
+            pushed_top = top[active]
+            parabola[pushed_rows, pushed_top] = q
+            boundary[pushed_rows, pushed_top] = crossing[active]
+            boundary[pushed_rows, pushed_top + 1] = np.inf
+
+    # 位置 q 落在第 j 段 ⇔ 段界 boundary[1..j] 都 < q；把各行段界错开拼成一条有序数组一次查完
+    stride = n + 3
+    index = np.arange(n)
+    valid = (index[None, :] >= 1) & (index[None, :] <= top[:, None])
+    shifted = np.clip(boundary[:, :n], -1.0, float(n)) + (rows * stride)[:, None]
+    flat = shifted[valid]
+    row_start = np.concatenate(([0], np.cumsum(np.maximum(top, 0))[:-1]))
+
+    queries = (index[None, :] + (rows * stride)[:, None]).reshape(-1)
+    segment = (np.searchsorted(flat, queries, side='left').reshape(row_count, n)
+               - row_start[:, None])
+    nearest = parabola[rows[:, None], segment]
+    nearest[top < 0] = -1
+    return nearest
+
+
+# 第二趟按行分块处理，单块 (行数 × 宽度) 元素上限，控制段界表的峰值内存
+_ENVELOPE_BLOCK_BUDGET = 8 * 1024 * 1024
+
+
+def nearest_seed(coverage):
+    """精确欧氏距离变换（Felzenszwalb–Huttenlocher 可分离两趟），同时记录最近的覆盖像素。
+
+    返回 (seed_x, seed_y, distance²)，均为 (H, W)；没有任何覆盖像素时 seed 为 -1。
+    代价 O(像素数)，与外扩距离无关。
+    """
+    height, width = coverage.shape
+    column_row, column_cost = _column_nearest(coverage)
+
+    seed_x = np.full((height, width), -1, dtype=np.int32)
+    seed_y = np.full((height, width), -1, dtype=np.int32)
+    distance = np.full((height, width), np.iinfo(np.int32).max, dtype=np.int64)
+
+    block = max(1, _ENVELOPE_BLOCK_BUDGET // max(1, width))
+    columns = np.arange(width, dtype=np.int64)
+    for low in range(0, height, block):
+        high = min(height, low + block)
+        cost = column_cost[low:high]
+        nearest = _lower_envelope(cost)
+        found = nearest >= 0
+
+        block_rows = np.arange(low, high)[:, None]
+        safe = np.where(found, nearest, 0)
+        offset = columns[None, :] - safe
+        total = offset * offset + cost[np.arange(high - low)[:, None], safe]
+
+        seed_x[low:high] = np.where(found, nearest, -1)
+        seed_y[low:high] = np.where(found, column_row[block_rows, safe], -1)
+        distance[low:high] = np.where(found, total, distance[low:high])
+
+    return seed_x, seed_y, distance
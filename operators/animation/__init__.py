@@ -1,4 +1,5 @@
 import bpy
+from . import _fcurve_eval
 from . import offset_keyframes
 from . import fix_all
 from . import cleanup_bake
@@ -20,7 +21,9 @@ classes = (
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    _fcurve_eval.register_handlers()
 
 def unregister():
+    _fcurve_eval.unregister_handlers()
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
@@ -8,22 +8,36 @@ This module provides minimal helpers so the rest of the addon doesn't need to
 care which API it is talking to.
 """
 
+import re
+
 import bpy
 
+# ``pose.bones["<name>"]`` prefix of a bone data path. Blender escapes ``"`` and
+# ``\`` inside the name as ``\"`` and ``\\``; group 1 is the still-escaped name.
+_BONE_PATH = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]')
+_ESCAPED = re.compile(r'\\(.)')
+
+# data_path -> (bone name, property); plain strings only, cleared when it grows too large
+_PARSED_PATHS = {}
+_PARSED_PATHS_LIMIT = 1 << 18
+
 
 def iter_action_fcurves(action):
     """Yield ``(owner, fcurve)`` for every fcurve in ``action``.
 
     ``owner`` is the collection on which ``.remove(fcurve)`` works, i.e.
     ``action.fcurves`` on legacy API or ``channelbag.fcurves`` on the slotted
-    API. Iterate eagerly (list) when you plan to mutate during the loop.
+    API. All fcurves of one collection share the same ``owner`` object, so it
+    can be used to group them. Iterate eagerly (list) when you plan to mutate
+    during the loop.
     """
     if action is None:
         return
     # Legacy (Blender 4.x and earlier)
     if hasattr(action, 'fcurves'):
-        for fc in action.fcurves:
-            yield action.fcurves, fc
+        owner = action.fcurves
+        for fc in owner:
+            yield owner, fc
         return
     # Slotted (Blender 5.x+)
     if hasattr(action, 'layers'):
@@ -31,8 +45,9 @@ def iter_action_fcurves(action):
             for strip in layer.strips:
                 if hasattr(strip, 'channelbags'):
                     for cb in strip.channelbags:
-                        for fc in cb.fcurves:
-                            yield cb.fcurves, fc
+                        owner = cb.fcurves
+                        for fc in owner:
+                            yield owner, fc
 
 
 def list_action_fcurves(action):
@@ -40,6 +55,46 @@ def list_action_fcurves(action):
     return list(iter_action_fcurves(action))
 
 
+def parse_data_path(data_path):
+    """Split a ``pose.bones["..."]`` data path into ``(bone name, property)``.
+
+    The bone name is unescaped; ``property`` is the part after the following
+    ``.`` (e.g. ``location``) or None. Returns ``(None, None)`` for paths that
+    do not address a pose bone. Results are memoised by the path string.
+    """
+    result = _PARSED_PATHS.get(data_path)
+    if result is not None:
+        return result
+    if len(_PARSED_PATHS) > _PARSED_PATHS_LIMIT:
+        _PARSED_PATHS.clear()
+
+    found = _BONE_PATH.match(data_path)
+    if found is None:
+        result = (None, None)
+    else:
+        bone = found.group(1)
+        if '\\' in bone:
+            bone = _ESCAPED.sub(r'\1', bone)
+        rest = data_path[found.end():]
+        result = (bone, rest[1:] if rest.startswith('.') else None)
+    _PARSED_PATHS[data_path] = result
+    return result
+
+
+def bone_fcurve_index(action):
+    """Map bone name -> list of ``(owner, fcurve)`` for every ``pose.bones["..."]`` path.
+
+    Built fresh in one pass over the action; only the path parsing is cached,
+    so no RNA references outlive the call.
+    """
+    index = {}
+    for owner, fc in iter_action_fcurves(action):
+        bone = parse_data_path(fc.data_path)[0]
+        if bone is not None:
+            index.setdefault(bone, []).append((owner, fc))
+    return index
+
+
 def remove_fcurve(owner, fcurve):
     """Remove ``fcurve`` from its collection."""
     owner.remove(fcurve)
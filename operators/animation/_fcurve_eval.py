@@ -0,0 +1,312 @@
+"""F 曲线的 numpy 批量求值：一次读出关键帧与手柄，所有采样时间一起算。
+
+逐帧调用 fcurve.evaluate(t) 在 Python 层来回穿梭，曲线一多、帧一多就成了主要开销。
+这里把一条曲线打包成段表（关键帧时间 / 取值 / 插值方式 / 修正后的贝塞尔控制点），
+按 Blender 的求值规则整批计算：
+
+- 正好落在关键帧上（容差 1e-4）取关键帧的值；
+- 段内按前一个关键帧的插值方式：CONSTANT、LINEAR，或 BEZIER（先按 Blender 的规则
+  压缩越界手柄，再对 x(t) = 时间 做带区间保护的牛顿迭代，最后求 y(t)）；
+- 两端外推按曲线的 CONSTANT / LINEAR 外推设置，LINEAR 时斜率取端点手柄或相邻关键帧；
+- 只有一个未禁用的「循环」修改器、前后都是 REPEAT 且不限次数时，把时间折回首尾关键帧之间再求值。
+
+其他情况（缓动类插值、其他修改器、没有关键帧只有采样点）整条曲线退回 fcurve.evaluate。
+
+段表按 F 曲线缓存，键里带所属动作的修订号：depsgraph 报告动作有更新、本插件自己写回曲线、
+或重新载入文件时修订号作废。
+"""
+
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+# 采样时间与关键帧相差不到这么多就直接取关键帧的值（Blender 的二分查找阈值）
+_EXACT_THRESHOLD = 1e-4
+
+_NEWTON_ITERATIONS = 32
+_NEWTON_TOLERANCE = 1e-9
+
+
+def _enum_value(prop, identifier):
+    return bpy.types.Keyframe.bl_rna.properties[prop].enum_items[identifier].value
+
+
+class CurveTable:
+    """一条 F 曲线的打包段表：关键帧时间 / 取值 / 插值方式与两侧手柄，以及外推与循环设置。"""
+
+    def __init__(self, times, values, interpolation, right_handles, left_handles, extrapolate_linear, cyclic):
+        self.times = times
+        self.values = values
+        self.interpolation = interpolation
+        self.right_handles = right_handles
+        self.left_handles = left_handles
+        self.extrapolate_linear = extrapolate_linear
+        self.cyclic = cyclic
+
+
+def _simple_cycles(fcurve):
+    """修改器能否按纯时间折返处理：返回 (是否循环, 是否支持)。"""
+    modifiers = [modifier for modifier in fcurve.modifiers if not modifier.mute and modifier.active]
+    if not modifiers:
+        return False, True
+    if len(modifiers) != 1:
+        return False, False
+    modifier = modifiers[0]
+    supported = (
+        modifier.type == 'CYCLES'
+        and modifier.mode_before == 'REPEAT' and modifier.mode_after == 'REPEAT'
+        and modifier.cycles_before == 0 and modifier.cycles_after == 0
+        and not modifier.use_restricted_range and not modifier.use_influence
+    )
+    return True, supported
+
+
+def build_table(fcurve):
+    """读出一条曲线的段表；不支持 numpy 求值时返回 None。"""
+    cyclic, supported = _simple_cycles(fcurve)
+    points = fcurve.keyframe_points
+    count = len(points)
+    if not supported or count == 0:
+        return None
+
+    interpolation = np.empty(count, dtype=np.int32)
+    points.foreach_get("interpolation", interpolation)
+    known = (_enum_value("interpolation", 'CONSTANT'), _enum_value("interpolation", 'LINEAR'),
+             _enum_value("interpolation", 'BEZIER'))
+    # 最后一个关键帧的插值方式只影响外推，不参与段内求值
+    if count > 1 and not np.isin(interpolation[:-1], known).all():
+        return None
+
+    arrays = {}
+    for name in ("co", "handle_left", "handle_right"):
+        arrays[name] = np.empty(count * 2, dtype=np.float64)
+        points.foreach_get(name, arrays[name])
+        arrays[name] = arrays[name].reshape((count, 2))
+
+    return CurveTable(
+        arrays["co"][:, 0].copy(), arrays["co"][:, 1].copy(), interpolation,
+        arrays["handle_right"], arrays["handle_left"],
+        fcurve.extrapolation == 'LINEAR', cyclic,
+    )
+
+
+def _cycle_times(table, frames):
+    """按「循环」修改器的 REPEAT 规则把首尾关键帧之外的时间折回来。"""
+    first, last = table.times[0], table.times[-1]
+    span = last - first
+    if span <= 0.0:
+        return frames
+    frames = frames.copy()
+
+    after = frames > last
+    offset = np.fmod(frames[after] - first, span)
+    frames[after] = np.where(offset == 0.0, last, first + offset)
+
+    before = frames < first
+    offset = np.fmod(frames[before] - first, span)
+    wrapped = first + offset
+    wrapped = np.where(wrapped < first, wrapped + span, wrapped)
+    frames[before] = np.where(offset == 0.0, first, wrapped)
+    return frames
+
+
+def _extrapolate(table, frames, side):
+    """side 为 0 时向首帧之前外推，为 -1 时向末帧之后外推。"""
+    endpoint_time = table.times[side]
+    endpoint_value = table.values[side]
+    result = np.full(frames.shape[0], endpoint_value)
+    ipo = table.interpolation[side]
+    if not table.extrapolate_linear or ipo == _enum_value("interpolation", 'CONSTANT'):
+        return result
+
+    if ipo == _enum_value("interpolation", 'LINEAR'):
+        if table.times.shape[0] == 1:
+            return result
+        neighbor = 1 if side == 0 else -2
+        delta = table.times[neighbor] - endpoint_time
+        if delta == 0.0:
+            return result
+        slope = (table.values[neighbor] - endpoint_value) / delta
+    else:
+        handle = table.left_handles[0] if side == 0 else table.right_handles[-1]
+        delta = endpoint_time - handle[0]
+        if delta == 0.0:
+            return result
+        slope = (endpoint_value - handle[1]) / delta
+    return endpoint_value - slope * (endpoint_time - frames)
+
+
+def _bezier_segments(table, segment, frames):
+    """对落在贝塞尔段里的采样求值；segment 为每个采样所在段的起始关键帧下标。"""
+    x0, y0 = table.times[segment], table.values[segment]
+    x3, y3 = table.times[segment + 1], table.values[segment + 1]
+    x1, y1 = table.right_handles[segment, 0].copy(), table.right_handles[segment, 1].copy()
+    x2, y2 = table.left_handles[segment + 1, 0].copy(), table.left_handles[segment + 1, 1].copy()
+
+    # 与 Blender 的 correct_bezpart 一致：两侧手柄的 x 长度之和超过段长时按比例缩回
+    length1 = np.abs(x0 - x1)
+    length2 = np.abs(x3 - x2)
+    total = length1 + length2
+    span = x3 - x0
+    shrink = (total > span) & (total != 0.0)
+    factor = np.where(shrink, span / np.where(total != 0.0, total, 1.0), 1.0)
+    x1 = x0 - factor * (x0 - x1)
+    y1 = y0 - factor * (y0 - y1)
+    x2 = x3 - factor * (x3 - x2)
+    y2 = y3 - factor * (y3 - y2)
+
+    # x(t) = a t³ + b t² + c t + x0，修正后在 [0, 1] 上单调不减
+    c = 3.0 * (x1 - x0)
+    b = 3.0 * (x2 - x1) - c
+    a = x3 - x0 - c - b
+    target = frames - x0
+
+    low = np.zeros(frames.shape[0])
+    high = np.ones(frames.shape[0])
+    t = np.clip(target / np.where(span != 0.0, span, 1.0), 0.0, 1.0)
+    for _ in range(_NEWTON_ITERATIONS):
+        error = ((a * t + b) * t + c) * t - target
+        if np.abs(error).max(initial=0.0) < _NEWTON_TOLERANCE:
+            break
+        low = np.where(error < 0.0, t, low)
+        high = np.where(error > 0.0, t, high)
+        slope = (3.0 * a * t + 2.0 * b) * t + c
+        step = t - error / np.where(slope != 0.0, slope, 1.0)
+        usable = (slope != 0.0) & (step > low) & (step < high)
+        t = np.where(usable, step, 0.5 * (low + high))
+
+    inverse = 1.0 - t
+    value = (inverse ** 3 * y0 + 3.0 * inverse * inverse * t * y1
+             + 3.0 * inverse * t * t * y2 + t ** 3 * y3)
+    # 四个控制点 y 都相同时 Blender 直接返回常数，免得引入浮点噪声
+    flat = (np.abs(y0 - y3) < np.finfo(np.float32).eps) & (np.abs(y1 - y2) < np.finfo(np.float32).eps) \
+        & (np.abs(y2 - y3) < np.finfo(np.float32).eps)
+    return np.where(flat, y0, value)
+
+
+def evaluate_table(table, frames):
+    """用段表对一批时间求值，返回与 frames 同形的 float64 数组。"""
+    frames = np.asarray(frames, dtype=np.float64)
+    if table.cyclic:
+        frames = _cycle_times(table, frames)
+
+    times = table.times
+    count = times.shape[0]
+    result = np.empty(frames.shape[0])
+
+    before = frames < times[0]
+    after = frames > times[-1]
+    result[before] = _extrapolate(table, frames[before], 0)
+    result[after] = _extrapolate(table, frames[after], -1)
+
+    inside = np.nonzero(~(before | after))[0]
+    if count == 1:
+        result[inside] = table.values[0]
+        return result
+
+    sample = frames[inside]
+    segment = np.clip(np.searchsorted(times, sample, side='right') - 1, 0, count - 2)
+    nearest = np.where(np.abs(times[segment + 1] - sample) < np.abs(times[segment] - sample),
+                       segment + 1, segment)
+    exact = np.abs(times[nearest] - sample) < _EXACT_THRESHOLD
+    values = np.where(exact, table.values[nearest], 0.0)
+
+    pending = ~exact
+    ipo = table.interpolation[segment]
+    constant = pending & (ipo == _enum_value("interpolation", 'CONSTANT'))
+    values[constant] = table.values[segment[constant]]
+
+    linear = pending & (ipo == _enum_value("interpolation", 'LINEAR'))
+    left = segment[linear]
+    width = times[left + 1] - times[left]
+    fraction = np.where(width != 0.0, (sample[linear] - times[left]) / np.where(width != 0.0, width, 1.0), 0.0)
+    values[linear] = table.values[left] + fraction * (table.values[left + 1] - table.values[left])
+
+    bezier = pending & (ipo == _enum_value("interpolation", 'BEZIER'))
+    if bezier.any():
+        values[bezier] = _bezier_segments(table, segment[bezier], sample[bezier])
+
+    result[inside] = values
+    return result
+
+
+# -- 缓存 ---------------------------------------------------------------------
+
+# 动作数据指针 -> 修订号
+_REVISIONS = {}
+# F 曲线数据指针 -> (动作数据指针, 修订号, 段表或 None)
+_TABLES = {}
+
+
+def _revision(action):
+    return _REVISIONS.get(action.as_pointer(), 0)
+
+
+def _bump(action_pointer):
+    _REVISIONS[action_pointer] = _REVISIONS.get(action_pointer, 0) + 1
+
+
+def cached_table(fcurve):
+    """带缓存的 build_table；F 曲线所属动作的修订号变了就重建。"""
+    action = fcurve.id_data
+    key = fcurve.as_pointer()
+    entry = _TABLES.get(key)
+    if entry is not None:
+        action_pointer, revision, table = entry
+        if action_pointer == action.as_pointer() and revision == _revision(action):
+            return table
+    table = build_table(fcurve)
+    _TABLES[key] = (action.as_pointer(), _revision(action), table)
+    return table
+
+
+def evaluate(fcurve, frames):
+    """对一条 F 曲线批量求值；不支持的曲线逐帧退回 fcurve.evaluate。"""
+    table = cached_table(fcurve)
+    if table is None:
+        evaluate_frame = fcurve.evaluate
+        return np.array([evaluate_frame(frame) for frame in np.asarray(frames, dtype=np.float64).tolist()],
+                        dtype=np.float64)
+    return evaluate_table(table, frames)
+
+
+def invalidate(fcurve):
+    """曲线被本插件改写后调用：作废所属动作下所有曲线的段表。"""
+    invalidate_action(fcurve.id_data)
+
+
+def invalidate_action(action):
+    """动作里的曲线被增删后调用：作废该动作下所有曲线的段表。"""
+    _bump(action.as_pointer())
+
+
+@persistent
+def _depsgraph_update_handler(scene, depsgraph):
+    if not _TABLES:
+        return
+    for update in depsgraph.updates:
+        data = getattr(update.id, "original", update.id)
+        if isinstance(data, bpy.types.Action):
+            _bump(data.as_pointer())
+
+
+@persistent
+def _load_post_handler(_dummy):
+    _TABLES.clear()
+    _REVISIONS.clear()
+
+
+def register_handlers():
+    if _depsgraph_update_handler not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_depsgraph_update_handler)
+    if _load_post_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_load_post_handler)
+
+
+def unregister_handlers():
+    if _depsgraph_update_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_depsgraph_update_handler)
+    if _load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_load_post_handler)
+    _TABLES.clear()
+    _REVISIONS.clear()
@@ -0,0 +1,100 @@
+"""按 data_path 规则批量清理动作里的 F 曲线。
+
+几个清理操作符原本各自遍历 bpy.data.actions、逐条拆解 data_path、逐条删除曲线。
+分层动作（Blender 5 的通道袋）上每删一条都要在通道袋里重新查找一遍，删得越多越接近平方级。
+这里统一成：
+
+- 每个动作只扫一遍 iter_action_fcurves，解析出骨骼名与属性，
+  依次套用所有规则，命中第一条就记到该规则名下；
+- 待删曲线按所属集合（通道袋或旧版 action.fcurves）分组，整组删光时直接 clear；
+- data_path 的解析走 _compat.parse_data_path，结果按路径字符串全局缓存：
+  同一套骨架的各个动作路径大多相同，只解析一次。
+  每次仍重新读取曲线本身，不持有可能在撤销后失效的 RNA 引用。
+"""
+
+from collections import namedtuple
+
+import bpy
+
+from . import _fcurve_eval
+from ._compat import iter_action_fcurves, parse_data_path
+
+# 骨骼上的自定义属性（烘焙常留下的隐藏曲线）
+_CUSTOM_PROPERTY = '"]["'
+
+FCurveEntry = namedtuple("FCurveEntry", ("owner", "fcurve", "data_path", "bone", "prop"))
+FCurveEntry.__doc__ = """一条 F 曲线及其解析结果。
+
+bone 为 pose.bones["..."] 中反转义后的骨骼名，不是骨骼路径时为 None；
+prop 为骨骼名之后以 . 开头的剩余部分（如 location），没有时为 None。"""
+
+Rule = namedtuple("Rule", ("key", "test", "action"))
+Rule.__doc__ = """一条清理规则：test(entry) 为真即删除；action 不为 None 时只作用于该动作。"""
+
+
+def action_entries(action):
+    """动作里所有曲线的 FCurveEntry 列表。"""
+    entries = []
+    for owner, fcurve in iter_action_fcurves(action):
+        data_path = fcurve.data_path
+        result = parse_data_path(data_path)
+        entries.append(FCurveEntry(owner, fcurve, data_path, result[0], result[1]))
+    return entries
+
+
+def _remove_batch(owner, fcurves):
+    """从同一个集合里删掉一批曲线；整组删光时用一次 clear 代替逐条查找删除。"""
+    if len(fcurves) == len(owner) and hasattr(owner, 'clear'):
+        owner.clear()
+        return
+    for fcurve in fcurves:
+        owner.remove(fcurve)
+
+
+def remove_matching(rules, actions=None):
+    """在 actions（默认全部动作）上一次性套用 rules，删除命中的曲线。
+
+    一条曲线只记在第一条命中的规则名下，返回 {规则 key: 删除条数}。
+    """
+    counts = {rule.key: 0 for rule in rules}
+    if actions is None:
+        actions = bpy.data.actions
+    for action in actions:
+        active = [rule for rule in rules if rule.action is None or rule.action == action]
+        if not active:
+            continue
+
+        # id(集合) -> (集合, [待删曲线])
+        doomed = {}
+        for entry in action_entries(action):
+            for rule in active:
+                if rule.test(entry):
+                    counts[rule.key] += 1
+                    doomed.setdefault(id(entry.owner), (entry.owner, []))[1].append(entry.fcurve)
+                    break
+
+        if doomed:
+            for owner, fcurves in doomed.values():
+                _remove_batch(owner, fcurves)
+            _fcurve_eval.invalidate_action(action)
+    return counts
+
+
+# -- 常用规则 ------------------------------------------------------------------
+
+def custom_property_rule(key="bake", action=None):
+    """骨骼自定义属性曲线（路径里含 "][" ）。"""
+    return Rule(key, lambda entry: _CUSTOM_PROPERTY in entry.data_path, action)
+
+
+def missing_bone_rule(bone_names, key="paths", action=None):
+    """指向 bone_names 之外骨骼的曲线。"""
+    bone_names = frozenset(bone_names)
+    return Rule(key, lambda entry: entry.bone is not None and entry.bone not in bone_names, action)
+
+
+def bone_property_rule(bone_names, props, key="transforms", action=None):
+    """bone_names 中骨骼上属性正好是 props 之一的曲线（如 location / scale）。"""
+    bone_names = frozenset(bone_names)
+    props = frozenset(props)
+    return Rule(key, lambda entry: entry.bone in bone_names and entry.prop in props, action)
@@ -12,8 +12,10 @@
 """
 
 import bpy
+import numpy as np
 from mathutils import Euler, Quaternion, Vector
 
+from . import _fcurve_eval
 from ._compat import list_action_fcurves, new_fcurve
 
 # 方向定不下来的判据，沿用 better_fbx importer.py:790 的取值
@@ -100,6 +102,94 @@ def _transform_channel(channel, values, prepared, rotation_mode, previous):
     return [values[0]] + list(backward @ axis), None
 
 
+def _quaternion_multiply(left, right):
+    """Hamilton 积，(…, 4) 的 (w, x, y, z) 数组逐行相乘，可广播。"""
+    lw, lx, ly, lz = np.moveaxis(left, -1, 0)
+    rw, rx, ry, rz = np.moveaxis(right, -1, 0)
+    return np.stack((
+        lw * rw - lx * rx - ly * ry - lz * rz,
+        lw * rx + lx * rw + ly * rz - lz * ry,
+        lw * ry - lx * rz + ly * rw + lz * rx,
+        lw * rz + lx * ry - ly * rx + lz * rw,
+    ), axis=-1)
+
+
+def _quaternion_matrix(quaternion):
+    """单位四元数 (w, x, y, z) 的 3×3 旋转矩阵。"""
+    w, x, y, z = quaternion
+    return np.array((
+        (1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)),
+        (2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)),
+        (2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)),
+    ))
+
+
+def _euler_quaternions(values, order):
+    """(N, 3) 欧拉角 → (N, 4) 四元数；order 'ABC' 表示先绕 A 轴、再 B、最后 C，即 q = qC · qB · qA。"""
+    half = values * 0.5
+    result = None
+    for letter in order:
+        axis = 'XYZ'.index(letter)
+        single = np.zeros((values.shape[0], 4))
+        single[:, 0] = np.cos(half[:, axis])
+        single[:, axis + 1] = np.sin(half[:, axis])
+        result = single if result is None else _quaternion_multiply(single, result)
+    return result
+
+
+def _continuous_signs(quaternions):
+    """逐帧翻号使相邻四元数点积非负，与逐帧「和上一帧点积为负就取反」的结果一致。
+
+    第 i 帧是否取反只取决于它和上一帧原值点积的符号链：点积为负就跟上一帧相反，
+    为正就跟上一帧相同，恰好为 0 时（上一帧取反后点积也为 0）不取反，链条重新开始。
+    """
+    count = quaternions.shape[0]
+    signs = np.ones(count)
+    if count < 2:
+        return signs
+    dots = np.einsum('ij,ij->i', quaternions[1:], quaternions[:-1])
+    flips = np.concatenate(([0], np.cumsum(dots < 0.0)))
+    restart = np.concatenate(([True], dots == 0.0))
+    base = np.maximum.accumulate(np.where(restart, np.arange(count), 0))
+    parity = (flips - flips[base]) % 2
+    signs[parity == 1] = -1.0
+    return signs
+
+
+def _transform_keys(channel, values, prepared, rotation_mode):
+    """批量版 _transform_channel：values 为按时间排好的 (N, 通道宽) 数组，返回同形数组。
+
+    位移、四元数、轴角全部是 numpy 运算；欧拉角的共轭也在 numpy 里做，
+    只有带连续性约束的 to_euler 仍逐帧交给 mathutils（它要参考上一帧的结果选解）。
+    """
+    inverse_basis, inverse_offset, forward, backward = prepared
+    values = np.asarray(values, dtype=np.float64)
+    if channel == 'location':
+        return values @ np.array(inverse_basis).T + np.array(inverse_offset)
+
+    forward = np.array(forward)
+    backward = np.array(backward)
+    if channel == 'rotation_quaternion':
+        result = _quaternion_multiply(_quaternion_multiply(backward, values), forward)
+        return result * _continuous_signs(result)[:, None]
+
+    if channel == 'rotation_euler':
+        order = rotation_mode if rotation_mode in _EULER_ORDERS else 'XYZ'
+        rotated = _quaternion_multiply(_quaternion_multiply(backward, _euler_quaternions(values, order)), forward)
+        result = np.empty_like(values)
+        previous = Euler((0.0, 0.0, 0.0), order)
+        for row, quaternion in enumerate(rotated.tolist()):
+            previous = Quaternion(quaternion).to_euler(order, previous)
+            result[row] = previous
+        return result
+
+    result = values.copy()
+    axes = values[:, 1:]
+    valid = np.linalg.norm(axes, axis=1) >= 1e-9
+    result[valid, 1:] = axes[valid] @ _quaternion_matrix(backward).T
+    return result
+
+
 def _is_neutral_pose(pose_bone, rotation_channel):
     """静置姿态共轭之后还是静置，可以整根跳过，免得写进一堆浮点噪声。"""
     if pose_bone.location.length > 1e-9:
@@ -111,19 +201,73 @@ def _is_neutral_pose(pose_bone, rotation_channel):
     return max(abs(value) for value in pose_bone.rotation_euler) < 1e-9
 
 
+def _keyframe_enum(prop, identifier):
+    return bpy.types.Keyframe.bl_rna.properties[prop].enum_items[identifier].value
+
+
+def _read_keyframe_times(fcurve):
+    """一条曲线全部关键帧的时间，按 4 位小数取整，与写回时的对齐口径一致。"""
+    points = fcurve.keyframe_points
+    co = np.empty(len(points) * 2, dtype=np.float64)
+    points.foreach_get("co", co)
+    return np.round(co[0::2], 4)
+
+
 def _write_curve(fcurve, times, values):
-    """按时间写回取值：已有关键帧就地改，缺的补插；贝塞尔手柄交给自动重算。"""
-    existing = {round(point.co.x, 4): point for point in fcurve.keyframe_points}
-    for time, value in zip(times, values):
-        point = existing.get(time)
-        if point is None:
-            point = fcurve.keyframe_points.insert(time, value, options={'FAST'})
-        else:
-            point.co.y = value
-        if point.interpolation == 'BEZIER':
-            point.handle_left_type = 'AUTO_CLAMPED'
-            point.handle_right_type = 'AUTO_CLAMPED'
+    """按时间写回取值：已有关键帧就地改，缺的一次性补上；贝塞尔手柄交给自动重算。
+
+    全程只用 foreach_get / foreach_set：co 与两侧手柄一起读出，同一时间有多个关键帧时
+    改最后一个；已有关键帧的手柄随取值平移，缺的关键帧 add 一次后追加在末尾，
+    最后 fcurve.update() 统一排序并重算自动手柄。
+    """
+    points = fcurve.keyframe_points
+    count = len(points)
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+
+    arrays = {}
+    for name in ("co", "handle_left", "handle_right"):
+        arrays[name] = np.empty(count * 2, dtype=np.float64)
+        points.foreach_get(name, arrays[name])
+        arrays[name] = arrays[name].reshape((count, 2))
+
+    keys = np.round(arrays["co"][:, 0], 4)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    position = np.searchsorted(sorted_keys, times, side='right') - 1
+    found = position >= 0
+    found[found] = sorted_keys[position[found]] == times[found]
+    matched = order[position[found]]
+
+    shift = values[found] - arrays["co"][matched, 1]
+    arrays["co"][matched, 1] = values[found]
+    arrays["handle_left"][matched, 1] += shift
+    arrays["handle_right"][matched, 1] += shift
+
+    missing = np.nonzero(~found)[0]
+    if missing.shape[0]:
+        added = np.column_stack((times[missing], values[missing]))
+        for name in arrays:
+            arrays[name] = np.concatenate((arrays[name], added))
+        points.add(missing.shape[0])
+
+    written = np.concatenate((matched, np.arange(count, count + missing.shape[0])))
+    total = count + missing.shape[0]
+    for name in arrays:
+        points.foreach_set(name, arrays[name].astype(np.float32).reshape(-1))
+
+    interpolation = np.empty(total, dtype=np.int32)
+    points.foreach_get("interpolation", interpolation)
+    bezier = written[interpolation[written] == _keyframe_enum("interpolation", 'BEZIER')]
+    if bezier.shape[0]:
+        auto_clamped = _keyframe_enum("handle_left_type", 'AUTO_CLAMPED')
+        for name in ("handle_left_type", "handle_right_type"):
+            handle_types = np.empty(total, dtype=np.int32)
+            points.foreach_get(name, handle_types)
+            handle_types[bezier] = auto_clamped
+            points.foreach_set(name, handle_types)
     fcurve.update()
+    _fcurve_eval.invalidate(fcurve)
 
 
 class SHIYUME_OT_AutoBoneOrientation(bpy.types.Operator):
@@ -301,29 +445,28 @@ class SHIYUME_OT_AutoBoneOrientation(bpy.types.Operator):
 
         touched = 0
         for (bone_name, path, channel), (owner, existing) in groups.items():
-            times = sorted({round(point.co.x, 4) for curve in existing.values() for point in curve.keyframe_points})
-            if not times:
+            times = np.unique(np.concatenate(
+                [_read_keyframe_times(curve) for curve in existing.values()] or [np.empty(0)]))
+            if not times.shape[0]:
                 continue
             pose_bone = pose.bones.get(bone_name)
             rotation_mode = pose_bone.rotation_mode if pose_bone else 'QUATERNION'
             defaults = self._channel_defaults(channel, pose_bone)
             prepared = _prepare_correction(corrections[bone_name])
 
-            previous = None
-            samples = []
-            for time in times:
-                values = [
-                    existing[index].evaluate(time) if index in existing else defaults[index]
-                    for index in range(_CHANNEL_SIZE[channel])
-                ]
-                transformed, previous = _transform_channel(channel, values, prepared, rotation_mode, previous)
-                samples.append(transformed)
+            values = np.empty((times.shape[0], _CHANNEL_SIZE[channel]))
+            for index in range(_CHANNEL_SIZE[channel]):
+                if index in existing:
+                    values[:, index] = _fcurve_eval.evaluate(existing[index], times)
+                else:
+                    values[:, index] = defaults[index]
+            samples = _transform_keys(channel, values, prepared, rotation_mode)
 
             for index in range(_CHANNEL_SIZE[channel]):
                 if index not in existing:
                     existing[index] = new_fcurve(owner, path, index)
             for index, curve in existing.items():
-                _write_curve(curve, times, [sample[index] for sample in samples])
+                _write_curve(curve, times, samples[:, index])
                 touched += 1
             animated.setdefault(bone_name, set()).add(channel)
         return touched
@@ -1,6 +1,6 @@
 import bpy
 
-from ._compat import list_action_fcurves, remove_fcurve
+from . import _fcurve_rules
 
 
 class SHIYUME_OT_CleanBoneCollections(bpy.types.Operator):
@@ -27,15 +27,7 @@ class SHIYUME_OT_CleanBoneCollections(bpy.types.Operator):
             self.report({'WARNING'}, "No bones found in specified collections")
             return {'CANCELLED'}
 
-        for action in bpy.data.actions:
-            for owner, fcurve in list_action_fcurves(action):
-                try:
-                    path_to_bone, transform_type = fcurve.data_path.rsplit('.', 1)
-                    if not path_to_bone.startswith('pose.bones["'):
-                        continue
-                    bone_name = path_to_bone.split('"')[1]
-                    if bone_name in bones_to_clean and transform_type in ["location", "scale"]:
-                        remove_fcurve(owner, fcurve)
-                except Exception:
-                    continue
+        _fcurve_rules.remove_matching([
+            _fcurve_rules.bone_property_rule(bones_to_clean, ("location", "scale")),
+        ])
         return {'FINISHED'}
@@ -1,6 +1,6 @@
 import bpy
 
-from ._compat import list_action_fcurves, remove_fcurve
+from . import _fcurve_rules
 
 
 class SHIYUME_OT_CleanupBakeFrames(bpy.types.Operator):
@@ -10,11 +10,6 @@ class SHIYUME_OT_CleanupBakeFrames(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        count = 0
-        for action in bpy.data.actions:
-            for owner, fcurve in list_action_fcurves(action):
-                if '"]["' in fcurve.data_path:
-                    remove_fcurve(owner, fcurve)
-                    count += 1
+        count = _fcurve_rules.remove_matching([_fcurve_rules.custom_property_rule()])["bake"]
         self.report({'INFO'}, f"Removed {count} custom property fcurves")
         return {'FINISHED'}
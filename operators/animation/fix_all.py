@@ -1,6 +1,7 @@
 import bpy
 
-from ._compat import list_action_fcurves, remove_fcurve, get_active_action
+from . import _fcurve_rules
+from ._compat import get_active_action
 
 
 class SHIYUME_OT_FixAllAnimationIssues(bpy.types.Operator):
@@ -26,61 +27,46 @@ class SHIYUME_OT_FixAllAnimationIssues(bpy.types.Operator):
         armature = context.active_object
         action = get_active_action(armature)
 
+        # 所有启用的步骤合成一组规则，每个动作只扫一遍；曲线归第一条命中的规则，与原先按步骤先后删除一致
+        rules = []
+
         # 1. Cleanup Bake Frames (Hidden Properties)
         if self.fix_bake:
-            count = 0
-            for act in bpy.data.actions:
-                for owner, fcurve in list_action_fcurves(act):
-                    if '"]["' in fcurve.data_path:
-                        remove_fcurve(owner, fcurve)
-                        count += 1
-            if count > 0:
-                self.report({'INFO'}, f"已清除 {count} 个烘焙残留曲线")
+            rules.append(_fcurve_rules.custom_property_rule(key="bake"))
 
         # 2. Cleanup Selected Bone Loc/Scale
         if self.fix_transforms and action and context.mode == 'POSE':
-            for bone in context.selected_pose_bones:
-                prefix = f'pose.bones["{bone.name}"]'
-                for owner, fcurve in list_action_fcurves(action):
-                    if fcurve.data_path.startswith(prefix):
-                        if "location" in fcurve.data_path or "scale" in fcurve.data_path:
-                            remove_fcurve(owner, fcurve)
-            self.report({'INFO'}, "已清除选中骨骼的位移/缩放关键帧")
+            selected = frozenset(bone.name for bone in context.selected_pose_bones)
+            rules.append(_fcurve_rules.Rule(
+                "transforms",
+                lambda entry: entry.bone in selected and ("location" in entry.data_path or "scale" in entry.data_path),
+                action,
+            ))
 
         # 3. Fix Invalid Anim Paths
         if self.fix_paths:
-            for act in bpy.data.actions:
-                for owner, fcurve in list_action_fcurves(act):
-                    if fcurve.data_path.startswith('pose.bones[') and ']' in fcurve.data_path:
-                        try:
-                            bone_name = fcurve.data_path.split('[')[1].split(']')[0].strip('"')
-                            if bone_name not in armature.pose.bones:
-                                remove_fcurve(owner, fcurve)
-                        except Exception:
-                            pass
-            self.report({'INFO'}, "已清理无效骨骼路径")
+            rules.append(_fcurve_rules.missing_bone_rule(armature.pose.bones.keys(), key="paths"))
 
         # 4. Clean Bone Collections
+        bones_to_clean = set()
         if self.fix_collections:
             col_names = ["Body", "Skirt", "BackHair", "FrontHair"]
-            bones_to_clean = set()
             for name in col_names:
                 if name in armature.data.collections:
                     for bone in armature.data.collections[name].bones:
                         bones_to_clean.add(bone.name)
-
             if bones_to_clean:
-                for act in bpy.data.actions:
-                    for owner, fcurve in list_action_fcurves(act):
-                        try:
-                            path_to_bone, transform_type = fcurve.data_path.rsplit('.', 1)
-                            if not path_to_bone.startswith('pose.bones["'):
-                                continue
-                            bone_name = path_to_bone.split('"')[1]
-                            if bone_name in bones_to_clean and transform_type in ["location", "scale"]:
-                                remove_fcurve(owner, fcurve)
-                        except Exception:
-                            continue
-                self.report({'INFO'}, "已清除特定集合的变换数据")
+                rules.append(_fcurve_rules.bone_property_rule(bones_to_clean, ("location", "scale"), key="collections"))
+
+        counts = _fcurve_rules.remove_matching(rules) if rules else {}
+
+        if counts.get("bake", 0) > 0:
+            self.report({'INFO'}, f"已清除 {counts['bake']} 个烘焙残留曲线")
+        if "transforms" in counts:
+            self.report({'INFO'}, "已清除选中骨骼的位移/缩放关键帧")
+        if "paths" in counts:
+            self.report({'INFO'}, "已清理无效骨骼路径")
+        if "collections" in counts:
+            self.report({'INFO'}, "已清除特定集合的变换数据")
 
         return {'FINISHED'}
@@ -1,6 +1,6 @@
 import bpy
 
-from ._compat import list_action_fcurves, remove_fcurve
+from . import _fcurve_rules
 
 
 class SHIYUME_OT_FixInvalidAnimPaths(bpy.types.Operator):
@@ -15,10 +15,5 @@ class SHIYUME_OT_FixInvalidAnimPaths(bpy.types.Operator):
 
     def execute(self, context):
         armature = context.object
-        for action in bpy.data.actions:
-            for owner, fcurve in list_action_fcurves(action):
-                if fcurve.data_path.startswith('pose.bones[') and ']' in fcurve.data_path:
-                    bone_name = fcurve.data_path.split('[')[1].split(']')[0].strip('"')
-                    if bone_name not in armature.pose.bones:
-                        remove_fcurve(owner, fcurve)
+        _fcurve_rules.remove_matching([_fcurve_rules.missing_bone_rule(armature.pose.bones.keys())])
         return {'FINISHED'}
@@ -1,7 +1,9 @@
 import bpy
+import numpy as np
 from math import radians
 
-from ._compat import iter_action_fcurves, get_active_action
+from . import _fcurve_eval
+from ._compat import bone_fcurve_index, get_active_action
 
 
 class SHIYUME_OT_AnimationOffset(bpy.types.Operator):
@@ -33,48 +35,76 @@ class SHIYUME_OT_AnimationOffset(bpy.types.Operator):
     def smoothstep(self, x):
         return 3 * x ** 2 - 2 * x ** 3
 
+    def _factors(self, frames):
+        """每个关键帧的偏移系数（不在帧范围内的为 0），frames 为关键帧时间数组。"""
+        if self.frame_start == 0 and self.frame_end == 0:
+            in_range = np.ones(frames.shape[0], dtype=bool)
+        else:
+            in_range = (self.frame_start <= frames) & (frames <= self.frame_end)
+
+        t = np.zeros(frames.shape[0])
+        if self.frame_start != self.frame_end:
+            t = (frames - self.frame_start) / (self.frame_end - self.frame_start)
+
+        if self.offset_mode == 'linear_increase':
+            factor = t
+        elif self.offset_mode == 'linear_decrease':
+            factor = 1 - t
+        elif self.offset_mode == 'smoothstep_increase':
+            factor = self.smoothstep(t)
+        elif self.offset_mode == 'smoothstep_decrease':
+            factor = 1 - self.smoothstep(t)
+        else:
+            factor = np.ones(frames.shape[0])
+        return np.where(in_range, factor, 0.0)
+
+    @staticmethod
+    def _channel_offset(fcurve, pbone, loc_offset, rot_offset_rad):
+        """这条曲线对应的偏移量；不受影响的通道返回 None。"""
+        path = fcurve.data_path
+        index = fcurve.array_index
+        if 'location' in path:
+            return loc_offset[index]
+        if 'rotation_euler' in path and pbone.rotation_mode == 'XYZ':
+            return rot_offset_rad[index] if index < 3 else None
+        if 'rotation_quaternion' in path and pbone.rotation_mode == 'QUATERNION':
+            return rot_offset_rad[index - 1] if 0 < index < 4 else None
+        return None
+
+    def _offset_curve(self, fcurve, offset):
+        """整条曲线一次读写：关键帧与两侧手柄按同一增量平移。"""
+        points = fcurve.keyframe_points
+        count = len(points)
+        if count == 0:
+            return
+        arrays = {}
+        for name in ("co", "handle_left", "handle_right"):
+            arrays[name] = np.empty(count * 2, dtype=np.float64)
+            points.foreach_get(name, arrays[name])
+            arrays[name] = arrays[name].reshape((count, 2))
+
+        delta = offset * self._factors(arrays["co"][:, 0])
+        for name, values in arrays.items():
+            values[:, 1] += delta
+            points.foreach_set(name, values.astype(np.float32).reshape(-1))
+        fcurve.update()
+        _fcurve_eval.invalidate(fcurve)
+
     def execute(self, context):
         obj = context.active_object
         rot_offset_rad = tuple(radians(rot) for rot in self.rot_offset)
+        loc_offset = tuple(self.loc_offset)
         action = get_active_action(obj)
 
         if not action:
             self.report({'WARNING'}, "No active action found")
             return {'CANCELLED'}
 
+        index = bone_fcurve_index(action)
         for pbone in context.selected_pose_bones:
-            prefix = f'pose.bones["{pbone.name}"]'
-            for _owner, fcurve in iter_action_fcurves(action):
-                if fcurve.data_path.startswith(prefix):
-                    for kp in fcurve.keyframe_points:
-                        if self.frame_start == 0 and self.frame_end == 0:
-                            in_range = True
-                        else:
-                            in_range = self.frame_start <= kp.co.x <= self.frame_end
-
-                        if in_range:
-                            t = 0
-                            if self.frame_start != self.frame_end:
-                                t = (kp.co.x - self.frame_start) / (self.frame_end - self.frame_start)
-
-                            if self.offset_mode == 'linear_increase':
-                                factor = t
-                            elif self.offset_mode == 'linear_decrease':
-                                factor = 1 - t
-                            elif self.offset_mode == 'smoothstep_increase':
-                                factor = self.smoothstep(t)
-                            elif self.offset_mode == 'smoothstep_decrease':
-                                factor = 1 - self.smoothstep(t)
-                            else:
-                                factor = 1
-
-                            if 'location' in fcurve.data_path:
-                                kp.co[1] += self.loc_offset[fcurve.array_index] * factor
-                            elif 'rotation_euler' in fcurve.data_path and pbone.rotation_mode == 'XYZ':
-                                if fcurve.array_index < 3:
-                                    kp.co[1] += rot_offset_rad[fcurve.array_index] * factor
-                            elif 'rotation_quaternion' in fcurve.data_path and pbone.rotation_mode == 'QUATERNION':
-                                if 0 < fcurve.array_index < 4:
-                                    kp.co[1] += rot_offset_rad[fcurve.array_index - 1] * factor
+            for _owner, fcurve in index.get(pbone.name, ()):
+                offset = self._channel_offset(fcurve, pbone, loc_offset, rot_offset_rad)
+                if offset:
+                    self._offset_curve(fcurve, offset)
 
         return {'FINISHED'}
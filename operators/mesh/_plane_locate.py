@@ -0,0 +1,204 @@
+"""二维平面上的三角形定位：给一批点找出各自落在哪个三角形里、重心权重是多少。
+
+「参考拓扑切割」要把参考网格的每个顶点投到目标网格的 UVSync 平面上采样，
+点数和三角形数都可能上十万，逐点扫描三角形是 O(点 × 三角形)。这里一次建好索引，
+所有点一起查：
+
+- 包含点的三角形一律由纯 numpy 的均匀网格整批查，格子边长按三角形包围盒尺寸的中位数自适应；
+- 落不进任何三角形的点退回最近顶点：有 mathutils 时用 KDTree，否则按块暴力求，只对这些漏网点做。
+
+没有再用 BVHTree 逐点 find_nearest：BVH 的结果同样要按容差复核重心权重，而三角形按外扩容差的
+包围盒登记进网格，复核能通过的点网格一定也找得到，漏网点交给 BVH 不会多找回一个。
+
+结果直接给成「每点三个顶点下标 + 三个权重」，调用方按下标取值、按权重加权即可。
+"""
+
+import numpy as np
+
+try:
+    from mathutils.kdtree import KDTree
+except ImportError:
+    KDTree = None
+
+# 均匀网格的格子总数上限；三角形很碎、分布又很散时靠放大格子兜住内存
+_GRID_CELL_LIMIT = 1 << 22
+
+# 一次展开的 (点, 候选三角形) 对数上限
+_PAIR_BUDGET = 1 << 22
+
+
+def triangle_weights(points, a, b, c, tolerance):
+    """逐行算点对三角形的重心权重，返回 ((N, 3) 权重, (N,) 是否在三角形内)。
+
+    判定与旧的逐点实现一致：行列式不超过容差视为退化，任一权重越出 [-容差, 1+容差] 视为不在内。
+    """
+    px, py = points[:, 0], points[:, 1]
+    ax, ay = a[:, 0], a[:, 1]
+    bx, by = b[:, 0], b[:, 1]
+    cx, cy = c[:, 0], c[:, 1]
+
+    det = (by - cy) * (ax - cx) + (cx - bx) * (ay - cy)
+    usable = np.abs(det) > tolerance
+    safe = np.where(usable, det, 1.0)
+
+    weights = np.empty((points.shape[0], 3), dtype=np.float64)
+    weights[:, 0] = ((by - cy) * (px - cx) + (cx - bx) * (py - cy)) / safe
+    weights[:, 1] = ((cy - ay) * (px - cx) + (ax - cx) * (py - cy)) / safe
+    weights[:, 2] = 1.0 - weights[:, 0] - weights[:, 1]
+
+    inside = (
+        usable
+        & (weights.min(axis=1) >= -tolerance)
+        & (weights.max(axis=1) <= 1.0 + tolerance)
+    )
+    return weights, inside
+
+
+class UniformGrid:
+    """纯 numpy 均匀网格：每个三角形登记进它（含容差外扩的）包围盒覆盖的所有格子。
+
+    格子里的三角形按下标升序排列，查询时取第一个包含该点的，与旧实现的候选顺序一致。
+    """
+
+    def __init__(self, plane, triangles, tolerance):
+        self.plane = plane
+        self.triangles = triangles
+        self.tolerance = tolerance
+
+        corners = plane[triangles]
+        low = corners.min(axis=1) - tolerance
+        high = corners.max(axis=1) + tolerance
+        self.origin = low.min(axis=0)
+        span = np.maximum(high.max(axis=0) - self.origin, tolerance)
+
+        # 格子边长取三角形包围盒边长的中位数：典型三角形只压住 1～4 个格子
+        cell = float(np.median((high - low).max(axis=1)))
+        cell = max(cell, tolerance, float(np.sqrt(span[0] * span[1] / _GRID_CELL_LIMIT)))
+        self.cell = cell
+        self.dims = np.maximum(np.floor(span / cell).astype(np.int64) + 1, 1)
+
+        first = self._cell_coords(low)
+        last = self._cell_coords(high)
+        width = last[:, 0] - first[:, 0] + 1
+        counts = width * (last[:, 1] - first[:, 1] + 1)
+
+        owner = np.repeat(np.arange(triangles.shape[0], dtype=np.int64), counts)
+        local = np.arange(owner.shape[0], dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = first[owner, 0] + local % width[owner]
+        cell_y = first[owner, 1] + local // width[owner]
+        cell_ids = cell_y * self.dims[0] + cell_x
+
+        order = np.argsort(cell_ids, kind='stable')
+        self.cell_triangles = owner[order]
+        cell_total = int(self.dims[0] * self.dims[1])
+        self.cell_start = np.zeros(cell_total + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell_ids, minlength=cell_total), out=self.cell_start[1:])
+
+    def _cell_coords(self, points):
+        coords = np.floor((points - self.origin) / self.cell).astype(np.int64)
+        return np.clip(coords, 0, self.dims - 1)
+
+    def locate(self, points):
+        """返回 (N,) 三角形下标（找不到为 -1）与 (N, 3) 重心权重。"""
+        count = points.shape[0]
+        found = np.full(count, -1, dtype=np.int64)
+        weights = np.zeros((count, 3), dtype=np.float64)
+        if count == 0:
+            return found, weights
+
+        coords = self._cell_coords(points)
+        cells = coords[:, 1] * self.dims[0] + coords[:, 0]
+        starts = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - starts
+
+        # 按候选对数切块，避免少数大格子一次展开过多
+        ends = np.cumsum(counts)
+        begin = 0
+        while begin < count:
+            limit = (ends[begin - 1] if begin else 0) + _PAIR_BUDGET
+            stop = max(int(np.searchsorted(ends, limit, side='right')), begin + 1)
+            self._locate_block(points, starts, counts, begin, stop, found, weights)
+            begin = stop
+        return found, weights
+
+    def _locate_block(self, points, starts, counts, begin, stop, found, weights):
+        block_counts = counts[begin:stop]
+        total = int(block_counts.sum())
+        if total == 0:
+            return
+        point_ids = np.repeat(np.arange(begin, stop, dtype=np.int64), block_counts)
+        offsets = np.arange(total, dtype=np.int64) - np.repeat(
+            np.cumsum(block_counts) - block_counts, block_counts)
+        tri_ids = self.cell_triangles[starts[point_ids] + offsets]
+
+        corners = self.plane[self.triangles[tri_ids]]
+        pair_weights, inside = triangle_weights(
+            points[point_ids], corners[:, 0], corners[:, 1], corners[:, 2], self.tolerance)
+
+        # 同一点的候选对按三角形下标升序排列，第一个命中的就是旧实现会选的那个
+        hits = np.nonzero(inside)[0]
+        hit_points, first = np.unique(point_ids[hits], return_index=True)
+        found[hit_points] = tri_ids[hits[first]]
+        weights[hit_points] = pair_weights[hits[first]]
+
+
+class PlaneLocator:
+    """目标平面的定位器：plane 为 (V, 2) 顶点坐标，triangles 为 (T, 3) 顶点下标。"""
+
+    def __init__(self, plane, triangles, tolerance, use_mathutils=True):
+        self.plane = np.ascontiguousarray(plane, dtype=np.float64)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.int64)
+        self.tolerance = tolerance
+        self.use_mathutils = use_mathutils and KDTree is not None
+        self._grid = None
+        self._kd = None
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            self._grid = UniformGrid(self.plane, self.triangles, self.tolerance)
+        return self._grid
+
+    def nearest_vertices(self, points):
+        """每个点在平面上的最近顶点下标。"""
+        count = points.shape[0]
+        nearest = np.zeros(count, dtype=np.int64)
+        if count == 0:
+            return nearest
+
+        if self.use_mathutils:
+            if self._kd is None:
+                self._kd = KDTree(self.plane.shape[0])
+                for index, (x, y) in enumerate(self.plane.tolist()):
+                    self._kd.insert((x, y, 0.0), index)
+                self._kd.balance()
+            find = self._kd.find
+            for row, (x, y) in enumerate(points.tolist()):
+                nearest[row] = find((x, y, 0.0))[1]
+            return nearest
+
+        # 无 mathutils：按块暴力求最近，块大小受候选对预算约束
+        step = max(1, _PAIR_BUDGET // max(1, self.plane.shape[0]))
+        for begin in range(0, count, step):
+            block = points[begin:begin + step]
+            distance = ((block[:, None, :] - self.plane[None, :, :]) ** 2).sum(axis=2)
+            nearest[begin:begin + step] = distance.argmin(axis=1)
+        return nearest
+
+    def locate(self, points):
+        """批量定位，返回 ((N, 3) 顶点下标, (N, 3) 权重, (N,) 三角形下标)。
+
+        不在任何三角形里的点，三角形下标为 -1，顶点下标三列都是最近顶点、权重为 (1, 0, 0)。
+        """
+        points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+        found, weights = self.grid.locate(points)
+
+        vertices = np.empty((points.shape[0], 3), dtype=np.int64)
+        hits = found >= 0
+        vertices[hits] = self.triangles[found[hits]]
+
+        misses = np.nonzero(~hits)[0]
+        if misses.shape[0]:
+            vertices[misses] = self.nearest_vertices(points[misses])[:, None]
+            weights[misses] = (1.0, 0.0, 0.0)
+        return vertices, weights, found
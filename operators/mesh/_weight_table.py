@@ -0,0 +1,239 @@
+"""顶点权重的列式表：一次把整个网格的顶点组权重读成 CSR 布局，供各权重工具共用。
+
+布局为三列平铺数组：
+
+- offsets：(V + 1,)，第 i 个顶点的条目位于 [offsets[i], offsets[i + 1])；
+- groups：每个条目的顶点组下标；
+- weights：每个条目的权重。
+
+同一顶点内条目保持 Blender 的存储顺序（即 vertex.groups / deform 层 items() 的顺序）。
+
+读取有两条路：
+
+- 物体模式下逐顶点对 vertex.groups 做 foreach_get，全网格只走一遍；
+- 编辑模式下从 bmesh 的 deform 层读，可以只读一部分顶点。
+
+没有走通用属性 API：mesh.attributes 里并不包含顶点组，同名的 POINT/FLOAT 属性只是
+无关的普通属性，拿它当权重会读到错误的数据。
+
+表不做缓存，每次现读：按差异写回时若拿的是过期的表，会覆盖别处刚写入的权重。
+写回时删除每组一次 remove，新增按 (组, 权重) 分批 add(..., 'REPLACE')，已有条目的权重按顶点
+整行 foreach_set，变化不超过容差的不写。
+"""
+
+import numpy as np
+
+
+class WeightTable:
+    """CSR 形式的顶点权重表；行是顶点，列是顶点组。"""
+
+    def __init__(self, group_count, offsets, groups, weights):
+        self.group_count = group_count
+        self.offsets = offsets
+        self.groups = groups
+        self.weights = weights
+
+    @property
+    def vertex_count(self):
+        return self.offsets.shape[0] - 1
+
+    @property
+    def counts(self):
+        """每个顶点的条目数。"""
+        return np.diff(self.offsets)
+
+    @property
+    def rows(self):
+        """每个条目所属的顶点（行）下标。"""
+        return np.repeat(np.arange(self.vertex_count, dtype=np.int64), self.counts)
+
+    @classmethod
+    def from_entries(cls, vertex_count, group_count, rows, groups, weights):
+        """由 (行, 组, 权重) 三列构造；rows 必须已按行升序排好。"""
+        counts = np.bincount(rows, minlength=vertex_count)
+        offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(group_count, offsets,
+                   np.asarray(groups, dtype=np.int32),
+                   np.asarray(weights, dtype=np.float32))
+
+    def row(self, vertex):
+        """一个顶点的 (组下标数组, 权重数组)。"""
+        start, end = self.offsets[vertex], self.offsets[vertex + 1]
+        return self.groups[start:end], self.weights[start:end]
+
+    def column(self, group):
+        """(V,) 稠密列：该组的权重，不是成员的顶点为 0。"""
+        column = np.zeros(self.vertex_count, dtype=np.float32)
+        member = self.groups == group
+        column[self.rows[member]] = self.weights[member]
+        return column
+
+    def group_max(self):
+        """每个顶点组的最大权重；没有任何成员的组为 0。"""
+        maximum = np.zeros(self.group_count, dtype=np.float32)
+        np.maximum.at(maximum, self.groups, self.weights)
+        return maximum
+
+    def select(self, keep):
+        """按条目掩码筛出一张新表，行数不变。"""
+        return WeightTable.from_entries(
+            self.vertex_count, self.group_count,
+            self.rows[keep], self.groups[keep], self.weights[keep])
+
+    def normalized(self, vertex_mask=None):
+        """每行权重除以本行总和（总和为 0 的行不动）；vertex_mask 给出时只处理这些行。"""
+        rows = self.rows
+        totals = np.bincount(rows, weights=self.weights, minlength=self.vertex_count)
+        scale = np.ones(self.vertex_count, dtype=np.float64)
+        positive = totals > 0
+        if vertex_mask is not None:
+            positive &= vertex_mask
+        scale[positive] = 1.0 / totals[positive]
+        weights = (self.weights * scale[rows]).astype(np.float32)
+        return WeightTable(self.group_count, self.offsets, self.groups, weights)
+
+    def keys(self):
+        """每个条目的 行 * 组数 + 组 复合键，用于两张表对比。"""
+        return self.rows * max(self.group_count, 1) + self.groups
+
+
+# -- 读取 ---------------------------------------------------------------------
+
+
+def _read_vertex_groups(mesh, group_count):
+    """逐顶点 foreach_get 读 vertex.groups，整网格一遍。"""
+    vertices = mesh.vertices
+    vertex_count = len(vertices)
+    counts = np.fromiter((len(vertex.groups) for vertex in vertices),
+                         dtype=np.int64, count=vertex_count)
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    groups = np.empty(int(offsets[-1]), dtype=np.int32)
+    weights = np.empty(int(offsets[-1]), dtype=np.float32)
+    for vertex, start, end in zip(vertices, offsets[:-1].tolist(), offsets[1:].tolist()):
+        if end > start:
+            vertex.groups.foreach_get("group", groups[start:end])
+            vertex.groups.foreach_get("weight", weights[start:end])
+    return WeightTable(group_count, offsets, groups, weights)
+
+
+def from_object(obj):
+    """物体模式下读取整张表。"""
+    return _read_vertex_groups(obj.data, len(obj.vertex_groups))
+
+
+def from_deform_layer(verts, deform_layer, group_count):
+    """编辑模式下从 bmesh deform 层读取；行顺序即 verts 的顺序。"""
+    offsets = [0]
+    groups = []
+    weights = []
+    for vert in verts:
+        items = vert[deform_layer].items()
+        for group, weight in items:
+            groups.append(group)
+            weights.append(weight)
+        offsets.append(len(groups))
+    return WeightTable(group_count, np.array(offsets, dtype=np.int64),
+                       np.array(groups, dtype=np.int32), np.array(weights, dtype=np.float32))
+
+
+# -- 写回 ---------------------------------------------------------------------
+
+
+# 权重变化不超过该值的条目视为没变，不回写
+WEIGHT_TOLERANCE = 1e-6
+
+
+def changes(before, after, tolerance=0.0):
+    """对比两张同形表，返回 (删除的 (行, 组), 新增的 (行, 组, 权重), 权重变化超过 tolerance 的行)。"""
+    before_keys = before.keys()
+    after_keys = after.keys()
+    order = np.argsort(before_keys, kind='stable')
+    sorted_keys = before_keys[order]
+
+    removed = ~np.isin(before_keys, after_keys)
+    position = np.clip(np.searchsorted(sorted_keys, after_keys), 0, max(sorted_keys.shape[0] - 1, 0))
+    if sorted_keys.shape[0]:
+        existing = sorted_keys[position] == after_keys
+        previous = before.weights[order[position]]
+    else:
+        existing = np.zeros(after_keys.shape[0], dtype=bool)
+        previous = np.zeros(after_keys.shape[0], dtype=np.float32)
+    added = ~existing
+    changed = existing & (np.abs(previous - after.weights) > tolerance)
+
+    before_rows = before.rows
+    after_rows = after.rows
+    return (
+        (before_rows[removed], before.groups[removed]),
+        (after_rows[added], after.groups[added], after.weights[added]),
+        np.unique(after_rows[changed]),
+    )
+
+
+def _write_rows(mesh, table, rows):
+    """把表里这些行的权重按顶点整行写回 vertex.groups（每个顶点一次 foreach_set）。
+
+    行里的组必须与顶点现有的组一致；顶点组元素的存储顺序可能被 remove 打乱，所以先读一遍组号再对位。
+    """
+    vertices = mesh.vertices
+    for row in rows.tolist():
+        element_groups = vertices[row].groups
+        current = np.empty(len(element_groups), dtype=np.int32)
+        element_groups.foreach_get("group", current)
+        groups, weights = table.row(row)
+        order = np.argsort(groups)
+        slots = order[np.searchsorted(groups[order], current)]
+        element_groups.foreach_set("weight", weights[slots])
+
+
+def write_vertex_groups(obj, before, after, tolerance=0.0):
+    """物体模式下把 after 相对 before 的差异写回顶点组，返回写动的条目数。
+
+    删除每组一次 remove；新增条目按 (组, 权重) 分批 add；已有条目的改写不依赖权重相同，
+    按行直接覆盖元素的 weight（归一化后几乎每条权重都不同，按权重分批会退化成逐条 add）。
+    变化不超过 tolerance 的条目不写。
+    """
+    (removed_rows, removed_groups), (rows, groups, weights), changed_rows = changes(
+        before, after, tolerance)
+    vertex_groups = obj.vertex_groups
+
+    order = np.argsort(removed_groups, kind='stable')
+    removed_rows = removed_rows[order]
+    removed_groups = removed_groups[order]
+    bounds = np.flatnonzero(np.diff(removed_groups)) + 1
+    for chunk_rows, chunk_groups in zip(np.split(removed_rows, bounds), np.split(removed_groups, bounds)):
+        if chunk_rows.shape[0]:
+            vertex_groups[int(chunk_groups[0])].remove(chunk_rows.tolist())
+
+    # 同组同权重的新增条目合成一次 add
+    if rows.shape[0]:
+        order = np.lexsort((weights, groups))
+        rows = rows[order]
+        groups = groups[order]
+        weights = weights[order]
+        bounds = np.flatnonzero((np.diff(groups) != 0) | (np.diff(weights) != 0)) + 1
+        starts = np.concatenate(([0], bounds))
+        for chunk_rows, group, weight in zip(np.split(rows, bounds), groups[starts].tolist(),
+                                             weights[starts].tolist()):
+            vertex_groups[group].add(chunk_rows.tolist(), weight, 'REPLACE')
+
+    if changed_rows.shape[0]:
+        _write_rows(obj.data, after, changed_rows)
+
+    changed_entries = int(np.isin(after.rows, changed_rows).sum()) if changed_rows.shape[0] else 0
+    return int(removed_rows.shape[0] + rows.shape[0]) + changed_entries
+
+
+def write_deform_layer(verts, deform_layer, table, rows=None):
+    """编辑模式下把表里的行整行覆盖回 deform 层；rows 为空时写全部行。"""
+    if rows is None:
+        rows = range(table.vertex_count)
+    for row in rows:
+        deform_weights = verts[row][deform_layer]
+        deform_weights.clear()
+        groups, weights = table.row(row)
+        for group, weight in zip(groups.tolist(), weights.tolist()):
+            deform_weights[group] = weight
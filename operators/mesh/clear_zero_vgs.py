@@ -1,4 +1,7 @@
 import bpy
+import numpy as np
+
+from . import _weight_table
 
 
 class SHIYUME_OT_ClearZeroVertexGroups(bpy.types.Operator):
@@ -15,25 +18,10 @@ class SHIYUME_OT_ClearZeroVertexGroups(bpy.types.Operator):
     def execute(self, context):
         obj = context.active_object
 
-        gid_to_maxw = {}
-        for g in obj.vertex_groups:
-            gid_to_maxw[g.index] = 0
-
-        for v in obj.data.vertices:
-            for g in v.groups:
-                gid = g.group
-                w = obj.vertex_groups[gid].weight(v.index)
-                if gid_to_maxw.get(gid) is None or w > gid_to_maxw[gid]:
-                    gid_to_maxw[gid] = w
-
-        wait_to_del_gids = []
-        for gid, maxw in gid_to_maxw.items():
-            if maxw <= 0:
-                wait_to_del_gids.append(gid)
-
-        wait_to_del_gids = sorted(wait_to_del_gids)[::-1]
+        table = _weight_table.from_object(obj)
+        wait_to_del_gids = np.nonzero(table.group_max() <= 0)[0].tolist()
 
-        for gid in wait_to_del_gids:
+        for gid in reversed(wait_to_del_gids):
             obj.vertex_groups.remove(obj.vertex_groups[gid])
 
         self.report({'INFO'}, f"删除了 {len(wait_to_del_gids)} 个空顶点组")
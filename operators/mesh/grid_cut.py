@@ -1,8 +1,70 @@
 import bpy
 import bmesh
 import math
+import numpy as np
 from mathutils import Vector
 
+# 顶点离切割平面不超过该距离即视为在平面上（与原先 bisect_plane 的 dist 一致）
+_PLANE_DIST = 0.0001
+
+
+def _face_chords(face, positions, axis_of, direction):
+    """沿面的边界走一遍，求出所有切割平面在面内的切线，返回 [(顶点, 顶点)]。
+
+    要求边已按切割平面剖好（平面穿过边界处都有顶点）。落在同一平面上、首尾相连的一串顶点
+    （贴着平面的边）合成一个事件，按它前后邻点是否分居平面两侧区分「穿过」与「擦过」。
+    每个平面上的事件沿切线方向排序后扫一遍：穿过时切换面内 / 面外，在面内遇到的事件与进入点
+    连成一条切线。凹面、贴着平面的边都按此处理；复杂度为 O(n log n)，n 为面的顶点数。
+    """
+    verts = list(face.verts)
+    count = len(verts)
+    coords = np.array([axis_of[v] for v in verts], dtype=np.float64)
+    index = np.searchsorted(positions, coords - _PLANE_DIST, side='left')
+    clipped = np.minimum(index, len(positions) - 1)
+    on_plane = (index < len(positions)) & (positions[clipped] <= coords + _PLANE_DIST)
+    planes = np.where(on_plane, clipped, -1).tolist()
+
+    # 从一个「与前一个顶点不在同一平面」的顶点起步，保证环形上的每串都完整
+    start = next((i for i in range(count) if planes[i] != planes[i - 1]), None)
+    if start is None:
+        return []
+
+    events = {}
+    i = 0
+    while i < count:
+        plane = planes[(start + i) % count]
+        run = [(start + i) % count]
+        i += 1
+        while i < count and planes[(start + i) % count] == plane:
+            run.append((start + i) % count)
+            i += 1
+        if plane < 0:
+            continue
+        position = positions[plane]
+        before = coords[run[0] - 1] - position
+        after = coords[(run[-1] + 1) % count] - position
+        run_verts = sorted((verts[k] for k in run), key=lambda vert: vert.co.dot(direction))
+        events.setdefault(plane, []).append((
+            run_verts[0].co.dot(direction), run_verts[0], run_verts[-1], before * after < 0))
+
+    chords = []
+    for plane_events in events.values():
+        plane_events.sort(key=lambda event: event[0])
+        inside = False
+        entry = None
+        for _t, low, high, crosses in plane_events:
+            if inside:
+                chords.append((entry, low))
+                if crosses:
+                    inside = False
+                else:
+                    entry = high
+            elif crosses:
+                inside = True
+                entry = high
+    return chords
+
+
 class SHIYUME_OT_GridCut(bpy.types.Operator):
     """按指定间隔对选中面片进行等距切割，然后溶解旧的内部分割边。
     专为发片等距工作流设计：配合 mesh_to_uv 生成的 UV 网格使用，
@@ -38,6 +100,61 @@ class SHIYUME_OT_GridCut(bpy.types.Operator):
                 and context.active_object.type == 'MESH'
                 and context.mode == 'EDIT_MESH')
 
+    def _split_edges(self, bm, positions, axis_of):
+        """一次性求出每条选中边与所有切割平面的交点，按沿边顺序依次插入顶点。
+
+        交点由端点坐标对排好序的切割位置做 searchsorted 得到，只处理真正被穿过的边。"""
+        dist = _PLANE_DIST
+        edges = [e for e in bm.edges if e.select]
+        if not edges:
+            return
+
+        ends = np.array([(axis_of[e.verts[0]], axis_of[e.verts[1]]) for e in edges])
+        low = ends.min(axis=1)
+        high = ends.max(axis=1)
+        first = np.searchsorted(positions, low + dist, side='right')
+        last = np.searchsorted(positions, high - dist, side='left')
+        crossing = np.nonzero(last > first)[0]
+
+        for edge_index in crossing.tolist():
+            edge = edges[edge_index]
+            start, end = edge.verts
+            planes = range(int(first[edge_index]), int(last[edge_index]))
+            # 从 start 一侧开始切，保证每次都切在剩余那段上
+            if axis_of[start] > axis_of[end]:
+                planes = reversed(planes)
+            for plane in planes:
+                position = positions[plane]
+                fac = (position - axis_of[start]) / (axis_of[end] - axis_of[start])
+                _new_edge, new_vert = bmesh.utils.edge_split(edge, start, fac)
+                axis_of[new_vert] = position
+                new_vert.select = True
+                start = new_vert
+                edge = bm.edges.get((new_vert, end))
+
+    def _split_faces(self, bm, positions, axis_of, plane_normal, tag_layer):
+        """每个选中面一次算出所有切割平面上的切线（见 _face_chords），再逐条剖开，新切线不带旧边标记。
+
+        切线彼此不相交，每条都完整落在当前的某一块里：用两端顶点共有的那一块即可定位，
+        不必扫描已切出的所有块。"""
+        for face in [f for f in bm.faces if f.select]:
+            chords = _face_chords(face, positions, axis_of, face.normal.cross(plane_normal))
+            if not chords:
+                continue
+
+            pieces = {face}
+            for v0, v1 in chords:
+                if bm.edges.get((v0, v1)) is not None:
+                    continue
+                target = next((f for f in v0.link_faces if f in pieces and v1 in f.verts), None)
+                if target is None:
+                    continue
+                new_face, new_loop = bmesh.utils.face_split(target, v0, v1)
+                new_face.select = True
+                new_loop.edge[tag_layer] = 0
+                new_loop.edge.select = True
+                pieces.add(new_face)
+
     def _process_object(self, obj, axis_idx):
         """处理单个物体：标记旧边 → 切割 → 溶解旧边。返回 (切割数, 溶解边数)。"""
         me = obj.data
@@ -54,6 +171,12 @@ class SHIYUME_OT_GridCut(bpy.types.Operator):
         mat = obj.matrix_world
         mat_inv = mat.inverted()
 
+        # ---- 所有顶点在切割轴上的世界坐标，一次算完 ----
+        local = np.array([v.co[:] for v in bm.verts], dtype=np.float64).reshape(-1, 3)
+        world = np.array(mat, dtype=np.float64)
+        axis_coords = local @ world[axis_idx, :3] + world[axis_idx, 3]
+        axis_of = dict(zip(bm.verts, axis_coords.tolist()))
+
         # ---- 创建临时标记层 ----
         tag_key = "_grid_cut_old"
         tag_layer = bm.edges.layers.int.get(tag_key)
@@ -64,7 +187,7 @@ class SHIYUME_OT_GridCut(bpy.types.Operator):
             edge[tag_layer] = 0
 
         # ---- 切割前：将垂直于切割轴的旧内部边标记为 1 ----
-        marked_count = 0
+        marked_edges = []
         if self.dissolve_old:
             for edge in bm.edges:
                 # 跳过边界边（轮廓）
@@ -80,17 +203,13 @@ class SHIYUME_OT_GridCut(bpy.types.Operator):
                 if not (edge.verts[0].select or edge.verts[1].select):
                     continue
                 # 正交网格判定：两端顶点在切割轴上坐标相同 → 边垂直于切割轴
-                v0_axis = (mat @ edge.verts[0].co)[axis_idx]
-                v1_axis = (mat @ edge.verts[1].co)[axis_idx]
-                if abs(v1_axis - v0_axis) < 1e-5:
+                if abs(axis_of[edge.verts[1]] - axis_of[edge.verts[0]]) < 1e-5:
                     edge[tag_layer] = 1
-                    marked_count += 1
+                    marked_edges.append(edge)
+        marked_count = len(marked_edges)
 
         # ---- 计算选中面在目标轴方向上的范围（世界坐标） ----
-        all_coords = []
-        for f in sel_faces:
-            for v in f.verts:
-                all_coords.append((mat @ v.co)[axis_idx])
+        all_coords = [axis_of[v] for f in sel_faces for v in f.verts]
 
         min_val = min(all_coords)
         max_val = max(all_coords)
@@ -117,59 +236,20 @@ class SHIYUME_OT_GridCut(bpy.types.Operator):
         normal_world[axis_idx] = 1.0
         normal_local = (mat_inv.to_3x3() @ normal_world).normalized()
 
-        # ---- 执行逐条切割 ----
-        cut_count = 0
-        for cut_pos in cut_positions:
-            point_world = Vector((0, 0, 0))
-            point_world[axis_idx] = cut_pos
-            point_local = mat_inv @ point_world
-
-            sel_geom = [f for f in bm.faces if f.select]
-            sel_edges = [e for e in bm.edges if e.select]
-            sel_verts = [v for v in bm.verts if v.select]
-            geom = sel_verts + sel_edges + sel_geom
-
-            if not geom:
-                break
-
-            result = bmesh.ops.bisect_plane(
-                bm,
-                geom=geom,
-                dist=0.0001,
-                plane_co=point_local,
-                plane_no=normal_local,
-                clear_outer=False,
-                clear_inner=False,
-            )
-
-            # ---- 清除切割平面上所有边的标记 ----
-            cut_verts = set()
-            for elem in result['geom_cut']:
-                if isinstance(elem, bmesh.types.BMVert):
-                    cut_verts.add(elem)
-                elif isinstance(elem, bmesh.types.BMEdge):
-                    elem[tag_layer] = 0
-                    cut_verts.add(elem.verts[0])
-                    cut_verts.add(elem.verts[1])
-
-            # 两端都在切割平面上的边 → 清除标记（已有边在切割位置的情况）
-            for v in cut_verts:
-                for edge in v.link_edges:
-                    if edge.verts[0] in cut_verts and edge.verts[1] in cut_verts:
-                        edge[tag_layer] = 0
+        # ---- 一次插入全部交点，再逐面剖开 ----
+        positions = np.array(cut_positions, dtype=np.float64)
+        if len(positions):
+            self._split_edges(bm, positions, axis_of)
+            self._split_faces(bm, positions, axis_of, normal_local, tag_layer)
 
-            # ---- 确保切割线及相邻面保持选中 ----
-            # bisect_plane 分割面后，新面可能失去选中状态，
-            # 导致后续切割跳过这些区域
-            for elem in result['geom_cut']:
-                elem.select = True
-                if isinstance(elem, bmesh.types.BMVert):
-                    for face in elem.link_faces:
-                        face.select = True
-                    for edge in elem.link_edges:
-                        edge.select = True
-
-            cut_count += 1
+            # 正好落在切割位置上的旧边即切割线本身，清除标记保留下来
+            for edge in marked_edges:
+                coord = axis_of[edge.verts[0]]
+                nearest = int(np.searchsorted(positions, coord))
+                for plane in (nearest - 1, nearest):
+                    if 0 <= plane < len(positions) and abs(positions[plane] - coord) <= _PLANE_DIST:
+                        edge[tag_layer] = 0
+        cut_count = len(cut_positions)
 
         # ---- 溶解仍带标记的旧边 ----
         dissolved_count = 0
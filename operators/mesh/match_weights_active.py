@@ -1,5 +1,8 @@
 import bpy
 import bmesh
+import numpy as np
+
+from . import _weight_table
 
 
 class SHIYUME_OT_MatchWeightsActive(bpy.types.Operator):
@@ -32,17 +35,18 @@ class SHIYUME_OT_MatchWeightsActive(bpy.types.Operator):
         active_vert = bm.select_history.active if isinstance(bm.select_history.active, bmesh.types.BMVert) else None
 
         if active_vert:
-            active_weights = {group: weight for group, weight in active_vert[deform_layer].items()}
-
-            for vert in bm.verts:
-                if vert.select and vert != active_vert:
-                    vert_groups = {group: weight for group, weight in vert[deform_layer].items()}
-                    groups_to_remove = [group for group in vert_groups if group not in active_weights]
-                    for group in groups_to_remove:
-                        del vert[deform_layer][group]
-
-                    for group, weight in active_weights.items():
-                        vert[deform_layer][group] = weight
+            targets = [vert for vert in bm.verts if vert.select and vert != active_vert]
+            table = _weight_table.from_deform_layer([active_vert], deform_layer, len(obj.vertex_groups))
+            groups, weights = table.row(0)
+
+            # 激活点的整行权重复制到每个目标行，整行覆盖即删掉激活点没有的顶点组
+            matched = _weight_table.WeightTable(
+                table.group_count,
+                np.arange(len(targets) + 1, dtype=np.int64) * groups.shape[0],
+                np.tile(groups, len(targets)),
+                np.tile(weights, len(targets)),
+            )
+            _weight_table.write_deform_layer(targets, deform_layer, matched)
 
             bmesh.update_edit_mesh(obj.data)
 
@@ -1,17 +1,18 @@
 import bpy
 import bmesh
+import numpy as np
 
+from . import _weight_table
 
-def _snapshot_weights(vert, deform_layer):
-    return dict(vert[deform_layer].items())
 
-
-def _overwrite_weights(vert, deform_layer, weights):
-    """整组覆盖：先清空再写入，保证对方没有的顶点组不会在这一侧残留。"""
-    deform_weights = vert[deform_layer]
-    deform_weights.clear()
-    for group_index, weight in weights.items():
-        deform_weights[group_index] = weight
+def _reordered(table, rows):
+    """按 rows 的顺序重排表的行，得到一张新表（第 i 行取原表的 rows[i] 行）。"""
+    pieces = [table.row(row) for row in rows]
+    counts = [groups.shape[0] for groups, _weights in pieces]
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    groups = np.concatenate([groups for groups, _weights in pieces])
+    weights = np.concatenate([weights for _groups, weights in pieces])
+    return _weight_table.WeightTable(table.group_count, offsets, groups, weights)
 
 
 class _PairWeightOperatorBase:
@@ -56,7 +57,9 @@ class _PairWeightOperatorBase:
                 return {'CANCELLED'}
             first, second = selected
 
-        self.transfer_weights(first, second, deform_layer)
+        # 两个顶点各读一行；整行覆盖保证对方没有的顶点组不会在这一侧残留
+        table = _weight_table.from_deform_layer([first, second], deform_layer, len(obj.vertex_groups))
+        self.transfer_weights(first, second, deform_layer, table)
         bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
         return {'FINISHED'}
 
@@ -68,11 +71,8 @@ class SHIYUME_OT_SwapVertexWeights(_PairWeightOperatorBase, bpy.types.Operator):
     bl_idname = "shiyume.swap_vertex_weights"
     bl_label = "交换两点权重"
 
-    def transfer_weights(self, first, second, deform_layer):
-        first_weights = _snapshot_weights(first, deform_layer)
-        second_weights = _snapshot_weights(second, deform_layer)
-        _overwrite_weights(first, deform_layer, second_weights)
-        _overwrite_weights(second, deform_layer, first_weights)
+    def transfer_weights(self, first, second, deform_layer, table):
+        _weight_table.write_deform_layer([first, second], deform_layer, _reordered(table, [1, 0]))
 
 
 class SHIYUME_OT_CopyVertexWeights(_PairWeightOperatorBase, bpy.types.Operator):
@@ -85,5 +85,5 @@ class SHIYUME_OT_CopyVertexWeights(_PairWeightOperatorBase, bpy.types.Operator):
 
     requires_selection_order = True
 
-    def transfer_weights(self, source, target, deform_layer):
-        _overwrite_weights(target, deform_layer, _snapshot_weights(source, deform_layer))
+    def transfer_weights(self, source, target, deform_layer, table):
+        _weight_table.write_deform_layer([target], deform_layer, _reordered(table, [0]))
@@ -1,6 +1,15 @@
-import math
+import time
 
 import bpy
+import numpy as np
+
+from ._plane_locate import PlaneLocator
+
+# (key, point, corner, axis) elements gathered per einsum chunk
+_GATHER_BUDGET = 1 << 25
+
+# MeshUVLoopLayer flag collection -> prefix of its backing CORNER bool attribute
+_UV_FLAG_ATTRIBUTES = (("pin", "pn"), ("vertex_selection", "vs"), ("edge_selection", "es"))
 
 
 class SHIYUME_OT_TopologyCut(bpy.types.Operator):
@@ -23,13 +32,6 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
         min=0.000000001,
         description="二维点落在三角形内的判断容差",
     )
-    grid_size: bpy.props.IntProperty(
-        name="网格加速",
-        default=64,
-        min=8,
-        max=512,
-        description="二维三角查找使用的加速网格分辨率",
-    )
 
     @classmethod
     def poll(cls, context):
@@ -57,10 +59,12 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
 
     def _get_key_points_local(self, obj, key_name):
         mesh = obj.data
+        points = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
         if mesh.shape_keys and key_name in mesh.shape_keys.key_blocks:
-            key = mesh.shape_keys.key_blocks[key_name]
-            return [key.data[i].co.copy() for i in range(len(mesh.vertices))]
-        return [vert.co.copy() for vert in mesh.vertices]
+            mesh.shape_keys.key_blocks[key_name].data.foreach_get("co", points)
+        else:
+            mesh.vertices.foreach_get("co", points)
+        return points.reshape(-1, 3)
 
     def _has_shape_key(self, obj, key_name):
         return bool(obj.data.shape_keys and key_name in obj.data.shape_keys.key_blocks)
@@ -71,126 +75,23 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
         return [key.name for key in obj.data.shape_keys.key_blocks]
 
     def _world_points(self, obj, local_points):
-        mat = obj.matrix_world
-        return [mat @ point for point in local_points]
-
-    def _xy_tuple(self, vec):
-        return (vec.x, vec.y)
-
-    def _triangle_weights(self, point, a, b, c):
-        px, py = point
-        ax, ay = a
-        bx, by = b
-        cx, cy = c
-
-        det = (by - cy) * (ax - cx) + (cx - bx) * (ay - cy)
-        if abs(det) <= self.tolerance:
-            return None
-
-        w0 = ((by - cy) * (px - cx) + (cx - bx) * (py - cy)) / det
-        w1 = ((cy - ay) * (px - cx) + (ax - cx) * (py - cy)) / det
-        w2 = 1.0 - w0 - w1
-
-        if min(w0, w1, w2) < -self.tolerance:
-            return None
-        if max(w0, w1, w2) > 1.0 + self.tolerance:
-            return None
-        return (w0, w1, w2)
-
-    def _build_triangle_index(self, plane_points, triangles):
-        xs = [point[0] for point in plane_points]
-        ys = [point[1] for point in plane_points]
-        min_x = min(xs)
-        max_x = max(xs)
-        min_y = min(ys)
-        max_y = max(ys)
-
-        size_x = max(max_x - min_x, self.tolerance)
-        size_y = max(max_y - min_y, self.tolerance)
-        cell_size_x = size_x / self.grid_size
-        cell_size_y = size_y / self.grid_size
-
-        cells = {}
-        tri_boxes = []
-
-        for tri_index, tri in enumerate(triangles):
-            tri_points = [
-                plane_points[tri[0]],
-                plane_points[tri[1]],
-                plane_points[tri[2]],
-            ]
-            tri_min_x = min(point[0] for point in tri_points)
-            tri_max_x = max(point[0] for point in tri_points)
-            tri_min_y = min(point[1] for point in tri_points)
-            tri_max_y = max(point[1] for point in tri_points)
-            tri_boxes.append((tri_min_x, tri_max_x, tri_min_y, tri_max_y))
-
-            start_x = max(
-                0, min(self.grid_size - 1, int((tri_min_x - min_x) / cell_size_x))
-            )
-            end_x = max(
-                0, min(self.grid_size - 1, int((tri_max_x - min_x) / cell_size_x))
-            )
-            start_y = max(
-                0, min(self.grid_size - 1, int((tri_min_y - min_y) / cell_size_y))
-            )
-            end_y = max(
-                0, min(self.grid_size - 1, int((tri_max_y - min_y) / cell_size_y))
-            )
+        mat = np.array(obj.matrix_world, dtype=np.float64)
+        return local_points @ mat[:3, :3].T + mat[:3, 3]
 
-            for gx in range(start_x, end_x + 1):
-                for gy in range(start_y, end_y + 1):
-                    cells.setdefault((gx, gy), []).append(tri_index)
-
-        return {
-            "min_x": min_x,
-            "min_y": min_y,
-            "cell_x": cell_size_x,
-            "cell_y": cell_size_y,
-            "cells": cells,
-            "tri_boxes": tri_boxes,
-        }
-
-    def _candidate_triangles(self, point, index_data, triangle_count):
-        px, py = point
-        gx = int((px - index_data["min_x"]) / index_data["cell_x"])
-        gy = int((py - index_data["min_y"]) / index_data["cell_y"])
-        gx = max(0, min(self.grid_size - 1, gx))
-        gy = max(0, min(self.grid_size - 1, gy))
-
-        candidates = []
-        seen = set()
-        for radius in range(3):
-            found_any = False
-            for ix in range(
-                max(0, gx - radius), min(self.grid_size - 1, gx + radius) + 1
-            ):
-                for iy in range(
-                    max(0, gy - radius), min(self.grid_size - 1, gy + radius) + 1
-                ):
-                    for tri_index in index_data["cells"].get((ix, iy), []):
-                        if tri_index in seen:
-                            continue
-                        seen.add(tri_index)
-                        candidates.append(tri_index)
-                        found_any = True
-            if found_any:
-                return candidates
-
-        return list(range(triangle_count))
-
-    def _nearest_vertex_index(self, point, plane_points):
-        px, py = point
-        nearest_index = 0
-        nearest_dist = math.inf
-        for index, (vx, vy) in enumerate(plane_points):
-            dist = (vx - px) * (vx - px) + (vy - py) * (vy - py)
-            if dist < nearest_dist:
-                nearest_dist = dist
-                nearest_index = index
-        return nearest_index
-
-    def _build_sampler(self, target):
+    def _read_key_block(self, obj, key_names):
+        """Read every key once into a (K, V, 3) block; "__mesh__" means the mesh coordinates."""
+        mesh = obj.data
+        vertex_count = len(mesh.vertices)
+        block = np.empty((len(key_names), vertex_count * 3), dtype=np.float32)
+        for index, key_name in enumerate(key_names):
+            if key_name == "__mesh__":
+                mesh.vertices.foreach_get("co", block[index])
+            else:
+                mesh.shape_keys.key_blocks[key_name].data.foreach_get("co", block[index])
+        return block.reshape(len(key_names), vertex_count, 3)
+
+    def _build_gather(self, target, points_2d):
+        """Locate every sample point once: (P, 3) target vertex ids plus (P, 3) weights."""
         mesh = target.data
         mesh.calc_loop_triangles()
         if not mesh.loop_triangles:
@@ -199,65 +100,23 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
             return None, f"目标网格缺少 Shape Key: {self.flat_key_name}"
 
         flat_local = self._get_key_points_local(target, self.flat_key_name)
-        flat_world = self._world_points(target, flat_local)
-        flat_plane = [self._xy_tuple(point) for point in flat_world]
-
-        triangles = [tuple(loop_tri.vertices) for loop_tri in mesh.loop_triangles]
-        triangle_index = self._build_triangle_index(flat_plane, triangles)
-
-        key_names = self._get_all_shape_key_names(target)
-        if not key_names:
-            key_names = ["__mesh__"]
-
-        key_values = {}
-        for key_name in key_names:
-            local_points = self._get_key_points_local(
-                target, key_name if key_name != "__mesh__" else self.flat_key_name
-            )
-            if key_name == "__mesh__":
-                local_points = [vert.co.copy() for vert in mesh.vertices]
-            key_values[key_name] = local_points
-
-        def sample(point_2d, key_name):
-            candidates = self._candidate_triangles(
-                point_2d, triangle_index, len(triangles)
-            )
-            values = key_values[key_name]
-
-            for tri_index in candidates:
-                tri = triangles[tri_index]
-                tri_box = triangle_index["tri_boxes"][tri_index]
-                if (
-                    point_2d[0] < tri_box[0] - self.tolerance
-                    or point_2d[0] > tri_box[1] + self.tolerance
-                ):
-                    continue
-                if (
-                    point_2d[1] < tri_box[2] - self.tolerance
-                    or point_2d[1] > tri_box[3] + self.tolerance
-                ):
-                    continue
+        flat_plane = self._world_points(target, flat_local)[:, :2]
 
-                a = flat_plane[tri[0]]
-                b = flat_plane[tri[1]]
-                c = flat_plane[tri[2]]
-                weights = self._triangle_weights(point_2d, a, b, c)
-                if weights is None:
-                    continue
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+        locator = PlaneLocator(flat_plane, triangles.reshape(-1, 3), self.tolerance)
 
-                return (
-                    values[tri[0]] * weights[0]
-                    + values[tri[1]] * weights[1]
-                    + values[tri[2]] * weights[2]
-                )
+        # 落在三角形外的点已被换成最近顶点、权重 (1, 0, 0)
+        point_vertices, point_weights, _found = locator.locate(points_2d)
+        return (point_vertices, point_weights), None
 
-            nearest_index = self._nearest_vertex_index(point_2d, flat_plane)
-            return values[nearest_index].copy()
-
-        return (
-            sample,
-            key_names,
-        ), None
+    def _iter_gathered(self, key_block, point_vertices, point_weights):
+        """Yield (first key index, (k, P, 3) coords) in key chunks that fit _GATHER_BUDGET."""
+        key_count, point_count = key_block.shape[0], point_vertices.shape[0]
+        step = max(1, _GATHER_BUDGET // max(1, point_count * 9))
+        for first in range(0, key_count, step):
+            corners = key_block[first:first + step, point_vertices]
+            yield first, np.einsum("kpjc,pj->kpc", corners, point_weights).astype(np.float32)
 
     def _copy_shape_key_settings(self, old_shape_keys, new_obj):
         new_shape_keys = new_obj.data.shape_keys
@@ -307,21 +166,33 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
             0,
         )
 
-        for source_layer in source_mesh.uv_layers:
+        # The rebuilt mesh reuses the reference faces in order, so loop i maps to loop i.
+        loop_count = len(source_mesh.loops)
+        layer_count = len(source_mesh.uv_layers)
+        uv_block = np.empty((layer_count, loop_count * 2), dtype=np.float32)
+        for index, source_layer in enumerate(source_mesh.uv_layers):
+            source_layer.data.foreach_get("uv", uv_block[index])
+
+        flags = np.empty(loop_count, dtype=bool)
+        for index, source_layer in enumerate(source_mesh.uv_layers):
             new_layer = new_mesh.uv_layers.new(name=source_layer.name)
-            for loop_index, source_uv in enumerate(source_layer.uv):
-                new_uv = new_layer.uv[loop_index]
-                new_uv.vector = source_uv.vector.copy()
-                if hasattr(new_uv, "pin") and hasattr(source_uv, "pin"):
-                    new_uv.pin = source_uv.pin
-                if hasattr(new_uv, "vertex_selection") and hasattr(
-                    source_uv, "vertex_selection"
-                ):
-                    new_uv.vertex_selection = source_uv.vertex_selection
-                if hasattr(new_uv, "edge_selection") and hasattr(
-                    source_uv, "edge_selection"
-                ):
-                    new_uv.edge_selection = source_uv.edge_selection
+            new_layer.data.foreach_set("uv", uv_block[index])
+            new_name = new_layer.name
+            # Pin / UV selection live in optional ".pn." / ".vs." / ".es." bool attributes that a
+            # fresh layer does not have yet, so create them before writing. Adding attributes
+            # reallocates the layer array; new_layer is not used past this point.
+            for flag_name, prefix in _UV_FLAG_ATTRIBUTES:
+                source_flags = getattr(source_layer, flag_name, None)
+                if source_flags is None or len(source_flags) != loop_count:
+                    continue
+                source_flags.foreach_get("value", flags)
+                if not flags.any():
+                    continue
+                attribute_name = f".{prefix}.{new_name}"
+                attribute = new_mesh.attributes.get(attribute_name)
+                if attribute is None:
+                    attribute = new_mesh.attributes.new(attribute_name, 'BOOLEAN', 'CORNER')
+                attribute.data.foreach_set("value", flags)
 
         if new_mesh.uv_layers:
             new_mesh.uv_layers.active_index = min(
@@ -336,58 +207,56 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
         if not self._has_shape_key(source, self.flat_key_name):
             return None, f"参考网格缺少 Shape Key: {self.flat_key_name}"
 
-        sampler_data, error = self._build_sampler(target)
+        source_flat_local = self._get_key_points_local(source, self.flat_key_name)
+        source_plane = self._world_points(source, source_flat_local)[:, :2]
+
+        gather, error = self._build_gather(target, source_plane)
         if error is not None:
             return None, error
 
-        sample, key_names = sampler_data
-
-        source_flat_local = self._get_key_points_local(source, self.flat_key_name)
-        source_flat_world = self._world_points(source, source_flat_local)
-        source_plane = [self._xy_tuple(point) for point in source_flat_world]
+        point_vertices, point_weights = gather
+        key_names = self._get_all_shape_key_names(target) or ["__mesh__"]
+        key_block = self._read_key_block(target, key_names)
 
         source_faces = [list(poly.vertices) for poly in source.data.polygons]
         source_loose_edges = [
             list(edge.vertices) for edge in source.data.edges if edge.is_loose
         ]
 
-        sampled_points = {}
-        for key_name in key_names:
-            sampled_points[key_name] = [
-                sample(point_2d, key_name) for point_2d in source_plane
-            ]
-
         old_mesh = target.data
         old_shape_keys = old_mesh.shape_keys
         old_materials = list(old_mesh.materials)
         old_name = old_mesh.name
 
-        basis_name = (
-            key_names[0] if key_names and key_names[0] != "__mesh__" else "Basis"
+        # The first key doubles as the mesh coordinates of the rebuilt topology.
+        _first, basis = next(
+            self._iter_gathered(key_block[:1], point_vertices, point_weights)
         )
-        basis_points = sampled_points.get(basis_name)
-        if basis_points is None:
-            basis_points = sampled_points[key_names[0]]
 
         new_mesh = bpy.data.meshes.new(old_name + "_topology")
-        new_mesh.from_pydata(basis_points, source_loose_edges, source_faces)
+        new_mesh.from_pydata(basis[0], source_loose_edges, source_faces)
         new_mesh.update()
+        started = time.perf_counter()
         self._copy_uv_layers(source.data, new_mesh)
+        self._uv_copy_seconds = time.perf_counter() - started
 
         for material in old_materials:
             new_mesh.materials.append(material)
 
         target.data = new_mesh
 
-        if key_names and key_names[0] != "__mesh__":
-            created_basis = target.shape_key_add(name=key_names[0], from_mix=False)
-            for index, coord in enumerate(sampled_points[key_names[0]]):
-                created_basis.data[index].co = coord
-
-            for key_name in key_names[1:]:
-                new_key = target.shape_key_add(name=key_name, from_mix=False)
-                for index, coord in enumerate(sampled_points[key_name]):
-                    new_key.data[index].co = coord
+        if key_names[0] != "__mesh__":
+            new_keys = [
+                target.shape_key_add(name=key_name, from_mix=False)
+                for key_name in key_names
+            ]
+            new_keys[0].data.foreach_set("co", basis.reshape(-1))
+            rest = self._iter_gathered(key_block[1:], point_vertices, point_weights)
+            for first, coords in rest:
+                for offset, key_coords in enumerate(coords):
+                    new_keys[1 + first + offset].data.foreach_set(
+                        "co", key_coords.reshape(-1)
+                    )
 
             if old_shape_keys:
                 self._copy_shape_key_settings(old_shape_keys, target)
@@ -403,10 +272,15 @@ class SHIYUME_OT_TopologyCut(bpy.types.Operator):
             self.report({"ERROR"}, "请选择 2 个网格，并将目标网格设为活动物体")
             return {"CANCELLED"}
 
+        self._uv_copy_seconds = 0.0
         count, error = self._rebuild_target(source, target)
         if error is not None:
             self.report({"ERROR"}, error)
             return {"CANCELLED"}
 
-        self.report({"INFO"}, f"目标网格已重建为参考拓扑，共 {count} 个顶点")
+        self.report(
+            {"INFO"},
+            f"目标网格已重建为参考拓扑，共 {count} 个顶点"
+            f"（UV 复制 {self._uv_copy_seconds:.2f} 秒）",
+        )
         return {"FINISHED"}
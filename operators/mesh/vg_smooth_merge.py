@@ -1,5 +1,101 @@
 import bpy
 import bmesh
+import numpy as np
+
+from . import _weight_table
+
+try:
+    from mathutils.kdtree import KDTree
+except ImportError:
+    KDTree = None
+
+# 网格哈希的格子数上限（按轴）；阈值相对包围盒过小时放大格子，只会多出候选、不会漏
+_GRID_AXIS_LIMIT = 1 << 20
+
+
+def _close_pairs_kdtree(points, radius):
+    tree = KDTree(points.shape[0])
+    for index, co in enumerate(points.tolist()):
+        tree.insert(co, index)
+    tree.balance()
+
+    first, second = [], []
+    for index, co in enumerate(points.tolist()):
+        for _co, other, distance in tree.find_range(co, radius):
+            if other > index and distance < radius:
+                first.append(index)
+                second.append(other)
+    return np.array(first, dtype=np.int64), np.array(second, dtype=np.int64)
+
+
+def _close_pairs_grid(points, radius):
+    """纯 numpy 网格哈希：每个点只和自身及相邻 26 个格子里的点比距离。"""
+    low = points.min(axis=0)
+    span = points.max(axis=0) - low
+    cell = max(radius, float(span.max()) / _GRID_AXIS_LIMIT, 1e-12)
+    coords = np.floor((points - low) / cell).astype(np.int64) + 1
+    dims = coords.max(axis=0) + 2
+
+    keys = (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # 查询键按排好序的顺序给出，searchsorted 顺序访问，比乱序查询快一个量级
+    first, second = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                neighbour = sorted_keys + (dx * dims[1] + dy) * dims[2] + dz
+                start = np.searchsorted(sorted_keys, neighbour, side='left')
+                count = np.searchsorted(sorted_keys, neighbour, side='right') - start
+                slots = np.repeat(np.arange(points.shape[0], dtype=np.int64), count)
+                offsets = np.arange(slots.shape[0]) - np.repeat(np.cumsum(count) - count, count)
+                owners = order[slots]
+                others = order[start[slots] + offsets]
+                keep = others > owners
+                owners, others = owners[keep], others[keep]
+                close = ((points[owners] - points[others]) ** 2).sum(axis=1) < radius * radius
+                first.append(owners[close])
+                second.append(others[close])
+    return np.concatenate(first), np.concatenate(second)
+
+
+def close_pairs(points, radius):
+    """返回距离小于 radius 的全部点对 (i, j)，i < j；有 mathutils 时用 KDTree。"""
+    if points.shape[0] < 2 or radius <= 0.0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    if KDTree is not None:
+        return _close_pairs_kdtree(points, radius)
+    return _close_pairs_grid(points, radius)
+
+
+def pair_targets(points, first, second):
+    """旧的两两比较结果：每个点移到它与「下标最大的近邻」的中点。返回 (点下标, 目标)。"""
+    partner = np.full(points.shape[0], -1, dtype=np.int64)
+    np.maximum.at(partner, first, second)
+    np.maximum.at(partner, second, first)
+    moved = np.nonzero(partner >= 0)[0]
+    return moved, (points[moved] + points[partner[moved]]) * 0.5
+
+
+def weighted_targets(points, weights, first, second):
+    """每个点移到自身与全部近邻按顶点组权重加权的平均位置（稀疏矩阵 × 向量）。"""
+    count = points.shape[0]
+    weights = weights.astype(np.float64)
+    total = weights.copy()
+    total += np.bincount(first, weights=weights[second], minlength=count)
+    total += np.bincount(second, weights=weights[first], minlength=count)
+
+    weighted = points * weights[:, None]
+    to_first = points[second] * weights[second, None]
+    to_second = points[first] * weights[first, None]
+    for axis in range(3):
+        weighted[:, axis] += np.bincount(first, weights=to_first[:, axis], minlength=count)
+        weighted[:, axis] += np.bincount(second, weights=to_second[:, axis], minlength=count)
+
+    moved = np.unique(np.concatenate((first, second)))
+    return moved, weighted[moved] / total[moved, None]
 
 
 class SHIYUME_OT_VGSmoothMerge(bpy.types.Operator):
@@ -14,6 +110,14 @@ class SHIYUME_OT_VGSmoothMerge(bpy.types.Operator):
     distance_threshold: bpy.props.FloatProperty(name="距离阈值", default=0.001, min=0.0, precision=5)
     vertex_group_name: bpy.props.StringProperty(name="顶点组名", default="Edge")
     min_weight: bpy.props.FloatProperty(name="最小权重", default=0.1, min=0.0, max=1.0)
+    merge_mode: bpy.props.EnumProperty(
+        name="合并方式",
+        items=[
+            ('PAIR', "两两中点", "每个顶点移到它与一个近邻的中点（原有行为）"),
+            ('WEIGHTED', "加权平均", "每个顶点移到自身与所有近邻按顶点组权重加权的平均位置"),
+        ],
+        default='PAIR',
+    )
 
     @classmethod
     def poll(cls, context):
@@ -33,32 +137,30 @@ class SHIYUME_OT_VGSmoothMerge(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='OBJECT')
             return {'CANCELLED'}
 
-        vg = obj.vertex_groups[vertex_group_index]
-
-        vertex_move_targets = {}
+        deform_layer = bm.verts.layers.deform.active
+        if deform_layer is None:
+            weights = np.zeros(len(bm.verts), dtype=np.float32)
+        else:
+            table = _weight_table.from_deform_layer(bm.verts, deform_layer, len(obj.vertex_groups))
+            weights = table.column(vertex_group_index)
 
-        def get_vertex_weight(vertex, group_index):
-            for g in vertex.groups:
-                if g.group == group_index:
-                    return g.weight
-            return 0.0
+        # 只有两端权重都超过阈值的顶点对才可能合并，先筛出候选，再用空间索引找近邻对
+        bm.verts.ensure_lookup_table()
+        candidates = np.nonzero(weights > self.min_weight)[0]
+        points = np.array([bm.verts[i].co[:] for i in candidates.tolist()],
+                          dtype=np.float64).reshape(-1, 3)
+        first, second = close_pairs(points, self.distance_threshold)
 
-        for vert1 in bm.verts:
-            for vert2 in bm.verts:
-                if vert1 != vert2:
-                    weight1 = get_vertex_weight(obj.data.vertices[vert1.index], vertex_group_index)
-                    weight2 = get_vertex_weight(obj.data.vertices[vert2.index], vertex_group_index)
-                    if weight1 > self.min_weight and weight2 > self.min_weight:
-                        distance = (vert1.co - vert2.co).length
-                        if distance < self.distance_threshold:
-                            target_position = (vert1.co + vert2.co) * 0.5
-                            vertex_move_targets[vert1] = target_position
-                            vertex_move_targets[vert2] = target_position
+        if self.merge_mode == 'WEIGHTED':
+            moved, targets = weighted_targets(points, weights[candidates], first, second)
+        else:
+            moved, targets = pair_targets(points, first, second)
 
-        for vert, target in vertex_move_targets.items():
-            vert.co = target
+        for index, target in zip(candidates[moved].tolist(), targets.tolist()):
+            bm.verts[index].co = target
 
         bmesh.update_edit_mesh(me)
         bpy.ops.object.mode_set(mode='OBJECT')
 
+        self.report({'INFO'}, f"合并了 {len(first)} 对顶点，移动 {len(moved)} 个顶点")
         return {'FINISHED'}
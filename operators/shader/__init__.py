@@ -1,4 +1,5 @@
 import bpy
+from . import _normal_map_bake
 from . import normal_expansion
 from . import normal_map_to_mesh
 from . import mesh_to_normal_map
@@ -14,7 +15,9 @@ classes = (
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    _normal_map_bake.register_handlers()
 
 def unregister():
+    _normal_map_bake.unregister_handlers()
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
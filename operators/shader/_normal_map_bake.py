@@ -4,11 +4,15 @@
 节点查找、像素读写、切线基底提取，从而保证两者互为精确逆变换：
 反向取 `ts = TBNᵀ · os`，正向取 `os = TBN · ts`，TBN 正交 → 往返无损。
 
-本模块只放无副作用的纯工具函数，不注册任何算子。
+正向采样提供最近邻、双线性、按 loop 的 UV 覆盖范围选 mip 层的区域平均三种方式；
+解码后的像素与 mip 金字塔可按图像缓存，图像有更新或重新载入文件时作废。
+
+本模块不注册任何算子，只有缓存作废用的 depsgraph / load_post 回调。
 """
 
 import bpy
 import numpy
+from bpy.app.handlers import persistent
 
 
 def find_normal_image_node(material):
@@ -52,6 +56,67 @@ def write_image_pixels(image, pixel_matrix):
     """把 (height, width, 4) 数组极速写回图像并刷新。"""
     image.pixels.foreach_set(numpy.ascontiguousarray(pixel_matrix, dtype=numpy.float32).reshape(-1))
     image.update()
+    invalidate_image(image)
+
+
+# 图像数据指针 -> {"size": (w, h), "pixels": 像素矩阵, "pyramid": mip 金字塔或 None}
+_IMAGE_CACHE = {}
+
+
+def _image_entry(image):
+    key = image.as_pointer()
+    entry = _IMAGE_CACHE.get(key)
+    if entry is None or entry["size"] != tuple(image.size):
+        entry = {"size": tuple(image.size), "pixels": read_image_pixels(image), "pyramid": None}
+        _IMAGE_CACHE[key] = entry
+    return entry
+
+
+def cached_image_pixels(image):
+    """带缓存的 read_image_pixels；返回的数组与缓存共享，调用方不要原地改写。"""
+    return _image_entry(image)["pixels"]
+
+
+def cached_mip_pyramid(image):
+    """带缓存的 build_mip_pyramid，同一张图只建一次。"""
+    entry = _image_entry(image)
+    if entry["pyramid"] is None:
+        entry["pyramid"] = build_mip_pyramid(entry["pixels"])
+    return entry["pyramid"]
+
+
+def invalidate_image(image):
+    _IMAGE_CACHE.pop(image.as_pointer(), None)
+
+
+@persistent
+def _depsgraph_update_handler(scene, depsgraph):
+    if not _IMAGE_CACHE:
+        return
+    for update in depsgraph.updates:
+        data = getattr(update.id, "original", update.id)
+        if isinstance(data, bpy.types.Image):
+            _IMAGE_CACHE.pop(data.as_pointer(), None)
+
+
+@persistent
+def _load_post_handler(_dummy):
+    _IMAGE_CACHE.clear()
+
+
+def register_handlers():
+    if _depsgraph_update_handler not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_depsgraph_update_handler)
+    if _load_post_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_load_post_handler)
+
+
+def unregister_handlers():
+    if _depsgraph_update_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_depsgraph_update_handler)
+    if _load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_load_post_handler)
+    _IMAGE_CACHE.clear()
 
 
 def clear_custom_split_normals(context, obj):
@@ -132,3 +197,121 @@ def normalize_rows(vectors):
     lengths = numpy.linalg.norm(vectors, axis=1, keepdims=True)
     lengths[lengths == 0.0] = 1.0
     return vectors / lengths
+
+
+def write_custom_normals(mesh, loop_normals):
+    """把 (loop_count, 3) 的角法线整体写成自定义法线并刷新网格。
+
+    直接把连续的 float32 数组交给 RNA，不再经 tolist() 复制出一份 Python 浮点列表；
+    个别版本不认数组参数时才退回列表。
+    """
+    buffer = numpy.ascontiguousarray(loop_normals, dtype=numpy.float32).reshape((-1, 3))
+    try:
+        mesh.normals_split_custom_set(buffer)
+    except (TypeError, ValueError):
+        mesh.normals_split_custom_set(buffer.tolist())
+    mesh.update()
+
+
+def write_custom_vertex_normals(mesh, vertex_normals):
+    """把 (vertex_count, 3) 的顶点法线整体写成自定义法线（同一顶点的角共用一条），刷新网格。"""
+    buffer = numpy.ascontiguousarray(vertex_normals, dtype=numpy.float32).reshape((-1, 3))
+    try:
+        mesh.normals_split_custom_set_from_vertices(buffer)
+    except (TypeError, ValueError):
+        mesh.normals_split_custom_set_from_vertices(buffer.tolist())
+    mesh.update()
+
+
+# -- 采样 ---------------------------------------------------------------------
+#
+# 像素约定与反向烘焙一致：纹素中心落在 uv * size - 0.5 的整数坐标上，UV 按 REPEAT 环绕。
+
+
+def sample_nearest(pixel_matrix, uvs):
+    """最近邻采样，返回 (N, 4)。"""
+    height, width = pixel_matrix.shape[:2]
+    column = numpy.clip((numpy.mod(uvs[:, 0], 1.0) * width).astype(numpy.int32), 0, width - 1)
+    row = numpy.clip((numpy.mod(uvs[:, 1], 1.0) * height).astype(numpy.int32), 0, height - 1)
+    return pixel_matrix[row, column]
+
+
+def sample_bilinear(pixel_matrix, uvs):
+    """双线性采样（四邻纹素加权，边界环绕），返回 (N, 4)。"""
+    height, width = pixel_matrix.shape[:2]
+    x = numpy.mod(uvs[:, 0].astype(numpy.float64), 1.0) * width - 0.5
+    y = numpy.mod(uvs[:, 1].astype(numpy.float64), 1.0) * height - 0.5
+    x0 = numpy.floor(x)
+    y0 = numpy.floor(y)
+    fraction_x = (x - x0).astype(numpy.float32)[:, None]
+    fraction_y = (y - y0).astype(numpy.float32)[:, None]
+
+    column0 = numpy.mod(x0.astype(numpy.int64), width)
+    column1 = numpy.mod(column0 + 1, width)
+    row0 = numpy.mod(y0.astype(numpy.int64), height)
+    row1 = numpy.mod(row0 + 1, height)
+
+    flat = pixel_matrix.reshape((-1, 4))
+    top = flat[row0 * width + column0] * (1.0 - fraction_x) + flat[row0 * width + column1] * fraction_x
+    bottom = flat[row1 * width + column0] * (1.0 - fraction_x) + flat[row1 * width + column1] * fraction_x
+    return top * (1.0 - fraction_y) + bottom * fraction_y
+
+
+def build_mip_pyramid(pixel_matrix):
+    """逐级 2×2 平均下采样到 1×1，返回 [第 0 级（原图）, 第 1 级, ...]；奇数边补一行/列边缘像素。"""
+    levels = [pixel_matrix]
+    current = pixel_matrix
+    while current.shape[0] > 1 or current.shape[1] > 1:
+        height, width = current.shape[:2]
+        if height > 1 and height % 2:
+            current = numpy.concatenate((current, current[-1:]), axis=0)
+        if width > 1 and width % 2:
+            current = numpy.concatenate((current, current[:, -1:]), axis=1)
+        step_y = 2 if height > 1 else 1
+        step_x = 2 if width > 1 else 1
+        current = current.reshape(
+            (current.shape[0] // step_y, step_y, current.shape[1] // step_x, step_x, 4)
+        ).mean(axis=(1, 3), dtype=numpy.float32)
+        levels.append(current)
+    return levels
+
+
+def sample_area(pyramid, uvs, footprints):
+    """区域平均采样：footprints 为每个 loop 在第 0 级上覆盖的像素宽度，按 log2 选 mip 层。
+
+    相邻两层各做一次双线性再按小数部分线性混合（三线性），返回 (N, 4)。
+    """
+    level = numpy.clip(numpy.log2(numpy.maximum(footprints, 1.0)), 0.0, len(pyramid) - 1)
+    lower = numpy.floor(level).astype(numpy.int64)
+    blend = (level - lower).astype(numpy.float32)[:, None]
+
+    result = numpy.empty((uvs.shape[0], 4), dtype=numpy.float32)
+    for index in numpy.unique(lower).tolist():
+        members = numpy.nonzero(lower == index)[0]
+        member_uvs = uvs[members]
+        sampled = sample_bilinear(pyramid[index], member_uvs)
+        if index + 1 < len(pyramid):
+            upper = sample_bilinear(pyramid[index + 1], member_uvs)
+            sampled = sampled + (upper - sampled) * blend[members]
+        result[members] = sampled
+    return result
+
+
+def read_loop_footprints(mesh, uvs, width, height):
+    """每个 loop 的 UV 覆盖范围（像素）：取它在面内前后两条 UV 边中较长者的一半。"""
+    face_count = len(mesh.polygons)
+    loop_start = numpy.empty(face_count, dtype=numpy.int64)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    loop_total = numpy.empty(face_count, dtype=numpy.int64)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+
+    following = numpy.arange(1, uvs.shape[0] + 1, dtype=numpy.int64)
+    following[loop_start + loop_total - 1] = loop_start
+    preceding = numpy.empty_like(following)
+    preceding[following] = numpy.arange(uvs.shape[0], dtype=numpy.int64)
+
+    scale = numpy.array((width, height), dtype=numpy.float64)
+    pixels = uvs.astype(numpy.float64) * scale
+    next_length = numpy.linalg.norm(pixels[following] - pixels, axis=1)
+    previous_length = numpy.linalg.norm(pixels[preceding] - pixels, axis=1)
+    return numpy.maximum(next_length, previous_length) * 0.5
@@ -2,6 +2,17 @@ import bpy
 import numpy
 
 from . import _normal_map_bake as bake_common
+from .. import _distance_transform
+
+# 包围盒不超过这么多像素的三角形直接整盒展开；更大的切成 _RASTER_TILE 见方的块
+_SMALL_TRIANGLE_AREA = 256
+_RASTER_TILE = 32
+
+# 一次展开的候选像素数上限
+_RASTER_BUDGET = 1 << 22
+
+# 留极小负容差，避免相邻三角形共享边上出现一像素裂缝。
+_EDGE_EPSILON = -1e-4
 
 
 class SHIYUME_OT_MeshToNormalMap(bpy.types.Operator):
@@ -169,119 +180,190 @@ def _new_flat_buffer(width, height):
 
 
 def _rasterize_into(mesh, tangent_space, pixel_x, pixel_y, width, height, flip_green, pixel_matrix, coverage):
-    """逐三角形把切线空间法线 barycentric 光栅化进已有的像素矩阵 / 覆盖掩码。
-
-    每个三角形的包围盒很小，内部用 NumPy 向量化求 barycentric，是 Python 层唯一的循环。
-    """
+    """把切线空间法线 barycentric 光栅化进已有的像素矩阵 / 覆盖掩码，全部三角形批量处理。"""
     mesh.calc_loop_triangles()
     triangle_count = len(mesh.loop_triangles)
     triangle_loops = numpy.empty(triangle_count * 3, dtype=numpy.int32)
     mesh.loop_triangles.foreach_get("loops", triangle_loops)
     triangle_loops = triangle_loops.reshape((triangle_count, 3))
 
-    for index0, index1, index2 in triangle_loops:
-        _fill_triangle(
-            pixel_matrix, coverage,
-            pixel_x[index0], pixel_y[index0],
-            pixel_x[index1], pixel_y[index1],
-            pixel_x[index2], pixel_y[index2],
-            tangent_space[index0], tangent_space[index1], tangent_space[index2],
-            width, height, flip_green,
-        )
+    rasterize_triangles(
+        pixel_x[triangle_loops], pixel_y[triangle_loops], tangent_space[triangle_loops],
+        width, height, flip_green, pixel_matrix, coverage,
+    )
 
 
-def _fill_triangle(pixel_matrix, coverage, x0, y0, x1, y1, x2, y2, normal0, normal1, normal2, width, height, flip_green):
-    """填充单个三角形覆盖到的所有纹素：barycentric 插值切线空间法线 → 编码写入。"""
-    min_column = max(int(numpy.floor(min(x0, x1, x2))), 0)
-    max_column = min(int(numpy.ceil(max(x0, x1, x2))), width - 1)
-    min_row = max(int(numpy.floor(min(y0, y1, y2))), 0)
-    max_row = min(int(numpy.ceil(max(y0, y1, y2))), height - 1)
-    if min_column > max_column or min_row > max_row:
-        return
+def _edge_coefficients(corners_x, corners_y):
+    """逐三角形预先算好重心权重公式里与采样点无关的各项，退化三角形的倒数为 inf。"""
+    x0, x1, x2 = corners_x
+    y0, y1, y2 = corners_y
+    with numpy.errstate(divide='ignore'):
+        inverse = 1.0 / ((y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2))
+    return y1 - y2, x2 - x1, y2 - y0, x0 - x2, x2, y2, inverse
+
+
+def _barycentric(coefficients, sample_x, sample_y):
+    """逐行求采样点的重心权重；coefficients 为 _edge_coefficients 的结果（已按行取好）。"""
+    a0, b0, a1, b1, x2, y2, inverse = coefficients
+    offset_x = sample_x - x2
+    offset_y = sample_y - y2
+    weight0 = (a0 * offset_x + b0 * offset_y) * inverse
+    weight1 = (a1 * offset_x + b1 * offset_y) * inverse
+    return weight0, weight1, 1.0 - weight0 - weight1
+
+
+def _take(columns, index):
+    """按下标从每个一维列里取值；列先拆成连续数组，比对 (N, 3) 整行花式索引快得多。"""
+    return tuple(column[index] for column in columns)
 
-    denominator = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
-    if abs(denominator) < 1e-12:
-        return
-    inverse = 1.0 / denominator
-
-    columns = numpy.arange(min_column, max_column + 1)
-    rows = numpy.arange(min_row, max_row + 1)
-    grid_column, grid_row = numpy.meshgrid(columns, rows)
-    sample_x = grid_column.astype(numpy.float32)
-    sample_y = grid_row.astype(numpy.float32)
-
-    weight0 = ((y1 - y2) * (sample_x - x2) + (x2 - x1) * (sample_y - y2)) * inverse
-    weight1 = ((y2 - y0) * (sample_x - x2) + (x0 - x2) * (sample_y - y2)) * inverse
-    weight2 = 1.0 - weight0 - weight1
-
-    # 留极小负容差，避免相邻三角形共享边上出现一像素裂缝。
-    epsilon = -1e-4
-    inside = (weight0 >= epsilon) & (weight1 >= epsilon) & (weight2 >= epsilon)
-    if not inside.any():
-        return
 
-    selected_rows = grid_row[inside]
-    selected_columns = grid_column[inside]
-    bary0 = weight0[inside]
-    bary1 = weight1[inside]
-    bary2 = weight2[inside]
+def _triangle_rectangles(corners_x, corners_y, coefficients, width, height):
+    """每个三角形的像素包围盒，大三角形切块并剔除整块落在某条边外侧的块。
+
+    返回 (三角形下标, 起始列, 起始行, 列数, 行数)，按三角形下标升序。
+    """
+    x0, x1, x2 = corners_x
+    y0, y1, y2 = corners_y
+    min_column = numpy.maximum(numpy.floor(numpy.minimum(numpy.minimum(x0, x1), x2)).astype(numpy.int64), 0)
+    max_column = numpy.minimum(numpy.ceil(numpy.maximum(numpy.maximum(x0, x1), x2)).astype(numpy.int64), width - 1)
+    min_row = numpy.maximum(numpy.floor(numpy.minimum(numpy.minimum(y0, y1), y2)).astype(numpy.int64), 0)
+    max_row = numpy.minimum(numpy.ceil(numpy.maximum(numpy.maximum(y0, y1), y2)).astype(numpy.int64), height - 1)
+
+    denominator = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+    usable = (min_column <= max_column) & (min_row <= max_row) & (numpy.abs(denominator) >= 1e-12)
+
+    columns = max_column - min_column + 1
+    rows = max_row - min_row + 1
+    small = usable & (columns * rows <= _SMALL_TRIANGLE_AREA)
+    large = numpy.nonzero(usable & ~small)[0]
+    small = numpy.nonzero(small)[0]
+
+    # 大三角形：按块展开，四个角都在同一条边外侧的块不可能含内部像素
+    tiles_x = (columns[large] + _RASTER_TILE - 1) // _RASTER_TILE
+    tiles_y = (rows[large] + _RASTER_TILE - 1) // _RASTER_TILE
+    tile_counts = tiles_x * tiles_y
+    tile_owner = numpy.repeat(large, tile_counts)
+    tile_local = numpy.arange(tile_owner.shape[0], dtype=numpy.int64) - numpy.repeat(
+        numpy.cumsum(tile_counts) - tile_counts, tile_counts)
+    tile_x = numpy.repeat(tiles_x, tile_counts)
+    tile_column = min_column[tile_owner] + (tile_local % tile_x) * _RASTER_TILE
+    tile_row = min_row[tile_owner] + (tile_local // tile_x) * _RASTER_TILE
+    tile_columns = numpy.minimum(max_column[tile_owner] - tile_column + 1, _RASTER_TILE)
+    tile_rows = numpy.minimum(max_row[tile_owner] - tile_row + 1, _RASTER_TILE)
+
+    outside = numpy.ones((tile_owner.shape[0], 3), dtype=numpy.bool_)
+    for corner_column, corner_row in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        weights = _barycentric(
+            _take(coefficients, tile_owner),
+            tile_column + corner_column * (tile_columns - 1),
+            tile_row + corner_row * (tile_rows - 1),
+        )
+        for edge, weight in enumerate(weights):
+            outside[:, edge] &= weight < _EDGE_EPSILON
+    kept = ~outside.any(axis=1)
+
+    owners = numpy.concatenate((small, tile_owner[kept]))
+    order = numpy.argsort(owners, kind='stable')
+    return (
+        owners[order],
+        numpy.concatenate((min_column[small], tile_column[kept]))[order],
+        numpy.concatenate((min_row[small], tile_row[kept]))[order],
+        numpy.concatenate((columns[small], tile_columns[kept]))[order],
+        numpy.concatenate((rows[small], tile_rows[kept]))[order],
+    )
 
-    interp_x = bary0 * normal0[0] + bary1 * normal1[0] + bary2 * normal2[0]
-    interp_y = bary0 * normal0[1] + bary1 * normal1[1] + bary2 * normal2[1]
-    interp_z = bary0 * normal0[2] + bary1 * normal1[2] + bary2 * normal2[2]
 
-    inverse_length = 1.0 / numpy.sqrt(interp_x * interp_x + interp_y * interp_y + interp_z * interp_z + 1e-20)
-    interp_x *= inverse_length
-    interp_y *= inverse_length
-    interp_z *= inverse_length
+def rasterize_triangles(triangle_x, triangle_y, triangle_normals, width, height, flip_green,
+                        pixel_matrix, coverage):
+    """批量光栅化：triangle_x / triangle_y 为 (T, 3) 像素坐标，triangle_normals 为 (T, 3, 3)。
 
-    if flip_green:
-        interp_y = -interp_y
+    先把所有三角形（大三角形切块）的候选像素平铺开，一次判定内外，每个像素只记下
+    覆盖它的最大三角形下标——与逐三角形依次写入时「后写覆盖先写」的结果相同；
+    再对所有被覆盖像素一次性求重心权重、插值并编码写入。
+    """
+    owner = numpy.full(width * height, -1, dtype=numpy.int64)
+    corners_x = tuple(numpy.ascontiguousarray(triangle_x[:, corner]) for corner in range(3))
+    corners_y = tuple(numpy.ascontiguousarray(triangle_y[:, corner]) for corner in range(3))
+    coefficients = _edge_coefficients(corners_x, corners_y)
+    triangles, first_column, first_row, columns, rows = _triangle_rectangles(
+        corners_x, corners_y, coefficients, width, height)
+
+    counts = columns * rows
+    ends = numpy.cumsum(counts)
+    begin = 0
+    while begin < triangles.shape[0]:
+        limit = (ends[begin - 1] if begin else 0) + _RASTER_BUDGET
+        stop = max(int(numpy.searchsorted(ends, limit, side='right')), begin + 1)
+        block_counts = counts[begin:stop]
+        rectangle = numpy.repeat(numpy.arange(begin, stop), block_counts)
+        local = numpy.arange(rectangle.shape[0], dtype=numpy.int64) - numpy.repeat(
+            numpy.cumsum(block_counts) - block_counts, block_counts)
+        sample_column = first_column[rectangle] + local % columns[rectangle]
+        sample_row = first_row[rectangle] + local // columns[rectangle]
+        triangle = triangles[rectangle]
+
+        weights = _barycentric(
+            _take(coefficients, triangle),
+            sample_column.astype(triangle_x.dtype), sample_row.astype(triangle_y.dtype),
+        )
+        inside = (weights[0] >= _EDGE_EPSILON) & (weights[1] >= _EDGE_EPSILON) & (weights[2] >= _EDGE_EPSILON)
+        numpy.maximum.at(owner, sample_row[inside] * width + sample_column[inside], triangle[inside])
+        begin = stop
+
+    covered = numpy.nonzero(owner >= 0)[0]
+    flat_pixels = pixel_matrix.reshape((-1, 4))
+    for chunk in range(0, covered.shape[0], _RASTER_BUDGET):
+        pixels = covered[chunk:chunk + _RASTER_BUDGET]
+        triangle = owner[pixels]
+        weight0, weight1, weight2 = _barycentric(
+            _take(coefficients, triangle),
+            (pixels % width).astype(triangle_x.dtype), (pixels // width).astype(triangle_y.dtype),
+        )
+        interpolated = (
+            weight0[:, None] * triangle_normals[triangle, 0]
+            + weight1[:, None] * triangle_normals[triangle, 1]
+            + weight2[:, None] * triangle_normals[triangle, 2]
+        )
+        interpolated /= numpy.sqrt(numpy.sum(interpolated * interpolated, axis=1, keepdims=True) + 1e-20)
+        if flip_green:
+            interpolated[:, 1] = -interpolated[:, 1]
 
-    pixel_matrix[selected_rows, selected_columns, 0] = interp_x * 0.5 + 0.5
-    pixel_matrix[selected_rows, selected_columns, 1] = interp_y * 0.5 + 0.5
-    pixel_matrix[selected_rows, selected_columns, 2] = interp_z * 0.5 + 0.5
-    pixel_matrix[selected_rows, selected_columns, 3] = 1.0
-    coverage[selected_rows, selected_columns] = True
+        flat_pixels[pixels, :3] = interpolated * 0.5 + 0.5
+        flat_pixels[pixels, 3] = 1.0
+    coverage.reshape(-1)[covered] = True
 
 
 def _dilate(pixel_matrix, coverage, margin):
-    """把已覆盖像素向未覆盖邻居外扩 margin 圈（8 邻域最近邻填充），消除 UV 接缝。"""
-    offsets = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
-    current_coverage = coverage
-    for _ in range(margin):
-        if current_coverage.all():
-            break
-        # 每圈以本圈起点为快照取源，避免本圈新填的值再被本圈引用。
-        base_pixels = pixel_matrix.copy()
-        base_coverage = current_coverage
-        next_coverage = current_coverage.copy()
-        for offset_row, offset_column in offsets:
-            neighbor_coverage = _shift(base_coverage, offset_row, offset_column)
-            need = neighbor_coverage & (~next_coverage)
-            if not need.any():
-                continue
-            neighbor_pixels = _shift(base_pixels, offset_row, offset_column)
-            target_rows, target_columns = numpy.nonzero(need)
-            pixel_matrix[target_rows, target_columns, :] = neighbor_pixels[target_rows, target_columns, :]
-            next_coverage[target_rows, target_columns] = True
-        current_coverage = next_coverage
-
-
-def _shift(array, offset_row, offset_column):
-    """返回 result[r, c] = array[r + offset_row, c + offset_column]，越界处补零。"""
-    height, width = array.shape[0], array.shape[1]
-    result = numpy.zeros_like(array)
-    source_row0 = max(0, offset_row)
-    source_row1 = min(height, height + offset_row)
-    source_column0 = max(0, offset_column)
-    source_column1 = min(width, width + offset_column)
-    span_rows = source_row1 - source_row0
-    span_columns = source_column1 - source_column0
-    if span_rows <= 0 or span_columns <= 0:
-        return result
-    target_row0 = max(0, -offset_row)
-    target_column0 = max(0, -offset_column)
-    result[target_row0:target_row0 + span_rows, target_column0:target_column0 + span_columns] = \
-        array[source_row0:source_row1, source_column0:source_column1]
+    """把已覆盖像素向未覆盖区外扩 margin 圈，消除 UV 接缝。
+
+    外扩范围与逐圈 8 邻域外扩相同（边长 2·margin+1 的方形膨胀，按行、列两趟滑窗求出）；
+    填充值取 uv_transfer 内核精确距离变换求出的最近覆盖像素，重新归一化后编码。
+    两步的代价都与 margin 无关，只原地改写需要填充的像素。
+    """
+    if margin <= 0 or not coverage.any() or coverage.all():
+        return
+
+    fill_rows, fill_columns = numpy.nonzero(_square_dilation(coverage, margin) & ~coverage)
+    if fill_rows.shape[0] == 0:
+        return
+
+    seed_x, seed_y, _distance = _distance_transform.nearest_seed(coverage)
+    seeds = pixel_matrix[seed_y[fill_rows, fill_columns], seed_x[fill_rows, fill_columns], 0:3]
+    normals = bake_common.normalize_rows(seeds * 2.0 - 1.0)
+    pixel_matrix[fill_rows, fill_columns, 0:3] = normals * 0.5 + 0.5
+    pixel_matrix[fill_rows, fill_columns, 3] = 1.0
+
+
+def _square_dilation(mask, radius):
+    """mask 按 (2·radius+1) 见方的窗口膨胀：行、列各做一次前缀和滑窗。"""
+    result = mask
+    for axis in (0, 1):
+        length = result.shape[axis]
+        padding = [(0, 0), (0, 0)]
+        padding[axis] = (1, 0)
+        prefix = numpy.pad(numpy.cumsum(result, axis=axis, dtype=numpy.int32), padding)
+        indices = numpy.arange(length)
+        upper = numpy.take(prefix, numpy.minimum(indices + radius + 1, length), axis=axis)
+        lower = numpy.take(prefix, numpy.maximum(indices - radius, 0), axis=axis)
+        result = upper > lower
     return result
@@ -1,54 +1,85 @@
+import time
+
 import bpy
-import bmesh
+import numpy
+
+from . import _normal_map_bake as bake_common
+
+
+def read_vertex_normals(mesh):
+    """读取顶点法线，返回 (vertex_count, 3) 的 float32 数组（兼容 4.1+ 的 vertex_normals）。"""
+    vertex_count = len(mesh.vertices)
+    out = numpy.empty(vertex_count * 3, dtype=numpy.float32)
+    vertex_normals = getattr(mesh, "vertex_normals", None)
+    if vertex_normals is not None and len(vertex_normals) == vertex_count:
+        vertex_normals.foreach_get("vector", out)
+    else:
+        mesh.vertices.foreach_get("normal", out)
+    return out.reshape((vertex_count, 3))
+
+
+def expansion_directions(coords, vertex_normals, distance):
+    """逐顶点求「从原位置指向膨胀后位置」的单位方向。
+
+    与原先逐顶点调用 point_normals 的结果一致：目标点是 co + normal · distance，
+    方向取 (目标 − co) 再归一化，float32 下的舍入也一并保留。
+    """
+    targets = coords + vertex_normals * numpy.float32(distance)
+    return bake_common.normalize_rows(targets - coords)
+
 
 class SHIYUME_OT_NormalExpansion(bpy.types.Operator):
     """法线膨胀覆写（描边预备）。
-    复制物体，按法线膨胀顶点，获取其法线方向，然后将这些法线数据“写入”到原物体的自定义法线中。
+    按法线膨胀顶点，取每个顶点指向膨胀位置的方向，然后将这些法线数据“写入”到原物体的自定义法线中。
     这是制作“背面法线外扩描边”的关键步骤，确保描边断裂最少。"""
     bl_idname = "shiyume.normal_expansion"
     bl_label = "法线膨胀覆写"
     bl_options = {'REGISTER', 'UNDO'}
 
     distance: bpy.props.FloatProperty(name="膨胀距离", default=0.001, precision=4, description="模拟膨胀的距离，用于计算平滑法线")
+    strength: bpy.props.FloatProperty(
+        name="混合强度",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        description="膨胀方向与当前角法线的混合比例；1 为完全覆写（原有行为）",
+    )
 
     @classmethod
     def poll(cls, context):
         return context.active_object and context.active_object.type == 'MESH'
 
     def execute(self, context):
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+        started = time.perf_counter()
         processed_meshes = set()
         for obj in context.selected_objects:
-            if obj.type != 'MESH' or obj.data in processed_meshes: continue
-            
-            # Implementation from script
-            new_obj = obj.copy()
-            new_obj.data = obj.data.copy()
-            context.collection.objects.link(new_obj)
-            
-            # Edit new object
-            context.view_layer.objects.active = new_obj
-            bpy.ops.object.mode_set(mode='EDIT')
-            bm_new = bmesh.from_edit_mesh(new_obj.data)
-            for v in bm_new.verts:
-                v.co += v.normal * self.distance
-            bmesh.update_edit_mesh(new_obj.data)
-            bpy.ops.object.mode_set(mode='OBJECT')
+            if obj.type != 'MESH' or obj.data in processed_meshes:
+                continue
+            mesh = obj.data
 
-            # Update original
-            context.view_layer.objects.active = obj
-            bpy.ops.object.mode_set(mode='EDIT')
-            bm_orig = bmesh.from_edit_mesh(obj.data)
-            bm_orig.verts.ensure_lookup_table()
+            coords = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+            mesh.vertices.foreach_get("co", coords)
+            directions = expansion_directions(
+                coords.reshape((-1, 3)), read_vertex_normals(mesh), self.distance)
 
-            for i, v_orig in enumerate(bm_orig.verts):
-                bpy.ops.mesh.select_all(action='DESELECT')
-                bm_orig.verts[i].select = True
-                bmesh.update_edit_mesh(obj.data)
-                global_new_co = new_obj.matrix_world @ new_obj.data.vertices[i].co
-                bpy.ops.mesh.point_normals(target_location=global_new_co)
+            # Blender 4.1 之前自定义法线需要开启自动平滑才生效
+            if hasattr(mesh, "use_auto_smooth"):
+                mesh.use_auto_smooth = True
 
-            bpy.ops.object.mode_set(mode='OBJECT')
-            bpy.data.objects.remove(new_obj)
-            processed_meshes.add(obj.data)
+            if self.strength >= 1.0:
+                bake_common.write_custom_vertex_normals(mesh, directions)
+            else:
+                # 每个角都取其顶点的方向，再按强度与当前角法线混合
+                loop_vertices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+                mesh.loops.foreach_get("vertex_index", loop_vertices)
+                current = bake_common.read_current_corner_normals(mesh)
+                blended = bake_common.normalize_rows(
+                    current * (1.0 - self.strength) + directions[loop_vertices] * self.strength)
+                bake_common.write_custom_normals(mesh, blended)
+            processed_meshes.add(mesh)
 
+        self.report({'INFO'}, f"已覆写 {len(processed_meshes)} 个网格的自定义法线，用时 {time.perf_counter() - started:.2f} 秒")
         return {'FINISHED'}
@@ -1,5 +1,4 @@
 import bpy
-import numpy
 
 from . import _normal_map_bake as bake_common
 
@@ -19,6 +18,21 @@ class SHIYUME_OT_NormalMapToMesh(bpy.types.Operator):
         default=False,
         description="按 DirectX 约定翻转 Y 分量；关闭则用 OpenGL 约定（须与贴图一致）",
     )
+    sampling: bpy.props.EnumProperty(
+        name="采样方式",
+        items=[
+            ('NEAREST', "最近邻", "取 UV 所在的单个纹素（原有行为）"),
+            ('BILINEAR', "双线性", "四邻纹素加权插值"),
+            ('AREA', "区域平均", "按每个角在 UV 上覆盖的像素范围选 mip 层做三线性采样，贴图远比网格细时不闪烁"),
+        ],
+        default='NEAREST',
+        description="从法线贴图取值的方式",
+    )
+    use_pixel_cache: bpy.props.BoolProperty(
+        name="缓存贴图像素",
+        default=False,
+        description="在多次运行之间复用解码后的像素与 mip 金字塔；贴图有更新或重新载入文件时自动作废",
+    )
 
     @classmethod
     def poll(cls, context):
@@ -48,7 +62,10 @@ class SHIYUME_OT_NormalMapToMesh(bpy.types.Operator):
 
         image = node.image
         width, height = image.size
-        pixel_matrix = bake_common.read_image_pixels(image)
+        if self.use_pixel_cache:
+            pixel_matrix = bake_common.cached_image_pixels(image)
+        else:
+            pixel_matrix = bake_common.read_image_pixels(image)
 
         # 剥离旧自定义法线并强制平滑，得到与“反向烘焙”完全一致的纯净基准面。
         bake_common.clear_custom_split_normals(context, obj)
@@ -57,10 +74,18 @@ class SHIYUME_OT_NormalMapToMesh(bpy.types.Operator):
         normals, tangents, bitangents = bake_common.read_loop_tangent_basis(mesh)
         uvs = bake_common.read_loop_uvs(mesh)
 
-        # 采样：UV → 像素行列（与反向烘焙共用同一取整约定）。
-        column = numpy.clip((numpy.mod(uvs[:, 0], 1.0) * width).astype(numpy.int32), 0, width - 1)
-        row = numpy.clip((numpy.mod(uvs[:, 1], 1.0) * height).astype(numpy.int32), 0, height - 1)
-        sampled = pixel_matrix[row, column]
+        # 采样：UV → 像素（与反向烘焙共用同一纹素中心约定）。
+        if self.sampling == 'BILINEAR':
+            sampled = bake_common.sample_bilinear(pixel_matrix, uvs)
+        elif self.sampling == 'AREA':
+            if self.use_pixel_cache:
+                pyramid = bake_common.cached_mip_pyramid(image)
+            else:
+                pyramid = bake_common.build_mip_pyramid(pixel_matrix)
+            footprints = bake_common.read_loop_footprints(mesh, uvs, width, height)
+            sampled = bake_common.sample_area(pyramid, uvs, footprints)
+        else:
+            sampled = bake_common.sample_nearest(pixel_matrix, uvs)
 
         # 解码切线空间法线（OpenGL；可选翻转绿色通道）。
         tangent_space = sampled[:, :3] * 2.0 - 1.0
@@ -77,8 +102,7 @@ class SHIYUME_OT_NormalMapToMesh(bpy.types.Operator):
         object_space = bake_common.normalize_rows(object_space)
 
         # 完全覆盖写入全新的自定义法线。
-        mesh.normals_split_custom_set(object_space.tolist())
-        mesh.update()
+        bake_common.write_custom_normals(mesh, object_space)
 
         self.report({'INFO'}, f"已从 {image.name} 覆写 {len(mesh.loops)} 条自定义法线")
         return {'FINISHED'}
@@ -1,4 +1,55 @@
+import time
+
 import bpy
+import numpy
+
+from ..mesh import _weight_table
+
+
+def _target_color_attribute(mesh, domain):
+    """取要写入的颜色属性：激活颜色属性的域与目标一致就用它，否则新建一个字节颜色属性并设为激活。"""
+    attributes = mesh.color_attributes
+    active = attributes.active_color
+    if active is not None and active.domain == domain:
+        return active
+    attribute = attributes.new(name="Color", type='BYTE_COLOR', domain=domain)
+    attributes.active_color = attribute
+    return attribute
+
+
+def _color_property(attribute):
+    """字节颜色按 sRGB 字节存储，旧的 vertex_colors 写入的就是这个值，故走 color_srgb；浮点颜色直接写 color。"""
+    if attribute.data_type == 'BYTE_COLOR':
+        return "color_srgb"
+    return "color"
+
+
+def pack_group_channels(table, channel_groups, base_colors, element_vertices=None):
+    """把若干顶点组的权重打包进 RGBA。
+
+    channel_groups 为 {顶点组下标: 通道下标}；base_colors 为 (N, 4) 的原有颜色，
+    element_vertices 给出每个元素（角）对应的顶点，为 None 时元素即顶点。
+    某顶点不属于某组时，对应通道保留原值。
+    """
+    vertex_count = table.vertex_count
+    weights = numpy.zeros((vertex_count, 4), dtype=numpy.float32)
+    members = numpy.zeros((vertex_count, 4), dtype=numpy.bool_)
+
+    # 一遍扫完整张表：只留映射到通道的条目，按 (顶点, 通道) 散写
+    channel_of_group = numpy.full(max(table.group_count, 1), -1, dtype=numpy.int64)
+    for group, channel in channel_groups.items():
+        channel_of_group[group] = channel
+    channels = channel_of_group[table.groups]
+    mapped = channels >= 0
+    rows = table.rows[mapped]
+    weights[rows, channels[mapped]] = table.weights[mapped]
+    members[rows, channels[mapped]] = True
+
+    if element_vertices is not None:
+        weights = weights[element_vertices]
+        members = members[element_vertices]
+    return numpy.where(members, weights, base_colors)
+
 
 class SHIYUME_OT_VertexColorRGBA(bpy.types.Operator):
     """设置顶点颜色：
@@ -11,79 +62,86 @@ class SHIYUME_OT_VertexColorRGBA(bpy.types.Operator):
 
     use_uniform_color: bpy.props.BoolProperty(name="使用统一颜色", default=False, description="忽略顶点组，直接填充指定颜色")
     uniform_color: bpy.props.FloatVectorProperty(name="颜色拾取", subtype='COLOR', size=4, min=0.0, max=1.0, default=(1.0, 1.0, 1.0, 1.0))
-    
+
     # 顶点组映射通道
     map_red: bpy.props.StringProperty(name="R通道顶点组", default="Red")
     map_green: bpy.props.StringProperty(name="G通道顶点组", default="Green")
     map_blue: bpy.props.StringProperty(name="B通道顶点组", default="Blue")
     map_alpha: bpy.props.StringProperty(name="A通道顶点组", default="Alpha")
 
+    domain: bpy.props.EnumProperty(
+        name="颜色域",
+        items=[
+            ('CORNER', "面拐", "逐面拐存储（与旧的顶点色层一致）"),
+            ('POINT', "顶点", "逐顶点存储"),
+        ],
+        default='CORNER',
+        description="写入的颜色属性所在的域；激活颜色属性的域不同时会新建一个",
+    )
+
     @classmethod
     def poll(cls, context):
         return context.active_object and context.active_object.type == 'MESH'
 
     def execute(self, context):
+        started = time.perf_counter()
+        mesh_count = 0
         for obj in context.selected_objects:
-            if obj.type != 'MESH': continue
-            
+            if obj.type != 'MESH':
+                continue
+
             context.view_layer.objects.active = obj
-            
-            # Ensure we are in Vertex Paint or Object mode to set data correctly
-            # Actually, modifying mesh data directly is safest in Object mode, 
-            # but usually users expect visual feedback. Let's stick to valid mode.
+
+            # 直接改网格数据要在物体模式下进行，结束后恢复原模式
             current_mode = obj.mode
             if current_mode != 'OBJECT':
                 bpy.ops.object.mode_set(mode='OBJECT')
+            try:
+                self._write_colors(obj)
+                mesh_count += 1
+            finally:
+                if current_mode != 'OBJECT':
+                    try:
+                        bpy.ops.object.mode_set(mode=current_mode)
+                    except RuntimeError:
+                        pass
 
-            if not obj.data.vertex_colors:
-                obj.data.vertex_colors.new()
-            
-            color_layer = obj.data.vertex_colors.active
-            
-            if self.use_uniform_color:
-                # Mode 1: Uniform Color
-                fill_col = list(self.uniform_color)
-                for poly in obj.data.polygons:
-                    for loop_idx in poly.loop_indices:
-                        if obj.data.vertices[obj.data.loops[loop_idx].vertex_index].select: # Optional: Only selected vertices?
-                             # In object mode, 'select' attribute on vertex is reliable if we were in Edit Mode before.
-                             # But standard 'selected_objects' operator usually implies WHOLE object unless in Edit Mode.
-                             # Let's apply to ALL for now unless we add 'Only Selected' option. 
-                             # Simplicity: Apply to all.
-                             pass
-                        color_layer.data[loop_idx].color = fill_col
-            else:
-                # Mode 2: Vertex Groups
-                mapping = {
-                    self.map_red: 0, 
-                    self.map_green: 1, 
-                    self.map_blue: 2, 
-                    self.map_alpha: 3
-                }
-                
-                # Pre-fetch group indices
-                group_indices = {name: obj.vertex_groups[name].index for name in mapping if name in obj.vertex_groups}
-
-                for poly in obj.data.polygons:
-                    for idx, loop_idx in enumerate(poly.loop_indices):
-                        vert_idx = poly.vertices[idx]
-                        vert = obj.data.vertices[vert_idx]
-                        
-                        # Get current color as base
-                        color = list(color_layer.data[loop_idx].color)
-                        
-                        for name, g_idx in group_indices.items():
-                            c_idx = mapping[name]
-                            # Find weight in vertex groups
-                            for g in vert.groups:
-                                if g.group == g_idx:
-                                    color[c_idx] = g.weight
-                                    break
-                        color_layer.data[loop_idx].color = color
-            
-            # Restore mode if needed
-            if current_mode != 'OBJECT':
-                try: bpy.ops.object.mode_set(mode=current_mode)
-                except: pass
-
+        self.report({'INFO'}, f"已为 {mesh_count} 个网格写入顶点色，用时 {time.perf_counter() - started:.2f} 秒")
         return {'FINISHED'}
+
+    def _write_colors(self, obj):
+        mesh = obj.data
+        attribute = _target_color_attribute(mesh, self.domain)
+        color_property = _color_property(attribute)
+        element_count = len(attribute.data)
+
+        if self.use_uniform_color:
+            colors = numpy.tile(numpy.array(self.uniform_color, dtype=numpy.float32), (element_count, 1))
+        else:
+            # 同名映射到多个通道时只取最后一个（与旧实现的字典行为一致）
+            mapping = {
+                self.map_red: 0,
+                self.map_green: 1,
+                self.map_blue: 2,
+                self.map_alpha: 3,
+            }
+            channel_groups = {
+                obj.vertex_groups[name].index: channel
+                for name, channel in mapping.items() if name in obj.vertex_groups
+            }
+            if not channel_groups:
+                return
+
+            base_colors = numpy.empty(element_count * 4, dtype=numpy.float32)
+            attribute.data.foreach_get(color_property, base_colors)
+            base_colors = base_colors.reshape((element_count, 4))
+
+            element_vertices = None
+            if attribute.domain == 'CORNER':
+                element_vertices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+                mesh.loops.foreach_get("vertex_index", element_vertices)
+            table = _weight_table.from_object(obj)
+            colors = pack_group_channels(table, channel_groups, base_colors, element_vertices)
+
+        attribute.data.foreach_set(color_property, numpy.ascontiguousarray(colors, dtype=numpy.float32).reshape(-1))
+        mesh.update()
@@ -0,0 +1,185 @@
+"""UV 缝检测与孤岛标号的共享底层：一次性读出拓扑与 UV 数组，全部用 numpy 判定。
+
+「网格转UV」与「实时UV同步」都要先按 UV 孤岛边界拆网格，判定规则相同：
+
+- 标了缝的边、非流形边（相邻面数 ≠ 2）一律拆；
+- 流形边的两个相邻面，在边的两个端点上给出的 UV 只要有一处对不上，就拆。
+
+每个 loop 以 (顶点, 量化 UV) 为键，两个面在同一端点上的键不同即视为对不上，
+整个判定只有若干次数组运算，没有逐边的 Python 循环。
+
+孤岛标号用同一套键：同一个面的 loop、键相同的 loop 并入同一集合（数组化的并查集），
+「UV 孤岛排列」据此给每个 loop 标上孤岛号。
+
+本模块只放无副作用的工具函数，不注册任何算子。
+"""
+
+import bmesh
+import numpy as np
+
+# UV 量化步长：两 UV 落进同一格才算同一位置（旧实现用 1e-6 的距离阈值）
+UV_EPSILON = 1e-6
+
+
+def next_loops(loop_start, loop_total):
+    """每个 loop 在所属面里的下一个 loop；面的最后一个 loop 绕回第一个。"""
+    loop_count = int(loop_total.sum())
+    following = np.arange(1, loop_count + 1, dtype=np.int64)
+    last = loop_start.astype(np.int64) + loop_total - 1
+    following[last] = loop_start
+    return following
+
+
+def loop_keys(vertex_index, loop_uv, epsilon=UV_EPSILON):
+    """给每个 loop 一个整数键：顶点相同且 UV 落在同一量化格的 loop 键相同。"""
+    quantized = np.round(loop_uv.astype(np.float64) / epsilon).astype(np.int64)
+    vertex = vertex_index.astype(np.int64)
+    if vertex.shape[0] == 0:
+        return vertex
+
+    # 三列的取值跨度乘起来放得进 int64 时，压成一个整数再做一维 unique；
+    # 放不下（UV 散得极开）才退回按三列 lexsort。两条路都比 np.unique(axis=0) 的按字节整行排序快得多
+    quantized -= quantized.min(axis=0)
+    u_span, v_span = (int(span) + 1 for span in quantized.max(axis=0))
+    vertex_span = int(vertex.max()) + 1
+    if vertex_span * u_span * v_span < 2 ** 63:
+        packed = (vertex * u_span + quantized[:, 0]) * v_span + quantized[:, 1]
+        _unique, keys = np.unique(packed, return_inverse=True)
+        return keys.reshape(-1)
+
+    order = np.lexsort((quantized[:, 1], quantized[:, 0], vertex))
+    columns = (vertex[order], quantized[order, 0], quantized[order, 1])
+    changed = np.empty(order.shape[0], dtype=bool)
+    changed[0] = True
+    changed[1:] = np.logical_or.reduce([column[1:] != column[:-1] for column in columns])
+    keys = np.empty(order.shape[0], dtype=np.int64)
+    keys[order] = np.cumsum(changed) - 1
+    return keys
+
+
+def seam_edges(vertex_index, edge_index, loop_start, loop_total, loop_uv,
+               edge_seam, epsilon=UV_EPSILON):
+    """返回 (E,) 布尔数组，True 表示这条边要拆开。
+
+    全部参数都是从网格 foreach_get 出来的平铺数组：vertex_index / edge_index 逐 loop，
+    loop_start / loop_total 逐面，loop_uv 为 (L, 2)，edge_seam 逐边。
+    """
+    edge_count = edge_seam.shape[0]
+    split = edge_seam.astype(bool).copy()
+
+    faces_per_edge = np.bincount(edge_index, minlength=edge_count)
+    split |= faces_per_edge != 2
+
+    keys = loop_keys(vertex_index, loop_uv, epsilon)
+    following = next_loops(loop_start, loop_total)
+
+    # 每条流形边恰好被两个 loop 引用；按边排序后它们相邻
+    manifold_loops = np.nonzero(faces_per_edge[edge_index] == 2)[0]
+    order = manifold_loops[np.argsort(edge_index[manifold_loops], kind='stable')]
+    first = order[0::2]
+    second = order[1::2]
+
+    # 边在面 A 上从 first 走到 following[first]；面 B 的 loop 可能同向也可能反向
+    same_direction = vertex_index[first] == vertex_index[second]
+    start_b = np.where(same_direction, keys[second], keys[following[second]])
+    end_b = np.where(same_direction, keys[following[second]], keys[second])
+    mismatch = (keys[first] != start_b) | (keys[following[first]] != end_b)
+
+    split[edge_index[first[mismatch]]] = True
+    return split
+
+
+def _union_find(count, first, second):
+    """数组化并查集：first[i] 与 second[i] 属同一集合，返回每个元素的根（集合里最小的下标）。
+
+    每轮把每对的大根挂到小根下（np.minimum.at），再做指针跳跃压平，直到所有对同根。
+    """
+    parent = np.arange(count, dtype=np.int64)
+    while True:
+        root_first = parent[first]
+        root_second = parent[second]
+        differs = root_first != root_second
+        if not differs.any():
+            return parent
+        low = np.minimum(root_first[differs], root_second[differs])
+        high = np.maximum(root_first[differs], root_second[differs])
+        np.minimum.at(parent, high, low)
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def loop_islands(vertex_index, loop_start, loop_total, loop_uv, epsilon=UV_EPSILON):
+    """给每个 loop 标上 UV 孤岛号，返回 (标号数组, 孤岛数)。
+
+    两个面在某个顶点上的 UV 落在同一量化格就算相连。孤岛号按孤岛中最小的 loop 下标
+    升序编号，也就是按面序第一次遇到该孤岛的顺序。
+    """
+    loop_count = vertex_index.shape[0]
+    if loop_count == 0:
+        return np.zeros(0, dtype=np.int64), 0
+
+    keys = loop_keys(vertex_index, loop_uv, epsilon)
+    _unique, key_first = np.unique(keys, return_index=True)
+    face_of_loop = np.repeat(np.arange(loop_start.shape[0]), loop_total)
+
+    loops = np.arange(loop_count, dtype=np.int64)
+    first = np.concatenate((loops, loops))
+    second = np.concatenate((loop_start[face_of_loop].astype(np.int64),
+                             key_first[keys].astype(np.int64)))
+    roots = _union_find(loop_count, first, second)
+    _roots, labels = np.unique(roots, return_inverse=True)
+    return labels.reshape(-1), int(_roots.shape[0])
+
+
+def read_seam_inputs(mesh, uv_name):
+    """从网格读出 seam_edges 需要的全部数组；UV 层不存在时返回 None。"""
+    uv_layer = mesh.uv_layers.get(uv_name)
+    if uv_layer is None:
+        return None
+
+    loop_count = len(mesh.loops)
+    vertex_index = np.empty(loop_count, dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", vertex_index)
+    edge_index = np.empty(loop_count, dtype=np.int32)
+    mesh.loops.foreach_get("edge_index", edge_index)
+
+    face_count = len(mesh.polygons)
+    loop_start = np.empty(face_count, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    loop_total = np.empty(face_count, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+
+    loop_uv = np.empty(loop_count * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", loop_uv)
+
+    edge_seam = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get("use_seam", edge_seam)
+
+    return {
+        'vertex_index': vertex_index,
+        'edge_index': edge_index,
+        'loop_start': loop_start,
+        'loop_total': loop_total,
+        'loop_uv': loop_uv.reshape(-1, 2),
+        'edge_seam': edge_seam,
+    }
+
+
+def mesh_seam_edges(mesh, uv_name):
+    """返回要拆开的边下标数组；UV 层不存在时返回 None。"""
+    inputs = read_seam_inputs(mesh, uv_name)
+    if inputs is None:
+        return None
+    return np.nonzero(seam_edges(**inputs))[0]
+
+
+def split_seams(bm, edge_indices):
+    """对 from_mesh 得到的 bmesh 一次性拆开给定下标的边（下标与网格边序一致）。"""
+    if len(edge_indices) == 0:
+        return
+    bm.edges.ensure_lookup_table()
+    edges = bm.edges
+    bmesh.ops.split_edges(bm, edges=[edges[int(index)] for index in edge_indices])
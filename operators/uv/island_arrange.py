@@ -1,88 +1,104 @@
 import bpy
 import bmesh
+import numpy as np
 
+from . import _uv_seams
 
-def _uv_connected(loop_a, loop_b, uv_layer, epsilon=1e-5):
-    """Check if two loops share the same UV coordinate at their vertex."""
-    uv_a = loop_a[uv_layer].uv
-    uv_b = loop_b[uv_layer].uv
-    return (uv_a - uv_b).length < epsilon
+# Two loops at the same vertex are UV-connected when their UVs fall into the same cell.
+ISLAND_EPSILON = 1e-5
 
 
-def _collect_islands(bm, uv_layer):
-    """Collect ALL UV islands as lists of loops via flood-fill over UV connectivity.
-
-    Returns a list of islands, where each island is a list of loops.
-    """
-    face_visited = set()
-    islands = []
-
-    for seed_face in bm.faces:
-        if seed_face.index in face_visited:
-            continue
-
-        island_loops = []
-        stack = [seed_face]
-
-        while stack:
-            face = stack.pop()
-            if face.index in face_visited:
-                continue
-            face_visited.add(face.index)
-
-            for loop in face.loops:
-                island_loops.append(loop)
-
-            # Find UV-connected neighbour faces
-            for loop in face.loops:
-                for other_loop in loop.vert.link_loops:
-                    if other_loop.face.index in face_visited:
-                        continue
-                    if _uv_connected(loop, other_loop, uv_layer):
-                        stack.append(other_loop.face)
-
-        if island_loops:
-            islands.append(island_loops)
-
-    return islands
-
-
-def _island_has_selection(loops, uv_layer, use_uv_select):
-    """Check if an island has at least one selected UV vertex.
+def _loop_selection(bm, uv_layer, use_uv_select):
+    """Per-loop selection flags, in the loop order the mesh gets when leaving edit mode.
 
     When UV sync mode is ON, use_uv_select=False and we check face.select.
     When UV sync mode is OFF, use_uv_select=True and we check loop UV select.
     """
     if use_uv_select:
-        return any(loop[uv_layer].select for loop in loops)
+        flags = [loop[uv_layer].select for face in bm.faces for loop in face.loops]
     else:
-        return any(loop.face.select for loop in loops)
+        flags = [face.select for face in bm.faces for _loop in face.loops]
+    return np.array(flags, dtype=bool)
 
 
-def _collect_selected_islands(bm, uv_layer, use_uv_select):
-    """Collect only UV islands that contain at least one selected UV vertex.
+class _Islands:
+    """Flat loop arrays of the active UV layer, labelled by island.
 
-    Returns a list of islands (each a list of loops) that have selection.
+    Islands are numbered in the order a face-order flood fill would discover them;
+    ``selected`` holds the ids of islands with at least one selected loop.
     """
-    all_islands = _collect_islands(bm, uv_layer)
-    return [
-        loops for loops in all_islands
-        if _island_has_selection(loops, uv_layer, use_uv_select)
-    ]
 
+    def __init__(self, mesh, loop_selected):
+        self.uv_layer = mesh.uv_layers.active
+
+        loop_count = len(mesh.loops)
+        vertex_index = np.empty(loop_count, dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", vertex_index)
+        face_count = len(mesh.polygons)
+        loop_start = np.empty(face_count, dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        loop_total = np.empty(face_count, dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_total)
+        uv = np.empty(loop_count * 2, dtype=np.float32)
+        self.uv_layer.data.foreach_get("uv", uv)
+        self.uv = uv.reshape(-1, 2)
+
+        self.labels, self.count = _uv_seams.loop_islands(
+            vertex_index, loop_start, loop_total, self.uv, ISLAND_EPSILON)
+
+        has_selection = np.zeros(self.count, dtype=bool)
+        has_selection[self.labels[loop_selected]] = True
+        self.selected = np.nonzero(has_selection)[0]
+
+        # Every island owns at least one loop, so the segment starts are strictly increasing
+        order = np.argsort(self.labels, kind='stable')
+        starts = np.searchsorted(self.labels[order], np.arange(self.count))
+        grouped = self.uv[order].astype(np.float64)
+        self.bbox_min = np.minimum.reduceat(grouped, starts, axis=0)
+        self.bbox_max = np.maximum.reduceat(grouped, starts, axis=0)
+
+    def shift(self, islands, offsets):
+        """Move each island in ``islands`` by the matching (du, dv) row and write back."""
+        per_island = np.zeros((self.count, 2), dtype=np.float64)
+        per_island[islands] = offsets
+        moved = (self.uv + per_island[self.labels]).astype(np.float32)
+        self.uv_layer.data.foreach_set("uv", moved.reshape(-1))
+
+
+def _read_islands(operator, context):
+    """Enter edit mode, grab the selection, then drop to object mode to read the arrays.
+
+    Returns ``_Islands`` (caller must switch back to edit mode) or None after reporting.
+    """
+    obj = context.active_object
+    if not obj or obj.type != 'MESH':
+        operator.report({'ERROR'}, "请选择一个网格物体")
+        return None
 
-def _island_bbox(loops, uv_layer):
-    """Compute bounding box of an island.
+    # 确保在编辑模式
+    if obj.mode != 'EDIT':
+        bpy.ops.object.mode_set(mode='EDIT')
 
-    Returns (min_u, min_v, max_u, max_v).
-    """
-    us = []
-    vs = []
-    for loop in loops:
-        uv = loop[uv_layer].uv
-        us.append(uv.x)
-        vs.append(uv.y)
-    return min(us), min(vs), max(us), max(vs)
+    bm = bmesh.from_edit_mesh(obj.data)
+    uv_layer = bm.loops.layers.uv.active
+    if not uv_layer:
+        operator.report({'ERROR'}, "没有活动的 UV 层")
+        return None
+
+    # 检测 UV 同步选择模式
+    use_uv_select = not context.tool_settings.use_uv_select_sync
+    loop_selected = _loop_selection(bm, uv_layer, use_uv_select)
+    del bm, uv_layer
+
+    # foreach_get / foreach_set only see edit-mode changes after leaving edit mode
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return _Islands(obj.data, loop_selected)
+
+
+def _sequential_cursor(start, extents, spacing):
+    """Left/bottom edge for each island when packed one after another from ``start``."""
+    steps = np.concatenate(([0.0], np.cumsum(extents[:-1] + spacing)))
+    return start + steps
 
 
 # --------------------------------------------------------------------------
@@ -115,71 +131,33 @@ class SHIYUME_OT_UVIslandEquidistant(bpy.types.Operator):
     )
 
     def execute(self, context):
-        obj = context.active_object
-        if not obj or obj.type != 'MESH':
-            self.report({'ERROR'}, "请选择一个网格物体")
+        islands = _read_islands(self, context)
+        if islands is None:
             return {'CANCELLED'}
 
-        # 确保在编辑模式
-        if obj.mode != 'EDIT':
+        try:
+            # 仅处理在 UV 编辑器中有选中顶点的孤岛
+            selected = islands.selected
+            if len(selected) < 2:
+                self.report({'WARNING'}, "需要在 UV 编辑器中选中至少两个孤岛")
+                return {'CANCELLED'}
+
+            axis = 0 if self.axis == 'X' else 1
+            low = islands.bbox_min[selected, axis]
+            high = islands.bbox_max[selected, axis]
+
+            # Sort by current position on the chosen axis (preserve original order)
+            order = np.argsort((low + high) / 2.0, kind='stable')
+
+            # Place islands sequentially with equal spacing, starting from the first island's edge
+            cursor = _sequential_cursor(low[order[0]], (high - low)[order], self.spacing)
+            offsets = np.zeros((len(selected), 2), dtype=np.float64)
+            offsets[:, axis] = cursor - low[order]
+            islands.shift(selected[order], offsets)
+        finally:
             bpy.ops.object.mode_set(mode='EDIT')
 
-        bm = bmesh.from_edit_mesh(obj.data)
-        uv_layer = bm.loops.layers.uv.active
-        if not uv_layer:
-            self.report({'ERROR'}, "没有活动的 UV 层")
-            return {'CANCELLED'}
-
-        # 检测 UV 同步选择模式
-        use_uv_select = not context.tool_settings.use_uv_select_sync
-
-        # 仅收集在 UV 编辑器中有选中顶点的孤岛
-        islands = _collect_selected_islands(bm, uv_layer, use_uv_select)
-        if len(islands) < 2:
-            self.report({'WARNING'}, "需要在 UV 编辑器中选中至少两个孤岛")
-            return {'CANCELLED'}
-
-        # Compute bounding boxes
-        island_data = []
-        for loops in islands:
-            min_u, min_v, max_u, max_v = _island_bbox(loops, uv_layer)
-            center_u = (min_u + max_u) / 2.0
-            center_v = (min_v + max_v) / 2.0
-            width = max_u - min_u
-            height = max_v - min_v
-            island_data.append({
-                'loops': loops,
-                'min_u': min_u, 'min_v': min_v,
-                'max_u': max_u, 'max_v': max_v,
-                'center_u': center_u, 'center_v': center_v,
-                'width': width, 'height': height,
-            })
-
-        # Sort by current position on the chosen axis (preserve original order)
-        if self.axis == 'X':
-            island_data.sort(key=lambda d: d['center_u'])
-        else:
-            island_data.sort(key=lambda d: d['center_v'])
-
-        # Place islands sequentially with equal spacing
-        if self.axis == 'X':
-            # Start from the left edge of the first island
-            cursor = island_data[0]['min_u']
-            for data in island_data:
-                offset = cursor - data['min_u']
-                for loop in data['loops']:
-                    loop[uv_layer].uv.x += offset
-                cursor += data['width'] + self.spacing
-        else:
-            cursor = island_data[0]['min_v']
-            for data in island_data:
-                offset = cursor - data['min_v']
-                for loop in data['loops']:
-                    loop[uv_layer].uv.y += offset
-                cursor += data['height'] + self.spacing
-
-        bmesh.update_edit_mesh(obj.data)
-        self.report({'INFO'}, f"已沿 {self.axis} 轴等距排列 {len(islands)} 个孤岛")
+        self.report({'INFO'}, f"已沿 {self.axis} 轴等距排列 {len(selected)} 个孤岛")
         return {'FINISHED'}
 
 
@@ -215,64 +193,35 @@ class SHIYUME_OT_UVIslandSortByHeight(bpy.types.Operator):
     )
 
     def execute(self, context):
-        obj = context.active_object
-        if not obj or obj.type != 'MESH':
-            self.report({'ERROR'}, "请选择一个网格物体")
+        islands = _read_islands(self, context)
+        if islands is None:
             return {'CANCELLED'}
 
-        if obj.mode != 'EDIT':
-            bpy.ops.object.mode_set(mode='EDIT')
+        try:
+            selected = islands.selected
+            if len(selected) < 2:
+                self.report({'WARNING'}, "需要在 UV 编辑器中选中至少两个孤岛")
+                return {'CANCELLED'}
 
-        bm = bmesh.from_edit_mesh(obj.data)
-        uv_layer = bm.loops.layers.uv.active
-        if not uv_layer:
-            self.report({'ERROR'}, "没有活动的 UV 层")
-            return {'CANCELLED'}
-
-        use_uv_select = not context.tool_settings.use_uv_select_sync
+            low = islands.bbox_min[selected]
+            size = islands.bbox_max[selected] - low
 
-        islands = _collect_selected_islands(bm, uv_layer, use_uv_select)
-        if len(islands) < 2:
-            self.report({'WARNING'}, "需要在 UV 编辑器中选中至少两个孤岛")
-            return {'CANCELLED'}
+            # Sort by height (V extent) — default high-to-low, reversed = low-to-high.
+            # Negating keeps ties in discovery order, like a stable reverse sort.
+            height = size[:, 1] if self.reverse else -size[:, 1]
+            order = np.argsort(height, kind='stable')
 
-        # Compute bounding boxes
-        island_data = []
-        for loops in islands:
-            min_u, min_v, max_u, max_v = _island_bbox(loops, uv_layer)
-            width = max_u - min_u
-            height = max_v - min_v
-            island_data.append({
-                'loops': loops,
-                'min_u': min_u, 'min_v': min_v,
-                'max_u': max_u, 'max_v': max_v,
-                'width': width, 'height': height,
-            })
-
-        # Sort by height (V extent) — default high-to-low, reversed = low-to-high
-        island_data.sort(key=lambda d: d['height'], reverse=not self.reverse)
-
-        # Place along X axis from left to right
-        cursor_x = island_data[0]['min_u']
-
-        # Find common bottom if aligning
-        if self.align_bottom:
-            common_bottom = min(d['min_v'] for d in island_data)
-
-        for data in island_data:
-            # X offset
-            offset_x = cursor_x - data['min_u']
+            # Place along X axis from left to right
+            cursor_x = _sequential_cursor(low[order[0], 0], size[order, 0], self.spacing)
+            offsets = np.zeros((len(selected), 2), dtype=np.float64)
+            offsets[:, 0] = cursor_x - low[order, 0]
             # Y offset (align bottom or keep original)
-            offset_y = (common_bottom - data['min_v']) if self.align_bottom else 0.0
-
-            for loop in data['loops']:
-                loop[uv_layer].uv.x += offset_x
-                loop[uv_layer].uv.y += offset_y
-
-            cursor_x += data['width'] + self.spacing
+            if self.align_bottom:
+                offsets[:, 1] = low[:, 1].min() - low[order, 1]
+            islands.shift(selected[order], offsets)
+        finally:
+            bpy.ops.object.mode_set(mode='EDIT')
 
-        bmesh.update_edit_mesh(obj.data)
         order_text = "矮→高" if self.reverse else "高→矮"
-        self.report({'INFO'}, f"已按高度 ({order_text}) 排列 {len(islands)} 个孤岛")
+        self.report({'INFO'}, f"已按高度 ({order_text}) 排列 {len(selected)} 个孤岛")
         return {'FINISHED'}
-
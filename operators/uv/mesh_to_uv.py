@@ -1,10 +1,55 @@
+import time
+
 import bpy
 import bmesh
-from mathutils import Vector
+import numpy as np
 
+from . import _uv_seams
 from .uv_transfer.layout import SOURCE_OBJECT_PROP
 
 
+def _read_key_block(key_blocks, half_precision):
+    """Read every shape key once into a (K, V, 3) block.
+
+    With ``half_precision`` the block holds float16 offsets from the first key
+    plus a float32 copy of that key, which halves peak memory on meshes with
+    hundreds of keys while keeping absolute positions exact for the basis.
+    """
+    if not key_blocks:
+        return None, None
+    key_count = len(key_blocks)
+    vertex_count = len(key_blocks[0].data)
+    if not half_precision:
+        block = np.empty((key_count, vertex_count * 3), dtype=np.float32)
+        for index, key in enumerate(key_blocks):
+            key.data.foreach_get("co", block[index])
+        return block.reshape(key_count, vertex_count, 3), None
+
+    basis = np.empty(vertex_count * 3, dtype=np.float32)
+    key_blocks[0].data.foreach_get("co", basis)
+    offsets = np.zeros((key_count, vertex_count * 3), dtype=np.float16)
+    scratch = np.empty(vertex_count * 3, dtype=np.float32)
+    for index, key in enumerate(key_blocks[1:], start=1):
+        key.data.foreach_get("co", scratch)
+        np.subtract(scratch, basis, out=scratch)
+        offsets[index] = scratch
+    return offsets.reshape(key_count, vertex_count, 3), basis.reshape(vertex_count, 3)
+
+
+def _key_coords(key_block, index):
+    block, basis = key_block
+    if basis is None:
+        return block[index]
+    return basis + block[index].astype(np.float32)
+
+
+def _read_int_attribute(mesh, name):
+    attribute = mesh.attributes[name]
+    values = np.empty(len(attribute.data), dtype=np.int32)
+    attribute.data.foreach_get("value", values)
+    return values
+
+
 class SHIYUME_OT_MeshToUV(bpy.types.Operator):
     """创建一个新的网格对象，并完整保留原物体的网格数据。
     新对象会追加一个 UVSync 形态键，用于把顶点移动到 UV 坐标位置。
@@ -14,6 +59,12 @@ class SHIYUME_OT_MeshToUV(bpy.types.Operator):
     bl_label = "网格转UV (物理展开)"
     bl_options = {"REGISTER", "UNDO"}
 
+    half_precision_staging: bpy.props.BoolProperty(
+        name="半精度暂存",
+        default=False,
+        description="重建形态键时以 float16 偏移量暂存所有形态键，形态键上百个时可显著降低峰值内存",
+    )
+
     def _copy_shape_key_settings(self, source_obj, new_obj):
         old_shape_keys = source_obj.data.shape_keys
         new_shape_keys = new_obj.data.shape_keys
@@ -94,47 +145,13 @@ class SHIYUME_OT_MeshToUV(bpy.types.Operator):
         for vert in bm.verts:
             vert[source_index_layer] = vert.index
 
-        edges_to_split = set()
-        epsilon = 1e-6
-
-        for edge in bm.edges:
-            if edge.seam:
-                edges_to_split.add(edge)
-                continue
-            if not edge.is_manifold:
-                edges_to_split.add(edge)
-                continue
-
-            l1 = edge.link_loops[0]
-            l2 = edge.link_loops[1]
-            v1, v2 = edge.verts
-
-            l1_uvs = {l.vert.index: l[uv_layer].uv for l in l1.face.loops}
-            l2_uvs = {l.vert.index: l[uv_layer].uv for l in l2.face.loops}
+        seam_indices = _uv_seams.mesh_seam_edges(
+            new_obj.data, new_obj.data.uv_layers.active.name)
+        _uv_seams.split_seams(bm, seam_indices)
 
-            if v1.index not in l2_uvs or v2.index not in l2_uvs:
-                edges_to_split.add(edge)
-                continue
-
-            v1_match = (l1_uvs[v1.index] - l2_uvs[v1.index]).length < epsilon
-            v2_match = (l1_uvs[v2.index] - l2_uvs[v2.index]).length < epsilon
-
-            if not (v1_match and v2_match):
-                edges_to_split.add(edge)
-
-        if edges_to_split:
-            bmesh.ops.split_edges(bm, edges=list(edges_to_split))
-
-        bm.verts.ensure_lookup_table()
-
-        source_vert_indices = [vert[source_index_layer] for vert in bm.verts]
-        uv_coords_map = {}
-        for face in bm.faces:
-            for loop in face.loops:
-                vert_index = loop.vert.index
-                if vert_index not in uv_coords_map:
-                    uv = loop[uv_layer].uv
-                    uv_coords_map[vert_index] = Vector((uv.x, uv.y, 0.0))
+        # Capture every source shape key before the duplicate's keys get cleared.
+        started = time.perf_counter()
+        key_block = _read_key_block(source_shape_keys, self.half_precision_staging)
 
         # Writing split topology back invalidates copied shape keys, so rebuild them next.
         if new_obj.data.shape_keys:
@@ -144,12 +161,15 @@ class SHIYUME_OT_MeshToUV(bpy.types.Operator):
         new_obj.data.update()
         bm.free()
 
+        mesh = new_obj.data
+        origin = _read_int_attribute(mesh, "_source_vert_index")
+
         # 3. Rebuild original shape keys on top of the split topology.
         if source_shape_keys:
-            for key_block in source_shape_keys:
-                new_key = new_obj.shape_key_add(name=key_block.name, from_mix=False)
-                for i, source_vert_index in enumerate(source_vert_indices):
-                    new_key.data[i].co = key_block.data[source_vert_index].co
+            for key_index, source_key in enumerate(source_shape_keys):
+                new_key = new_obj.shape_key_add(name=source_key.name, from_mix=False)
+                coords = _key_coords(key_block, key_index)[origin]
+                new_key.data.foreach_set("co", coords.reshape(-1))
         else:
             new_obj.shape_key_add(name="Basis", from_mix=False)
 
@@ -157,12 +177,21 @@ class SHIYUME_OT_MeshToUV(bpy.types.Operator):
         if sk_uv is None:
             sk_uv = new_obj.shape_key_add(name="UVSync", from_mix=False)
 
-        basis_key = new_obj.data.shape_keys.key_blocks[0]
-        for i, _vert in enumerate(new_obj.data.vertices):
-            if i in uv_coords_map:
-                sk_uv.data[i].co = uv_coords_map[i]
-            else:
-                sk_uv.data[i].co = basis_key.data[i].co
+        # Every vertex takes the UV of the first loop that uses it; loose verts keep basis.
+        vertex_count = len(mesh.vertices)
+        coords = np.empty(vertex_count * 3, dtype=np.float32)
+        new_obj.data.shape_keys.key_blocks[0].data.foreach_get("co", coords)
+        coords = coords.reshape(-1, 3)
+
+        loop_vertex = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertex)
+        loop_uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        mesh.uv_layers.active.data.foreach_get("uv", loop_uv)
+        vertices, first_loop = np.unique(loop_vertex, return_index=True)
+        coords[vertices, 0:2] = loop_uv.reshape(-1, 2)[first_loop]
+        coords[vertices, 2] = 0.0
+        sk_uv.data.foreach_set("co", coords.reshape(-1))
+        self._shape_key_seconds += time.perf_counter() - started
 
         # 4. Restore shape key settings from the source object.
         if source_shape_keys:
@@ -181,6 +210,7 @@ class SHIYUME_OT_MeshToUV(bpy.types.Operator):
             return {"CANCELLED"}
 
         created_objects = []
+        self._shape_key_seconds = 0.0
 
         # Process all selected objects
         for obj in selected_meshes:
@@ -198,5 +228,9 @@ class SHIYUME_OT_MeshToUV(bpy.types.Operator):
 
         context.view_layer.objects.active = created_objects[-1]
 
-        self.report({"INFO"}, f"Created {len(created_objects)} UV mesh copies")
+        self.report(
+            {"INFO"},
+            f"Created {len(created_objects)} UV mesh copies "
+            f"(shape keys rebuilt in {self._shape_key_seconds:.2f}s)",
+        )
         return {"FINISHED"}
@@ -1,5 +1,11 @@
+import hashlib
+import time
+
 import bpy
 import bmesh
+import numpy as np
+
+from . import _uv_seams
 
 SYNC_SOURCE_PROP = "uv_sync_source_object"
 
@@ -8,121 +14,183 @@ def split_mesh_by_uv_islands(obj, uv_map_name):
     if obj.mode != 'OBJECT':
         bpy.ops.object.mode_set(mode='OBJECT')
 
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
-    bm.verts.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.faces.ensure_lookup_table()
-
-    uv_layer = bm.loops.layers.uv.get(uv_map_name)
-    if not uv_layer:
+    seam_indices = _uv_seams.mesh_seam_edges(obj.data, uv_map_name)
+    if seam_indices is None:
         print(f"错误: 在 '{obj.name}' 上找不到名为 '{uv_map_name}' 的UV贴图，无法分割。")
-        bm.free()
         return
 
-    edges_to_split = set()
-    epsilon = 1e-6
+    if len(seam_indices):
+        print(f"在 '{obj.name}' 上找到 {len(seam_indices)} 条UV不连续的边，正在进行分割...")
+        bm = bmesh.new()
+        bm.from_mesh(obj.data)
+        _uv_seams.split_seams(bm, seam_indices)
+        bm.to_mesh(obj.data)
+        obj.data.update()
+        bm.free()
+        print("网格分割完成。")
+    else:
+        print(f"在 '{obj.name}' 上未找到需要分割的UV边。")
+
 
-    for edge in bm.edges:
-        if edge.seam or not edge.is_manifold:
-            edges_to_split.add(edge)
-            continue
+class _SyncState:
+    """一个同步物体的缓存：UV 缓冲的摘要，以及「顶点 ← 第一个用到它的 loop」映射。"""
 
-        if len(edge.link_loops) != 2:
-            continue
+    def __init__(self, name):
+        self.name = name
+        self.signature = None
+        self.vertices = None
+        self.first_loops = None
+        self.topology = None
 
-        loop1, loop2 = edge.link_loops
 
-        v1, v2 = edge.verts
+# 同步物体注册表，以 sync_obj.as_pointer() 为键；逐帧处理器只看这里，不扫整个场景
+_REGISTRY = {}
 
-        loop1_uvs = {}
-        for l in loop1.face.loops:
-            loop1_uvs[l.vert.index] = l[uv_layer].uv
+# 最近一帧的同步统计，供面板显示
+FRAME_STATS = {'objects': 0, 'updated': 0, 'milliseconds': 0.0}
 
-        loop2_uvs = {}
-        for l in loop2.face.loops:
-            loop2_uvs[l.vert.index] = l[uv_layer].uv
 
-        v1_uv_match = (loop1_uvs.get(v1.index) - loop2_uvs.get(v1.index)).length < epsilon
-        v2_uv_match = (loop1_uvs.get(v2.index) - loop2_uvs.get(v2.index)).length < epsilon
+def track(sync_obj):
+    """把同步物体登记进注册表；已登记的会清掉缓存，下次必定重算。"""
+    _REGISTRY[sync_obj.as_pointer()] = _SyncState(sync_obj.name)
 
-        if not (v1_uv_match and v2_uv_match):
-            edges_to_split.add(edge)
 
-    if edges_to_split:
-        print(f"在 '{obj.name}' 上找到 {len(edges_to_split)} 条UV不连续的边，正在进行分割...")
-        bmesh.ops.split_edges(bm, edges=list(edges_to_split))
-        bm.to_mesh(obj.data)
-        obj.data.update()
-        print("网格分割完成。")
-    else:
-        print(f"在 '{obj.name}' 上未找到需要分割的UV边。")
+def untrack_all():
+    _REGISTRY.clear()
+
 
-    bm.free()
+def rediscover():
+    """按 SYNC_SOURCE_PROP 重新找出同步物体，返回新登记的 [(指针, 状态)]。
 
+    物体被删后再撤销回来时会换一个指针，旧条目找不到它；这里丢掉不再对应任何同步物体的
+    条目，并把没登记过的同步物体按新指针登记上。
+    """
+    found = {obj.as_pointer(): obj for obj in bpy.data.objects if SYNC_SOURCE_PROP in obj}
+    for pointer in [pointer for pointer in _REGISTRY if pointer not in found]:
+        del _REGISTRY[pointer]
+    added = []
+    for pointer, obj in found.items():
+        if pointer not in _REGISTRY:
+            track(obj)
+            added.append((pointer, _REGISTRY[pointer]))
+    return added
 
-def update_uv_shape_key(sync_obj):
+
+def _resolve(pointer, state):
+    """按登记的名字找回物体，并核对指针——物体被删或改名后条目作废。"""
+    obj = bpy.data.objects.get(state.name)
+    if obj is None or obj.as_pointer() != pointer:
+        for candidate in bpy.data.objects:
+            if candidate.as_pointer() == pointer:
+                state.name = candidate.name
+                return candidate
+        return None
+    return obj
+
+
+def update_uv_shape_key(sync_obj, state=None):
+    """把源网格 UVSync_UV 的坐标写进 UVSync 形态键；UV 与拓扑都没变时直接跳过。
+
+    返回是否真的写了形态键。state 为空时按一次性调用处理，不做跳过判断。
+    """
     source_name = sync_obj.get(SYNC_SOURCE_PROP)
     if not source_name or source_name not in bpy.data.objects:
-        return
+        return False
     source_obj = bpy.data.objects[source_name]
 
     uv_layer = source_obj.data.uv_layers.get("UVSync_UV")
     if not uv_layer:
-        return
+        return False
 
     if not sync_obj.data.shape_keys:
-        return
+        return False
     uv_shape_key = sync_obj.data.shape_keys.key_blocks.get("UVSync")
     if not uv_shape_key:
-        return
-
-    num_loops = len(source_obj.data.loops)
-    uv_coords = [0.0] * num_loops * 2
-    uv_layer.data.foreach_get("uv", uv_coords)
+        return False
 
-    loop_vert_indices = [0] * num_loops
-    source_obj.data.loops.foreach_get("vertex_index", loop_vert_indices)
+    if state is None:
+        state = _SyncState(sync_obj.name)
 
+    source_mesh = source_obj.data
+    num_loops = len(source_mesh.loops)
     num_verts = len(uv_shape_key.data)
-    shape_key_coords = [0.0] * num_verts * 3
-    sync_obj.data.vertices.foreach_get("co", shape_key_coords)
-
-    updated_verts = [False] * num_verts
-
-    for i in range(num_loops):
-        vert_idx = loop_vert_indices[i]
-        if not updated_verts[vert_idx]:
-            uv_x = uv_coords[i * 2]
-            uv_y = uv_coords[i * 2 + 1]
-
-            base_index = vert_idx * 3
-            shape_key_coords[base_index] = uv_x
-            shape_key_coords[base_index + 1] = uv_y
-            shape_key_coords[base_index + 2] = 0.0
+    uv_coords = np.empty(num_loops * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uv_coords)
 
-            updated_verts[vert_idx] = True
+    topology = (source_mesh.as_pointer(), num_loops, num_verts)
+    signature = (topology, hashlib.blake2b(uv_coords.tobytes(), digest_size=16).digest())
+    if signature == state.signature:
+        return False
+
+    if state.topology != topology:
+        loop_vert_indices = np.empty(num_loops, dtype=np.int32)
+        source_mesh.loops.foreach_get("vertex_index", loop_vert_indices)
+        valid = loop_vert_indices < num_verts
+        vertices, first_loops = np.unique(loop_vert_indices[valid], return_index=True)
+        state.vertices = vertices
+        state.first_loops = np.nonzero(valid)[0][first_loops]
+        state.topology = topology
+
+    shape_key_coords = np.empty(num_verts * 3, dtype=np.float32)
+    sync_obj.data.vertices.foreach_get("co", shape_key_coords)
+    shape_key_coords = shape_key_coords.reshape(-1, 3)
+    shape_key_coords[state.vertices, 0:2] = uv_coords.reshape(-1, 2)[state.first_loops]
+    shape_key_coords[state.vertices, 2] = 0.0
 
-    uv_shape_key.data.foreach_set("co", shape_key_coords)
+    uv_shape_key.data.foreach_set("co", shape_key_coords.reshape(-1))
     sync_obj.data.update()
+    state.signature = signature
+    return True
+
+
+def _sync_entries(scene, entries):
+    """同步给定的注册表条目，返回 (写了形态键的物体数, 是否有条目找不到物体)。"""
+    updated = 0
+    missing = False
+    for pointer, state in entries:
+        obj = _resolve(pointer, state)
+        if obj is None or SYNC_SOURCE_PROP not in obj:
+            _REGISTRY.pop(pointer, None)
+            missing = True
+            continue
+        if obj.name not in scene.objects:
+            continue
+        if update_uv_shape_key(obj, state):
+            updated += 1
+    return updated, missing
 
 
 def frame_change_sync_handler(scene, depsgraph):
-    for obj in scene.objects:
-        if SYNC_SOURCE_PROP in obj:
-            if obj.name in depsgraph.ids:
-                update_uv_shape_key(obj)
+    started = time.perf_counter()
+    updated, missing = _sync_entries(scene, list(_REGISTRY.items()))
+    if missing:
+        # 找不到的物体可能只是换了指针（删除后撤销），重新找一遍，新登记的本帧就同步
+        updated += _sync_entries(scene, rediscover())[0]
+    FRAME_STATS['objects'] = len(_REGISTRY)
+    FRAME_STATS['updated'] = updated
+    FRAME_STATS['milliseconds'] = (time.perf_counter() - started) * 1000.0
+
+
+def undo_redo_handler(*_args):
+    """撤销 / 重做后物体指针会变，按自定义属性重新登记同步物体。"""
+    rediscover()
 
 
 def register_handler():
     if frame_change_sync_handler not in bpy.app.handlers.frame_change_post:
         bpy.app.handlers.frame_change_post.append(frame_change_sync_handler)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if undo_redo_handler not in handlers:
+            handlers.append(undo_redo_handler)
     print("UV同步处理器已激活。")
 
 
 def unregister_handler():
     if frame_change_sync_handler in bpy.app.handlers.frame_change_post:
         bpy.app.handlers.frame_change_post.remove(frame_change_sync_handler)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if undo_redo_handler in handlers:
+            handlers.remove(undo_redo_handler)
 
 
 class SHIYUME_OT_MeshUVSyncLive(bpy.types.Operator):
@@ -184,7 +252,8 @@ class SHIYUME_OT_MeshUVSyncLive(bpy.types.Operator):
             sync_obj.active_shape_key_index = sync_obj.data.shape_keys.key_blocks.keys().index("UVSync")
             uv_shape.value = 1.0
 
-            update_uv_shape_key(sync_obj)
+            track(sync_obj)
+            update_uv_shape_key(sync_obj, _REGISTRY[sync_obj.as_pointer()])
 
         register_handler()
         self.report({'INFO'}, "实时UV同步已激活，原网格已被分割。")
@@ -199,5 +268,6 @@ class SHIYUME_OT_MeshUVSyncLiveDisable(bpy.types.Operator):
 
     def execute(self, context):
         unregister_handler()
+        untrack_all()
         self.report({'INFO'}, "UV同步处理器已停用")
         return {'FINISHED'}
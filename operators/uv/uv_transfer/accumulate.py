@@ -0,0 +1,92 @@
+"""重采样累加器：把逐样本颜色按 (像素, 通道) 合成一个下标，用 bincount 一次累进缓冲。
+
+纯 numpy，不引用 bpy。缓冲按 _group_by_workload 的组分配一次，组内各批源图只清零、
+不重新分配；可选 float64 累加，重叠严重的岛也不会因 float32 逐块相加而漂移。
+"""
+
+import numpy as np
+
+CHANNELS = 4
+
+# 单次融合 bincount 的元素上限（输出长度与下标长度都受它约束），超过就把一批源图拆开数；
+# 单张源图的触及区间就超过它时改为逐通道计数
+FUSED_BINCOUNT_BUDGET = 16 * 1024 * 1024
+
+
+class Accumulator:
+    """一个输出尺寸下的覆盖数与颜色和缓冲，按槽位容纳同一批的多张源图。"""
+
+    def __init__(self, pixel_total, capacity, precise=False):
+        self.pixel_total = pixel_total
+        self.dtype = np.float64 if precise else np.float32
+        self.coverage = np.zeros(pixel_total, dtype=self.dtype)
+        self.colors = np.zeros((max(1, capacity), pixel_total * CHANNELS), dtype=self.dtype)
+        self.count = 0
+
+    def reset(self, count):
+        """为下一批 count 张源图清零；容量不够时才重新分配。"""
+        if count > self.colors.shape[0]:
+            self.colors = np.zeros((count, self.colors.shape[1]), dtype=self.dtype)
+        else:
+            self.colors[:count].fill(0)
+        self.coverage.fill(0)
+        self.count = count
+
+    def add(self, pixel, samples):
+        """累加一块样本；samples 是本批每张源图的 (N, 4) 采样值，顺序即槽位顺序。
+
+        只在本块实际触及的像素区间 [low, high] 上计数：光栅化按瓦片产出，块内像素集中，
+        临时缓冲随区间而不是整张图增长。区间本身超出预算时退回逐通道计数。
+        """
+        if pixel.size == 0:
+            return
+        low = int(pixel.min())
+        high = int(pixel.max()) + 1
+        extent = high - low
+        local = pixel - low
+        self.coverage[low:high] += np.bincount(local, minlength=extent)
+
+        span = extent * CHANNELS
+        colors = self.colors[:, low * CHANNELS:high * CHANNELS]
+        if span > FUSED_BINCOUNT_BUDGET:
+            for slot, sample in enumerate(samples):
+                for channel in range(CHANNELS):
+                    colors[slot, channel::CHANNELS] += np.bincount(
+                        local, weights=sample[:, channel], minlength=extent)
+            return
+
+        composite = (local[:, None] * CHANNELS
+                     + np.arange(CHANNELS, dtype=np.int64)).reshape(-1)
+        per_call = max(1, min(FUSED_BINCOUNT_BUDGET // span,
+                              FUSED_BINCOUNT_BUDGET // max(1, composite.size)))
+
+        for first in range(0, len(samples), per_call):
+            group = samples[first:first + per_call]
+            if len(group) == 1:
+                index = composite
+                weights = group[0].reshape(-1)
+            else:
+                offsets = np.arange(len(group), dtype=np.int64)[:, None] * span
+                index = (composite[None, :] + offsets).reshape(-1)
+                weights = np.stack(group).reshape(-1)
+            summed = np.bincount(index, weights=weights, minlength=span * len(group))
+            colors[first:first + len(group)] += summed.reshape(len(group), span)
+
+    def covered(self):
+        return self.coverage > 0.0
+
+    def overlapped(self, subsamples):
+        """被多个面覆盖的像素数：覆盖样本超过单像素子采样数即视为重叠。"""
+        return int((self.coverage > subsamples + 0.5).sum())
+
+    def resolve(self, slot, subsamples, covered):
+        """把槽位 slot 的颜色和归一化成 (pixel_total, 4) float32。"""
+        accumulator = self.colors[slot].reshape(self.pixel_total, CHANNELS)
+        rgba = np.zeros((self.pixel_total, CHANNELS), dtype=self.dtype)
+        # RGB 只按几何覆盖归一化——边缘像素拿到的是纯表面色，绝不掺背景
+        np.divide(accumulator[:, 0:3], self.coverage[:, None],
+                  out=rgba[:, 0:3], where=covered[:, None])
+        # alpha 按整像素足迹归一化，未覆盖的子采样点自然把边缘压软
+        np.divide(accumulator[:, 3], subsamples, out=rgba[:, 3], where=covered)
+        np.clip(rgba[:, 3], 0.0, 1.0, out=rgba[:, 3])
+        return rgba.astype(np.float32, copy=False)
@@ -10,19 +10,62 @@ import re
 import bpy
 import numpy as np
 
+from . import texture_cache
+
 _RUN_INDEX = re.compile(r"_\d{3}$")
 
+# 源贴图解码缓存，整个会话共用一份；由 source_cache 按设置惰性建立
+_SOURCE_CACHE = None
 
-def read_rgba(image):
-    """读出 (height, width, 4) float32，第 0 行对应 v=0。"""
-    width, height = image.size
-    if width == 0 or height == 0:
-        return None
+
+def _decode(image, width, height):
     buffer = np.empty(width * height * 4, dtype=np.float32)
     image.pixels.foreach_get(buffer)
     return buffer.reshape(height, width, 4)
 
 
+def _source_file(image):
+    """能按磁盘文件身份缓存的图像返回其绝对路径；打包、生成或改过未存的返回 None。"""
+    if image.source != 'FILE' or image.packed_file is not None or image.is_dirty:
+        return None
+    path = bpy.path.abspath(image.filepath, library=image.library)
+    return path if os.path.isfile(path) else None
+
+
+def read_rgba(image, cache=None):
+    """读出 (height, width, 4) float32，第 0 行对应 v=0。
+
+    给了 cache（texture_cache.TextureCache）时，磁盘文件来源的图优先取缓存里的只读
+    memmap，未命中才走 foreach_get 并顺手入库。
+    """
+    width, height = image.size
+    if width == 0 or height == 0:
+        return None
+
+    path = _source_file(image) if cache is not None else None
+    if path is None:
+        return _decode(image, width, height)
+
+    stat = os.stat(path)
+    return cache.fetch(path, stat.st_mtime_ns, stat.st_size,
+                       image.colorspace_settings.name, (height, width, 4),
+                       lambda: _decode(image, width, height))
+
+
+def source_cache(settings):
+    """按设置返回会话内共用的源贴图缓存；关闭缓存时返回 None。"""
+    global _SOURCE_CACHE
+    if not settings.use_source_cache:
+        return None
+    budget = settings.source_cache_size * 1024 * 1024
+    if _SOURCE_CACHE is None:
+        _SOURCE_CACHE = texture_cache.TextureCache(
+            texture_cache.default_directory(), budget)
+    elif _SOURCE_CACHE.budget != budget:
+        _SOURCE_CACHE.resize(budget)
+    return _SOURCE_CACHE
+
+
 def output_name(source_image, suffix="_Retarget"):
     """由源图名推导输出名基底；反复重定向不会把后缀和序号叠成一串。"""
     base = os.path.splitext(source_image.name)[0]
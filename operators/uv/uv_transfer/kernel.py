@@ -1,13 +1,47 @@
-"""UV 传输内核：目标 UV 三角形光栅化、源图双线性采样、JFA 边缘膨胀。
+"""UV 传输内核：目标 UV 三角形光栅化（瓦片并行）、源图双线性采样、精确距离变换边缘膨胀。
 
 纯 numpy，不引用 bpy，也不认识材质/物体/图像数据块——只处理数组。
+距离变换在 operators/_distance_transform.py，与着色器工具共用；子进程里没有包上下文，按路径载入。
 """
 
+import importlib.util
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
+try:
+    from ... import _distance_transform as distance_transform
+except ImportError:
+    def _load_shared(name):
+        qualified = f"_shiyume_{name}"
+        module = sys.modules.get(qualified)
+        if module is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+                                name + ".py")
+            spec = importlib.util.spec_from_file_location(qualified, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[qualified] = module
+        return module
+
+    distance_transform = _load_shared("_distance_transform")
+
 # 单块样本数上限，控制光栅化过程的峰值内存
 SAMPLE_CHUNK_BUDGET = 2_000_000
 
+# 光栅化后端：TILED 按瓦片分箱、线程池并行；EXPAND 为整包围盒展开的单线程路径
+RASTER_TILED = 'TILED'
+RASTER_EXPAND = 'EXPAND'
+# 瓦片边长（采样点数），单块瓦片的展开量以此为界
+RASTER_TILE_SIZE = 64
+
+# 边缘外扩求最近种子的方式：EXACT 为可分离精确距离变换；JFA 为跳跃泛洪（保留作回退）
+DILATE_EXACT = 'EXACT'
+DILATE_JFA = 'JFA'
+
 EXTENSION_REPEAT = 'REPEAT'
 EXTENSION_EXTEND = 'EXTEND'
 
@@ -34,17 +68,8 @@ def _chunk_bounds(counts, budget):
     return bounds
 
 
-def iter_samples(target_uv, source_uv, width, height, supersample,
-                 budget=SAMPLE_CHUNK_BUDGET):
-    """光栅化目标 UV 三角形，分块产出 (最终像素扁平下标, 该样本对应的源 UV)。
-
-    target_uv / source_uv 均为 (T, 3, 2) float32；超采样样本按 supersample 折回最终像素，
-    因此调用方用 bincount 累加即可得到覆盖数与颜色和。
-    """
-    triangle_count = target_uv.shape[0]
-    if triangle_count == 0:
-        return
-
+def _raster_grid(target_uv, width, height, supersample):
+    """把目标三角形换算到采样索引空间，并求出每个三角形覆盖的采样点包围盒。"""
     grid_width = width * supersample
     grid_height = height * supersample
 
@@ -56,6 +81,71 @@ def iter_samples(target_uv, source_uv, width, height, supersample,
     x_max = np.clip(np.floor(px.max(axis=1)), 0, grid_width - 1).astype(np.int32)
     y_min = np.clip(np.ceil(py.min(axis=1)), 0, grid_height - 1).astype(np.int32)
     y_max = np.clip(np.floor(py.max(axis=1)), 0, grid_height - 1).astype(np.int32)
+    return px, py, x_min, x_max, y_min, y_max
+
+
+def _expand_boxes(triangles, x_min, y_min, box_width, counts):
+    """把每个三角形的包围盒展开成逐采样点，返回 (所属三角形, ix, iy)。"""
+    total = int(counts.sum())
+    repeated = np.repeat(triangles, counts)
+    starts = np.cumsum(counts) - counts
+    local = np.arange(total, dtype=np.int64) - np.repeat(starts, counts)
+
+    repeated_width = np.repeat(box_width, counts)
+    ix = np.repeat(x_min, counts) + (local % repeated_width).astype(np.int32)
+    iy = np.repeat(y_min, counts) + (local // repeated_width).astype(np.int32)
+    return repeated, ix, iy
+
+
+def _resolve_hits(px, py, source_uv, repeated, ix, iy, width, supersample):
+    """对展开好的采样点做重心坐标内外测试，返回 (最终像素扁平下标, 源 UV)；没命中返回 None。
+
+    两种光栅化后端共用这一段，保证同一采样点的判定与插值逐位一致。
+    """
+    ax = px[repeated, 0]
+    ay = py[repeated, 0]
+    edge0_x = px[repeated, 1] - ax
+    edge0_y = py[repeated, 1] - ay
+    edge1_x = px[repeated, 2] - ax
+    edge1_y = py[repeated, 2] - ay
+
+    denominator = edge0_x * edge1_y - edge1_x * edge0_y
+    non_degenerate = denominator != 0
+    inverse = np.zeros_like(denominator)
+    np.divide(np.float32(1.0), denominator, out=inverse, where=non_degenerate)
+
+    qx = ix.astype(np.float32) - ax
+    qy = iy.astype(np.float32) - ay
+    weight1 = (qx * edge1_y - edge1_x * qy) * inverse
+    weight2 = (edge0_x * qy - qx * edge0_y) * inverse
+    weight0 = np.float32(1.0) - weight1 - weight2
+
+    inside = non_degenerate & (weight0 >= 0) & (weight1 >= 0) & (weight2 >= 0)
+    hit = np.nonzero(inside)[0]
+    if hit.size == 0:
+        return None
+
+    hit_triangles = repeated[hit]
+    w0 = weight0[hit]
+    w1 = weight1[hit]
+    w2 = weight2[hit]
+
+    u = (source_uv[hit_triangles, 0, 0] * w0
+         + source_uv[hit_triangles, 1, 0] * w1
+         + source_uv[hit_triangles, 2, 0] * w2)
+    v = (source_uv[hit_triangles, 0, 1] * w0
+         + source_uv[hit_triangles, 1, 1] * w1
+         + source_uv[hit_triangles, 2, 1] * w2)
+
+    pixel = ((iy[hit] // supersample).astype(np.int64) * width
+             + (ix[hit] // supersample))
+    return pixel, np.stack((u, v), axis=1)
+
+
+def _iter_expand(target_uv, source_uv, width, height, supersample, budget):
+    """EXPAND 后端：整个包围盒按样本数分块展开，单线程。"""
+    px, py, x_min, x_max, y_min, y_max = _raster_grid(
+        target_uv, width, height, supersample)
 
     box_width = (x_max - x_min + 1).astype(np.int64)
     box_height = (y_max - y_min + 1).astype(np.int64)
@@ -68,55 +158,128 @@ def iter_samples(target_uv, source_uv, width, height, supersample,
 
     for low, high in _chunk_bounds(kept_counts, budget):
         block_triangles = keep[low:high]
-        block_counts = kept_counts[low:high]
-        block_total = int(block_counts.sum())
-
-        repeated = np.repeat(block_triangles, block_counts)
-        starts = np.cumsum(block_counts) - block_counts
-        local = np.arange(block_total, dtype=np.int64) - np.repeat(starts, block_counts)
-
-        repeated_width = box_width[repeated]
-        ix = x_min[repeated] + (local % repeated_width).astype(np.int32)
-        iy = y_min[repeated] + (local // repeated_width).astype(np.int32)
-
-        ax = px[repeated, 0]
-        ay = py[repeated, 0]
-        edge0_x = px[repeated, 1] - ax
-        edge0_y = py[repeated, 1] - ay
-        edge1_x = px[repeated, 2] - ax
-        edge1_y = py[repeated, 2] - ay
-
-        denominator = edge0_x * edge1_y - edge1_x * edge0_y
-        non_degenerate = denominator != 0
-        inverse = np.zeros_like(denominator)
-        np.divide(np.float32(1.0), denominator, out=inverse, where=non_degenerate)
-
-        qx = ix.astype(np.float32) - ax
-        qy = iy.astype(np.float32) - ay
-        weight1 = (qx * edge1_y - edge1_x * qy) * inverse
-        weight2 = (edge0_x * qy - qx * edge0_y) * inverse
-        weight0 = np.float32(1.0) - weight1 - weight2
-
-        inside = non_degenerate & (weight0 >= 0) & (weight1 >= 0) & (weight2 >= 0)
-        hit = np.nonzero(inside)[0]
-        if hit.size == 0:
+        repeated, ix, iy = _expand_boxes(
+            block_triangles, x_min[block_triangles], y_min[block_triangles],
+            box_width[block_triangles], kept_counts[low:high])
+        hits = _resolve_hits(px, py, source_uv, repeated, ix, iy, width, supersample)
+        if hits is not None:
+            yield hits
+
+
+def _bin_into_tiles(triangles, x_min, x_max, y_min, y_max, tiles_x):
+    """把三角形按包围盒分进 RASTER_TILE_SIZE 见方的瓦片，返回按瓦片排好的 (瓦片号, 三角形)。"""
+    tile = RASTER_TILE_SIZE
+    tile_x0 = x_min[triangles] // tile
+    tile_y0 = y_min[triangles] // tile
+    span_x = (x_max[triangles] // tile - tile_x0 + 1).astype(np.int64)
+    span_y = (y_max[triangles] // tile - tile_y0 + 1).astype(np.int64)
+
+    repeated, tile_x, tile_y = _expand_boxes(
+        triangles, tile_x0, tile_y0, span_x, span_x * span_y)
+    tile_ids = tile_y.astype(np.int64) * tiles_x + tile_x
+
+    order = np.argsort(tile_ids, kind='stable')
+    return tile_ids[order], repeated[order]
+
+
+def _rasterize_tile(px, py, source_uv, tile_triangles, bounds, width, supersample):
+    """只在一块瓦片内光栅化：包围盒先裁到瓦片，展开量不超过瓦片面积 × 三角形数。"""
+    x_min, x_max, y_min, y_max, tile_x, tile_y = bounds
+    tile = RASTER_TILE_SIZE
+    low_x = tile_x * tile
+    low_y = tile_y * tile
+
+    clipped_x_min = np.maximum(x_min[tile_triangles], low_x)
+    clipped_x_max = np.minimum(x_max[tile_triangles], low_x + tile - 1)
+    clipped_y_min = np.maximum(y_min[tile_triangles], low_y)
+    clipped_y_max = np.minimum(y_max[tile_triangles], low_y + tile - 1)
+
+    box_width = (clipped_x_max - clipped_x_min + 1).astype(np.int64)
+    counts = box_width * (clipped_y_max - clipped_y_min + 1)
+
+    repeated, ix, iy = _expand_boxes(
+        tile_triangles, clipped_x_min, clipped_y_min, box_width, counts)
+    return _resolve_hits(px, py, source_uv, repeated, ix, iy, width, supersample)
+
+
+def _ordered_results(function, tasks, workers):
+    """在线程池上执行 tasks，按提交顺序产出结果；在途任务数有上限，内存不随瓦片数增长。"""
+    window = max(1, workers) * 2
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(function, *task))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_tiled(target_uv, source_uv, width, height, supersample, budget, workers):
+    """TILED 后端：三角形分箱到瓦片，瓦片在线程池上各自光栅化，再按 budget 攒块产出。"""
+    px, py, x_min, x_max, y_min, y_max = _raster_grid(
+        target_uv, width, height, supersample)
+
+    keep = np.nonzero((x_max >= x_min) & (y_max >= y_min))[0].astype(np.int32)
+    if keep.size == 0:
+        return
+
+    tiles_x = -(-width * supersample // RASTER_TILE_SIZE)
+    tile_ids, tile_triangles = _bin_into_tiles(
+        keep, x_min, x_max, y_min, y_max, tiles_x)
+    splits = np.nonzero(np.diff(tile_ids))[0] + 1
+    starts = np.concatenate(([0], splits))
+    stops = np.concatenate((splits, [tile_ids.size]))
+
+    def tasks():
+        for start, stop in zip(starts, stops):
+            tile_y, tile_x = divmod(int(tile_ids[start]), tiles_x)
+            bounds = (x_min, x_max, y_min, y_max, tile_x, tile_y)
+            yield (px, py, source_uv, tile_triangles[start:stop], bounds,
+                   width, supersample)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pixel_parts = []
+    uv_parts = []
+    pending_samples = 0
+    for hits in _ordered_results(_rasterize_tile, tasks(), workers):
+        if hits is None:
             continue
+        pixel_parts.append(hits[0])
+        uv_parts.append(hits[1])
+        pending_samples += hits[0].size
+        # 攒够一块再交出去——调用方每块都要做一次全图 bincount，块太碎反而慢
+        if pending_samples >= budget:
+            yield np.concatenate(pixel_parts), np.concatenate(uv_parts)
+            pixel_parts = []
+            uv_parts = []
+            pending_samples = 0
+    if pixel_parts:
+        yield np.concatenate(pixel_parts), np.concatenate(uv_parts)
+
 
-        hit_triangles = repeated[hit]
-        w0 = weight0[hit]
-        w1 = weight1[hit]
-        w2 = weight2[hit]
+def iter_samples(target_uv, source_uv, width, height, supersample,
+                 budget=SAMPLE_CHUNK_BUDGET, backend=RASTER_TILED, workers=None):
+    """光栅化目标 UV 三角形，分块产出 (最终像素扁平下标, 该样本对应的源 UV)。
 
-        u = (source_uv[hit_triangles, 0, 0] * w0
-             + source_uv[hit_triangles, 1, 0] * w1
-             + source_uv[hit_triangles, 2, 0] * w2)
-        v = (source_uv[hit_triangles, 0, 1] * w0
-             + source_uv[hit_triangles, 1, 1] * w1
-             + source_uv[hit_triangles, 2, 1] * w2)
+    target_uv / source_uv 均为 (T, 3, 2) float32；超采样样本按 supersample 折回最终像素，
+    因此调用方用 bincount 累加即可得到覆盖数与颜色和。
 
-        pixel = ((iy[hit] // supersample).astype(np.int64) * width
-                 + (ix[hit] // supersample))
-        yield pixel, np.stack((u, v), axis=1)
+    backend 选光栅化方式：TILED 按瓦片多线程光栅化，峰值内存按瓦片计；
+    EXPAND 是整包围盒展开的单线程旧路径。两者产出的样本集合完全相同，只是顺序不同。
+    workers 为 None 时按 CPU 核数开线程，仅 TILED 使用。
+    """
+    if target_uv.shape[0] == 0:
+        return
+    if backend == RASTER_EXPAND:
+        yield from _iter_expand(target_uv, source_uv, width, height, supersample, budget)
+    elif backend == RASTER_TILED:
+        yield from _iter_tiled(target_uv, source_uv, width, height, supersample,
+                               budget, workers)
+    else:
+        raise ValueError(f"未知的光栅化后端: {backend}")
 
 
 def sample_bilinear(image, uv, extension):
@@ -166,14 +329,8 @@ def _gather(array, offset_x, offset_y, empty):
     return out
 
 
-def dilate_edges(color, coverage, margin):
-    """把已覆盖像素的 RGB 向外扩散 margin 像素（JFA 求最近种子），alpha 保持不变。
-
-    只写未覆盖像素，覆盖区原样保留——这样边缘像素永远不会被外扩区反向污染。
-    """
-    if margin <= 0 or not coverage.any() or coverage.all():
-        return color
-
+def _nearest_seed_jfa(coverage, margin):
+    """JFA 求最近种子：步长从 margin 向下减半，每步 8 个方向探测，结果近似。"""
     height, width = coverage.shape
     columns = np.broadcast_to(np.arange(width, dtype=np.int32), (height, width))
     rows = np.broadcast_to(np.arange(height, dtype=np.int32)[:, None], (height, width))
@@ -201,6 +358,26 @@ def dilate_edges(color, coverage, margin):
             distance = np.where(better, candidate_distance, distance)
         step >>= 1
 
+    return seed_x, seed_y, distance
+
+
+def dilate_edges(color, coverage, margin, method=DILATE_EXACT):
+    """把已覆盖像素的 RGB 向外扩散 margin 像素，alpha 保持不变。
+
+    只写未覆盖像素，覆盖区原样保留——这样边缘像素永远不会被外扩区反向污染。
+    method 选最近种子的求法：EXACT 为精确距离变换（默认），JFA 为旧的跳跃泛洪。
+    颜色在求出最近种子后一次性取回。
+    """
+    if margin <= 0 or not coverage.any() or coverage.all():
+        return color
+
+    if method == DILATE_JFA:
+        seed_x, seed_y, distance = _nearest_seed_jfa(coverage, margin)
+    elif method == DILATE_EXACT:
+        seed_x, seed_y, distance = distance_transform.nearest_seed(coverage)
+    else:
+        raise ValueError(f"未知的外扩方式: {method}")
+
     fill = (~coverage) & (seed_x >= 0) & (distance <= margin * margin)
     color[fill, 0:3] = color[seed_y[fill], seed_x[fill], 0:3]
     return color
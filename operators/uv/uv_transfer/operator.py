@@ -108,6 +108,9 @@ class SHIYUME_OT_UVTransfer(bpy.types.Operator):
         message = f"{source.label}完成 — {len(result['outputs'])} 张贴图"
         if saved:
             message += f"，已写入 {settings.output_dir}"
+        if 'cache' in result:
+            hits, misses = result['cache']
+            message += f"，源贴图缓存命中 {hits} / 未命中 {misses}"
         self.report({'INFO'}, message)
         for note in notes:
             self.report({'WARNING'}, note)
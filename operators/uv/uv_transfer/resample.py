@@ -4,12 +4,14 @@
 因此没有抗锯齿边缘与背景混色，边缘像素永远不会被外扩区反向污染。
 """
 
+from concurrent.futures.process import BrokenProcessPool
+
 import numpy as np
 
 from . import graph_bind
 from . import image_bind
-from . import kernel
 from . import mesh_bind
+from . import scheduler
 
 # 一批同时驻留内存的源图字节上限
 _SOURCE_MEMORY_BUDGET = 512 * 1024 * 1024
@@ -83,60 +85,23 @@ def _gather_triangles(job, slots):
     return np.concatenate(target_parts), np.concatenate(source_parts)
 
 
-def _transfer(job, batch, target_triangles, source_triangles, width, height, outputs):
-    """一次光栅化，供本批所有源图共用；返回检测到的重叠像素数。"""
-    settings = job.settings
-    pixel_total = width * height
-    supersample = int(settings.supersample)
-    subsamples = float(supersample * supersample)
-
-    sources = {}
-    for image in batch:
-        pixels = image_bind.read_rgba(image)
-        if pixels is not None:
-            sources[image] = pixels
-    if not sources:
-        return 0
-
-    accumulators = {image: np.zeros((pixel_total, 4), dtype=np.float32)
-                    for image in sources}
-    coverage = np.zeros(pixel_total, dtype=np.float32)
-
-    for pixel, uv in kernel.iter_samples(target_triangles, source_triangles,
-                                         width, height, supersample):
-        coverage += np.bincount(pixel, minlength=pixel_total).astype(np.float32)
-        for image, pixels in sources.items():
-            sampled = kernel.sample_bilinear(pixels, uv, settings.extension)
-            accumulator = accumulators[image]
-            for channel in range(4):
-                accumulator[:, channel] += np.bincount(
-                    pixel, weights=sampled[:, channel],
-                    minlength=pixel_total).astype(np.float32)
-
-    covered = coverage > 0.0
-    if not covered.any():
-        return 0
-
-    for image in sources:
-        accumulator = accumulators[image]
-        rgba = np.zeros((pixel_total, 4), dtype=np.float32)
-        # RGB 只按几何覆盖归一化——边缘像素拿到的是纯表面色，绝不掺背景
-        np.divide(accumulator[:, 0:3], coverage[:, None],
-                  out=rgba[:, 0:3], where=covered[:, None])
-        # alpha 按整像素足迹归一化，未覆盖的子采样点自然把边缘压软
-        np.divide(accumulator[:, 3], subsamples, out=rgba[:, 3], where=covered)
-        np.clip(rgba[:, 3], 0.0, 1.0, out=rgba[:, 3])
-
-        planar = rgba.reshape(height, width, 4)
-        kernel.dilate_edges(planar, covered.reshape(height, width), settings.margin)
+def _source_bytes(images):
+    return sum(image.size[0] * image.size[1] * 4 * 4 for image in images)
 
-        name = image_bind.unique_name(
-            image_bind.output_name(image), job.output_directory)
-        output = image_bind.create_output(name, width, height, image)
-        image_bind.write_rgba(output, planar)
-        outputs[image] = output
 
-    return int((coverage > subsamples + 0.5).sum())
+def _tasks(job, image_slots):
+    """把每个 workload 组按内存分批，摊成调度器的任务列表；顺序即落地顺序。"""
+    tasks = []
+    for group, images in _group_by_workload(job, image_slots).items():
+        slots, width, height = group
+        target_triangles, source_triangles = _gather_triangles(job, slots)
+        if target_triangles is None:
+            continue
+        for batch in _memory_batches(images, _SOURCE_MEMORY_BUDGET):
+            tasks.append(scheduler.Task(group, batch, _source_bytes(batch),
+                                        target_triangles, source_triangles,
+                                        width, height))
+    return tasks
 
 
 def run(job):
@@ -148,15 +113,43 @@ def run(job):
         return None
 
     outputs = {}
-    overlapped = 0
+    cache = image_bind.source_cache(job.settings)
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+    options = scheduler.render_options(job.settings)
+    tasks = _tasks(job, image_slots)
 
-    for (slots, width, height), images in _group_by_workload(job, image_slots).items():
-        target_triangles, source_triangles = _gather_triangles(job, slots)
-        if target_triangles is None:
-            continue
-        for batch in _memory_batches(images, _SOURCE_MEMORY_BUDGET):
-            overlapped += _transfer(job, batch, target_triangles, source_triangles,
-                                    width, height, outputs)
+    def read(image):
+        return image_bind.read_rgba(image, cache)
+
+    def write(image, planar):
+        height, width = planar.shape[0], planar.shape[1]
+        name = image_bind.unique_name(
+            image_bind.output_name(image), job.output_directory)
+        output = image_bind.create_output(name, width, height, image)
+        image_bind.write_rgba(output, planar)
+        outputs[image] = output
+
+    workers = job.settings.workers
+    if workers > 1 and len(tasks) > 1:
+        try:
+            overlapped = scheduler.run_parallel(
+                tasks, options, read, write, workers, _SOURCE_MEMORY_BUDGET)
+        except (BrokenProcessPool, OSError) as exception:
+            job.warn(f"并行进程启动失败，改为单进程执行: {exception}")
+            # 已落地的图不重做，剩下的按原顺序串行补完
+            remaining = []
+            for task in tasks:
+                pending = [image for image in task.images if image not in outputs]
+                if pending:
+                    remaining.append(scheduler.Task(
+                        task.group, pending, _source_bytes(pending),
+                        task.target_triangles, task.source_triangles,
+                        task.width, task.height))
+            overlapped = getattr(exception, 'overlapped', 0) + scheduler.run_serial(
+                remaining, options, read, write)
+    else:
+        overlapped = scheduler.run_serial(tasks, options, read, write)
 
     if not outputs:
         job.error("目标 UV 上没有任何三角形落进 0~1 范围")
@@ -165,11 +158,15 @@ def run(job):
     if overlapped:
         job.warn(f"目标 UV 有 {overlapped} 个像素被多个面覆盖，重叠处取最后写入的面")
 
-    return {
+    result = {
         'outputs': list(outputs.values()),
         'replacements': outputs,
         'nodes': image_nodes,
     }
+    if cache is not None:
+        # 本次运行的命中情况（缓存对象的计数是整个会话累计的）
+        result['cache'] = (cache.hits - hits, cache.misses - misses)
+    return result
 
 
 def apply(job, result):
@@ -0,0 +1,333 @@
+"""重采样调度：把各 workload 组的源图批次分给多进程执行，结果按提交顺序落地。
+
+本模块不引用 bpy。读源图、建输出图这些要碰数据块的事由调用方以回调给出，
+只在主进程里做；子进程只跑纯 numpy 的光栅化 → 采样 → 累加 → 外扩。
+
+源图与输出图都放在 multiprocessing.shared_memory 里，子进程就地读写，不经 pickle。
+在途批次的源图字节总数受同一个预算约束——预算是全局的，不按进程各算一份。
+
+子进程导不进依赖 bpy 的插件包，所以工作函数不按模块名 pickle：进程池的 initializer
+在每个子进程里按文件路径把本文件载入一次、登记进 sys.modules，之后每批任务只按名字
+取回 _run_task（见 _WorkerEntry）；此时没有包上下文，兄弟模块按路径载入。
+每个子进程内的光栅化只用一个线程，并行度全由进程数决定。
+"""
+
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+try:
+    from . import accumulate
+    from . import kernel
+except ImportError:
+    def _load_sibling(name):
+        qualified = f"_shiyume_uv_transfer_{name}"
+        module = sys.modules.get(qualified)
+        if module is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name + ".py")
+            spec = importlib.util.spec_from_file_location(qualified, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[qualified] = module
+        return module
+
+    accumulate = _load_sibling("accumulate")
+    kernel = _load_sibling("kernel")
+
+
+class Task:
+    """一批共用同一次光栅化的源图：images 由调用方解释，这里只当作不透明的句柄。"""
+
+    def __init__(self, group, images, source_bytes, target_triangles, source_triangles,
+                 width, height):
+        self.group = group
+        self.images = images
+        # 本批源图解码后的字节数，由调用方按图像尺寸估出，用于在途预算
+        self.source_bytes = source_bytes
+        self.target_triangles = target_triangles
+        self.source_triangles = source_triangles
+        self.width = width
+        self.height = height
+
+
+def render_batch(sources, target_triangles, source_triangles, width, height,
+                 options, accumulator, planes, raster_workers=None):
+    """一次光栅化供 sources 里所有源图共用，结果写进 planes[i]（(H, W, 4) float32）。
+
+    返回 (是否有像素被覆盖, 重叠像素数)。options 是 render_options 给出的普通字典。
+    raster_workers 为光栅化线程数，None 时按 CPU 核数。
+    """
+    supersample = options['supersample']
+    subsamples = float(supersample * supersample)
+
+    accumulator.reset(len(sources))
+    for pixel, uv in kernel.iter_samples(target_triangles, source_triangles,
+                                         width, height, supersample, workers=raster_workers):
+        accumulator.add(pixel, [kernel.sample_bilinear(pixels, uv, options['extension'])
+                                for pixels in sources])
+
+    covered = accumulator.covered()
+    if not covered.any():
+        return False, 0
+
+    planar_coverage = covered.reshape(height, width)
+    for slot in range(len(sources)):
+        planes[slot] = accumulator.resolve(slot, subsamples, covered).reshape(height, width, 4)
+        kernel.dilate_edges(planes[slot], planar_coverage, options['margin'])
+
+    return True, accumulator.overlapped(subsamples)
+
+
+def run_serial(tasks, options, read, write):
+    """在本进程里逐批执行；同组相邻批次复用一套累加缓冲。返回重叠像素总数。
+
+    read(image) 返回 (H, W, 4) float32 或 None；write(image, planar) 落地一张结果。
+    """
+    overlapped = 0
+    accumulator = None
+    accumulator_key = None
+
+    for task in tasks:
+        sources = []
+        for image in task.images:
+            pixels = read(image)
+            if pixels is not None:
+                sources.append((image, pixels))
+        if not sources:
+            continue
+
+        if accumulator_key != task.group:
+            capacity = max(len(other.images) for other in tasks if other.group == task.group)
+            accumulator = accumulate.Accumulator(
+                task.width * task.height, capacity, precise=options['precise'])
+            accumulator_key = task.group
+
+        planes = np.empty((len(sources), task.height, task.width, 4), dtype=np.float32)
+        covered, count = render_batch(
+            [pixels for _image, pixels in sources], task.target_triangles,
+            task.source_triangles, task.width, task.height, options, accumulator, planes)
+        if not covered:
+            continue
+        overlapped += count
+        for slot, (image, _pixels) in enumerate(sources):
+            write(image, planes[slot])
+
+    return overlapped
+
+
+# -- 多进程 -------------------------------------------------------------------
+
+
+def _unpack(block, shapes):
+    """按各源图自己的 (H, W, 4) 形状，从一整块共享内存里依次切出视图。"""
+    views = []
+    offset = 0
+    for shape in shapes:
+        view = np.ndarray(shape, dtype=np.float32, buffer=block.buf, offset=offset)
+        views.append(view)
+        offset += view.nbytes
+    return views
+
+
+def _run_task(spec):
+    """子进程入口：挂上共享内存里的源图与输出图，跑完整条纯 numpy 管线。
+
+    共享内存只 close 不 unlink——回收由父进程负责；spawn 出的子进程与父进程共用同一个
+    resource tracker，挂接时的重复登记不会造成泄漏告警。
+    """
+    width = spec['width']
+    height = spec['height']
+    shapes = spec['source_shapes']
+
+    source_block = shared_memory.SharedMemory(name=spec['sources'])
+    output_block = shared_memory.SharedMemory(name=spec['outputs'])
+    try:
+        sources = _unpack(source_block, shapes)
+        planes = np.ndarray((len(shapes), height, width, 4), dtype=np.float32,
+                            buffer=output_block.buf)
+        accumulator = accumulate.Accumulator(
+            width * height, len(shapes), precise=spec['options']['precise'])
+        # 每个进程只开一个光栅化线程，否则 N 个进程会各自按核数开线程池
+        result = render_batch(
+            sources, spec['target_triangles'], spec['source_triangles'],
+            width, height, spec['options'], accumulator, planes, raster_workers=1)
+        del sources, planes
+        return result
+    finally:
+        source_block.close()
+        output_block.close()
+
+
+# 子进程里本文件登记在 sys.modules 中的名字
+_WORKER_MODULE = "_shiyume_uv_transfer_scheduler"
+
+# 进程池 initializer 经 exec 执行：按路径载入本文件并登记，每个子进程只执行一次
+_WORKER_BOOTSTRAP = (
+    "import importlib.util, sys\n"
+    "if name not in sys.modules:\n"
+    "    spec = importlib.util.spec_from_file_location(name, path)\n"
+    "    module = importlib.util.module_from_spec(spec)\n"
+    "    sys.modules[name] = module\n"
+    "    spec.loader.exec_module(module)\n"
+)
+
+
+class _WorkerModule:
+    """只在 pickle 时起作用：子进程解包出的是 initializer 已登记好的本模块。"""
+
+    def __reduce__(self):
+        return (importlib.import_module, (_WORKER_MODULE,))
+
+
+class _WorkerEntry:
+    """只在 pickle 时起作用：子进程解包出的是已载入模块里的 _run_task，不再重新执行本文件。"""
+
+    def __reduce__(self):
+        return (getattr, (_WorkerModule(), '_run_task'))
+
+
+class _Flight:
+    """一个已提交的批次，连同它占着的共享内存。"""
+
+    def __init__(self, task, images, source_block, output_block, future):
+        self.task = task
+        self.images = images
+        self.source_block = source_block
+        self.output_block = output_block
+        self.future = future
+        self.source_bytes = task.source_bytes
+
+    def release(self):
+        for block in (self.source_block, self.output_block):
+            block.close()
+            block.unlink()
+
+
+def _launch(pool, task, options, read):
+    """读源图进共享内存并提交；本批没有可读源图时返回 None。"""
+    pixels = [(image, read(image)) for image in task.images]
+    pixels = [(image, array) for image, array in pixels if array is not None]
+    if not pixels:
+        return None
+
+    shapes = [array.shape for _image, array in pixels]
+    source_bytes = sum(array.size for _image, array in pixels) * 4
+    output_bytes = len(pixels) * task.height * task.width * 4 * 4
+    source_block = shared_memory.SharedMemory(create=True, size=source_bytes)
+    try:
+        output_block = shared_memory.SharedMemory(create=True, size=output_bytes)
+    except BaseException:
+        source_block.close()
+        source_block.unlink()
+        raise
+    try:
+        for view, (_image, array) in zip(_unpack(source_block, shapes), pixels):
+            view[...] = array
+        del view
+
+        spec = {
+            'width': task.width,
+            'height': task.height,
+            'source_shapes': shapes,
+            'sources': source_block.name,
+            'outputs': output_block.name,
+            'target_triangles': task.target_triangles,
+            'source_triangles': task.source_triangles,
+            'options': options,
+        }
+        future = pool.submit(_WorkerEntry(), spec)
+    except BaseException:
+        for block in (source_block, output_block):
+            block.close()
+            block.unlink()
+        raise
+    images = [image for image, _array in pixels]
+    return _Flight(task, images, source_block, output_block, future)
+
+
+def _land(flight, write):
+    """等这一批算完，把结果按槽位顺序交给 write，返回重叠像素数。"""
+    covered, count = flight.future.result()
+    if not covered:
+        return 0
+    task = flight.task
+    planes = np.ndarray((len(flight.images), task.height, task.width, 4),
+                        dtype=np.float32, buffer=flight.output_block.buf)
+    for slot, image in enumerate(flight.images):
+        write(image, planes[slot])
+    del planes
+    return count
+
+
+def run_parallel(tasks, options, read, write, workers, memory_budget):
+    """多进程执行各批；write 的调用顺序与 run_serial 完全一致。返回重叠像素总数。
+
+    源图 read 后先拷进共享内存，在途批次的源图字节合计不超过 memory_budget
+    （单批本身超预算时也放行，但此时只有它一批在途）。
+    子进程起不来时抛 concurrent.futures.process.BrokenProcessPool（或 OSError），由调用方退回串行；
+    异常的 overlapped 属性是此前已落地各批的重叠像素数。
+    """
+    overlapped = 0
+    in_flight = deque()
+    used = 0
+
+    context = multiprocessing.get_context('spawn')
+    bootstrap = {'name': _WORKER_MODULE, 'path': os.path.abspath(__file__)}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=exec, initargs=(_WORKER_BOOTSTRAP, bootstrap)) as pool:
+            try:
+                for task in tasks:
+                    while in_flight and used + task.source_bytes > memory_budget:
+                        flight = in_flight.popleft()
+                        try:
+                            overlapped += _land(flight, write)
+                        finally:
+                            used -= flight.source_bytes
+                            flight.release()
+
+                    flight = _launch(pool, task, options, read)
+                    if flight is None:
+                        continue
+                    in_flight.append(flight)
+                    used += flight.source_bytes
+
+                while in_flight:
+                    flight = in_flight.popleft()
+                    try:
+                        overlapped += _land(flight, write)
+                    finally:
+                        flight.release()
+            finally:
+                for flight in in_flight:
+                    flight.future.cancel()
+                for flight in in_flight:
+                    try:
+                        flight.future.exception()
+                    except BaseException:
+                        pass
+                    flight.release()
+    except (BrokenProcessPool, OSError) as exception:
+        # 已落地批次的重叠数挂在异常上，调用方退回串行时接着累加
+        exception.overlapped = overlapped
+        raise
+
+    return overlapped
+
+
+def render_options(settings):
+    """从属性组里抽出子进程要用的参数——属性组本身不能跨进程。"""
+    return {
+        'supersample': int(settings.supersample),
+        'extension': settings.extension,
+        'margin': settings.margin,
+        'precise': settings.precise_accumulation,
+    }
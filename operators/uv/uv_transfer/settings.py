@@ -58,6 +58,27 @@ class SHIYUME_PG_UVTransfer(bpy.types.PropertyGroup):
         default=16, min=0, max=256,
         description="把边缘颜色向 UV 岛外扩散的像素数，供 mipmap 与双线性过滤使用",
     )
+    precise_accumulation: bpy.props.BoolProperty(
+        name="双精度累加",
+        default=False,
+        description="重采样时用 float64 累加颜色和，大面积重叠的岛不会产生精度漂移；累加缓冲占用翻倍",
+    )
+    workers: bpy.props.IntProperty(
+        name="并行进程",
+        default=1, min=1, max=64,
+        description="重采样时同时运行的子进程数。1 为在 Blender 进程内串行执行；"
+                    "多进程时源图经共享内存传递，总内存仍受同一预算约束",
+    )
+    use_source_cache: bpy.props.BoolProperty(
+        name="缓存源贴图",
+        default=False,
+        description="把解码后的源贴图存进用户缓存目录，文件未改动时下次直接内存映射读取；会占用磁盘空间",
+    )
+    source_cache_size: bpy.props.IntProperty(
+        name="缓存上限 (MB)",
+        default=512, min=64, max=262144,
+        description="源贴图缓存占用的磁盘上限，超出时淘汰最久未用的条目",
+    )
     bake_type: bpy.props.EnumProperty(
         name="烘焙通道",
         items=[
@@ -0,0 +1,161 @@
+"""源贴图解码缓存：把 Image.pixels 读出的 float32 RGBA 存成 .npy，下次按内存映射直接取用。
+
+纯 numpy，不引用 bpy——键由调用方给出 (文件路径, mtime, 字节数, 色彩空间)，
+任何一项变了都会落到新键上，旧条目随 LRU 淘汰。缓存读出的数组是只读 memmap，
+重采样只读不写，因此全程零拷贝。
+"""
+
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+_SUFFIX = ".npy"
+
+
+def default_directory():
+    """按平台惯例挑用户缓存目录。"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return os.path.join(base, "ShiyumeBlender", "uv_transfer")
+
+
+def make_key(filepath, mtime, size, colorspace):
+    """由源文件身份算出内容寻址键；同一文件改过、换了色彩空间都会得到新键。"""
+    identity = f"{os.path.normcase(os.path.abspath(filepath))}\0{mtime!r}\0{size}\0{colorspace}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+class TextureCache:
+    """磁盘上的 LRU 缓存，总字节数不超过 budget；hits / misses 记录本会话的命中情况。"""
+
+    def __init__(self, directory, budget):
+        self.directory = directory
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        # key -> 字节数，按最近使用排序（最旧在前）
+        self._entries = OrderedDict()
+        # 源文件路径 -> 它当前对应的键，用来在文件变化时立即丢掉旧条目
+        self._by_source = {}
+        self._scan()
+
+    @property
+    def total_bytes(self):
+        return sum(self._entries.values())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _scan(self):
+        """接手磁盘上已有的条目，按文件 mtime 还原 LRU 顺序。"""
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name[: -len(_SUFFIX)], stat.st_size))
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+        self._evict()
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        total = self.total_bytes
+        while self._entries and total > self.budget:
+            key, size = next(iter(self._entries.items()))
+            self._drop(key)
+            total -= size
+
+    def resize(self, budget):
+        """改字节预算，超出部分立即按 LRU 淘汰。"""
+        self.budget = budget
+        self._evict()
+
+    def lookup(self, key):
+        """命中返回只读 memmap，并把条目挪到最近使用；未命中或文件损坏返回 None。"""
+        if key not in self._entries:
+            return None
+        try:
+            array = np.load(self._path(key), mmap_mode='r')
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return array
+
+    def store(self, key, array):
+        """写入条目并返回其只读 memmap；超出预算或写盘失败时原样返回 array。"""
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        if array.nbytes > self.budget:
+            return array
+        path = self._path(key)
+        staging = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(staging, 'wb') as handle:
+                np.save(handle, array)
+            os.replace(staging, path)
+            self._entries[key] = os.path.getsize(path)
+            self._entries.move_to_end(key)
+            self._evict()
+            if key not in self._entries:
+                return array
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            try:
+                os.remove(staging)
+            except OSError:
+                pass
+            self._entries.pop(key, None)
+            return array
+
+    def invalidate(self, filepath):
+        """丢掉某个源文件当前的条目。"""
+        key = self._by_source.pop(os.path.normcase(os.path.abspath(filepath)), None)
+        if key is not None:
+            self._drop(key)
+
+    def fetch(self, filepath, mtime, size, colorspace, shape, decode):
+        """按源文件身份取数组；未命中时调 decode() 解码并入库。
+
+        shape 是期望的数组形状，缓存里的形状对不上就视为失效。decode 返回 None 时不入库。
+        """
+        key = make_key(filepath, mtime, size, colorspace)
+        source = os.path.normcase(os.path.abspath(filepath))
+        previous = self._by_source.get(source)
+        if previous is not None and previous != key:
+            self._drop(previous)
+
+        array = self.lookup(key)
+        if array is not None and array.shape == tuple(shape):
+            self.hits += 1
+            self._by_source[source] = key
+            return array
+        if array is not None:
+            self._drop(key)
+
+        self.misses += 1
+        decoded = decode()
+        if decoded is None:
+            return None
+        self._by_source[source] = key
+        return self.store(key, decoded)
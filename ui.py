@@ -1,5 +1,7 @@
 import bpy
 
+from .operators.uv import mesh_uv_sync_live
+
 
 # ---------------------------------------------------------------------------
 # Right-click context menu (mode-aware)
@@ -207,6 +209,12 @@ class SHIYUME_PT_UV(bpy.types.Panel):
         layout.operator("shiyume.mesh_uv_sync", icon="UV_DATA")
         layout.operator("shiyume.mesh_uv_sync_live", icon="UV_SYNC_SELECT")
         layout.operator("shiyume.mesh_uv_sync_live_disable", icon="X")
+        stats = mesh_uv_sync_live.FRAME_STATS
+        if stats['objects']:
+            layout.label(
+                text=f"上帧同步: {stats['updated']}/{stats['objects']} 个物体, "
+                     f"{stats['milliseconds']:.1f} ms",
+                icon='TIME')
         layout.operator("shiyume.mesh_to_uv", icon="MESH_UVSPHERE")
         layout.operator("shiyume.uv_from_mesh", icon="UV_SYNC_SELECT")
         layout.operator("shiyume.uv_island_equidistant", icon="ALIGN_CENTER")
@@ -264,6 +272,12 @@ class SHIYUME_PT_UVTransfer(bpy.types.Panel):
         if settings.color_source == 'IMAGE':
             col.prop(settings, "supersample")
             col.prop(settings, "extension")
+            col.prop(settings, "precise_accumulation")
+            col.prop(settings, "workers")
+            col.prop(settings, "use_source_cache")
+            sub = col.column(align=True)
+            sub.enabled = settings.use_source_cache
+            sub.prop(settings, "source_cache_size")
         else:
             col.prop(settings, "bake_type")
             col.prop(settings, "bake_samples")